@@ -0,0 +1,92 @@
+"""Loopback receive throughput of ConnectionProtocol vs a naive asyncio.Protocol.
+
+Run with ``python -m benchmarks.asyncio_protocol``; the naive protocol copies
+every ``data_received`` chunk into ``receive_data``, while ConnectionProtocol
+lets the kernel write straight into the connection buffer. The sender runs in
+a thread with a blocking socket so that only the receiving side is measured;
+large heartbeat responses keep parsing cheap so the copies show.
+"""
+
+import asyncio
+import socket
+import threading
+from time import perf_counter
+
+from broadcastlv import (
+    ClientConnection,
+    Connection,
+    ConnectionProtocol,
+    ConnectionState,
+    HeartbeatResponse,
+    LazyCommand,
+)
+
+from .samples import DANMU_MSG
+
+FRAMES = 20_000
+SAMPLES = {
+    "DANMU_MSG": bytes(Connection().send(LazyCommand.from_bytes(DANMU_MSG))),
+    "64 KiB HeartbeatResponse": bytes(
+        Connection().send(HeartbeatResponse(1, bytes(1 << 16)))
+    ),
+}
+
+
+class NaiveProtocol(asyncio.Protocol):
+    def __init__(self, connection: ClientConnection, on_event) -> None:
+        self.connection = connection
+        self.on_event = on_event
+
+    def data_received(self, data: bytes) -> None:
+        self.connection.receive_data(data)
+        for event in self.connection.next_events():
+            self.on_event(event)
+
+
+def send(listener: socket.socket, data: bytes) -> None:
+    conn, _ = listener.accept()
+    with conn:
+        conn.sendall(data)
+
+
+async def run(data: bytes, naive: bool) -> float:
+    loop = asyncio.get_running_loop()
+    listener = socket.create_server(("127.0.0.1", 0))
+    thread = threading.Thread(target=send, args=(listener, data))
+    thread.start()
+    done = loop.create_future()
+    count = 0
+
+    def on_event(event) -> None:
+        nonlocal count
+        count += 1
+        if count == FRAMES:
+            done.set_result(None)
+
+    def factory():
+        connection = ClientConnection(lazy=True)
+        connection.state = ConnectionState.AUTHENTICATED
+        if naive:
+            return NaiveProtocol(connection, on_event)
+        return ConnectionProtocol(connection, on_event)
+
+    start = perf_counter()
+    transport, _ = await loop.create_connection(factory, *listener.getsockname())
+    await done
+    elapsed = perf_counter() - start
+    transport.close()
+    thread.join()
+    listener.close()
+    return elapsed
+
+
+def main() -> None:
+    for sample, frame in SAMPLES.items():
+        data = frame * FRAMES
+        for name, naive in (("Protocol", True), ("ConnectionProtocol", False)):
+            elapsed = min(asyncio.run(run(data, naive)) for _ in range(5))
+            print(f"{sample}, {name:>18}: {len(data) / elapsed / 1e6:8.1f} MB/s")
+
+
+if __name__ == "__main__":
+    main()
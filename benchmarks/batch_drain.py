@@ -0,0 +1,38 @@
+"""Draining a brotli packet of 200 DANMU_MSG frames event by event vs in one batch.
+
+Run with ``python -m benchmarks.batch_drain``.
+"""
+
+from timeit import timeit
+
+import brotli
+
+from broadcastlv import Connection, NeedData
+from broadcastlv.command import DanmuMsg  # noqa: F401  # register DANMU_MSG
+
+from .samples import DANMU_MSG, frame
+
+PACKET = frame(brotli.compress(frame(DANMU_MSG) * 200), 3)
+
+
+def one_by_one() -> None:
+    conn = Connection()
+    conn.receive_data(PACKET)
+    while not isinstance(conn.next_event(), NeedData):
+        pass
+
+
+def batch() -> None:
+    conn = Connection()
+    conn.receive_data(PACKET)
+    conn.next_events()
+
+
+def main() -> None:
+    for func in (one_by_one, batch):
+        elapsed = timeit(func, number=200)
+        print(f"{func.__name__:>10}: {elapsed / 200 * 1e6:8.1f} us/packet")
+
+
+if __name__ == "__main__":
+    main()
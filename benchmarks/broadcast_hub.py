@@ -0,0 +1,37 @@
+"""Cost of fanning one batch out to many subscribers, per connection vs hub.
+
+Run with ``python -m benchmarks.broadcast_hub``; the hub cost should barely
+grow with the number of subscribers.
+"""
+
+from timeit import repeat
+
+from broadcastlv import BroadcastHub, Command, ConnectionState, ServerConnection
+
+from .samples import DANMU_MSG
+
+
+def main() -> None:
+    events = [Command.from_bytes(DANMU_MSG)] * 20
+    for count in (10, 100, 1_000):
+        hub = BroadcastHub()
+        connections = []
+        for _ in range(count):
+            conn = ServerConnection()
+            conn.state = ConnectionState.AUTHENTICATED
+            connections.append(conn)
+            hub.subscribe(1, conn, 2)
+        each = min(
+            repeat(
+                lambda: [conn.multi_send(events, 2) for conn in connections], number=5
+            )
+        )
+        shared = min(repeat(lambda: hub.broadcast(1, events), number=5))
+        print(
+            f"{count:>5} subscribers: per connection {each / 5 * 1e3:8.2f} ms, "
+            f"hub {shared / 5 * 1e3:8.2f} ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,43 @@
+"""Cost of Command.from_bytes per command type, against decoding the payload twice.
+
+Run with ``python -m benchmarks.command_dispatch``. Only payloads of 512 bytes
+or more (DANMU_MSG here) take the single-pass path. Shorter ones, like most
+GUARD_BUY, WATCHED_CHANGE, INTERACT_WORD and LIKE_INFO_V3_UPDATE commands,
+are still decoded twice because scanning cmd in Python costs more than a
+generic Command decode, so both columns should match for them.
+"""
+
+from timeit import repeat
+
+from broadcastlv import COMMAND_MAP, Command
+from broadcastlv.command import DanmuMsg, GuardBuy, WatchedChange  # noqa: F401
+from broadcastlv.event import _command_decode
+
+from .samples import DANMU_MSG, GUARD_BUY, WATCHED_CHANGE
+
+
+def two_pass(data: bytes) -> Command:
+    self = _command_decode(data)
+    if (cls := COMMAND_MAP[self.cmd]) is not Command:
+        self = cls.from_bytes(data)
+    return self
+
+
+def main() -> None:
+    for data in (DANMU_MSG, GUARD_BUY, WATCHED_CHANGE):
+        cmd = Command.from_bytes(data).cmd
+        # the machine is noisy, so take the best of many short runs
+        before = min(repeat(lambda: two_pass(data), number=2_000, repeat=50)) / 2_000
+        after = (
+            min(repeat(lambda: Command.from_bytes(data), number=2_000, repeat=50))
+            / 2_000
+        )
+        path = "single pass" if len(data) >= 512 else "two passes"
+        print(
+            f"{cmd:>14} ({len(data):4} B, {path:>11}):"
+            f" {before * 1e9:7.0f} ns -> {after * 1e9:7.0f} ns ({before / after:.2f}x)"
+        )
+
+
+if __name__ == "__main__":
+    main()
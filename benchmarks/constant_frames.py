@@ -0,0 +1,39 @@
+"""Cost of sending heartbeats from the pre-encoded frame cache vs encoding them.
+
+Run with ``python -m benchmarks.constant_frames``; passing ``buffer=`` bypasses
+the cache and encodes the frame as before.
+"""
+
+from timeit import repeat
+
+from broadcastlv import (
+    ClientConnection,
+    ConnectionState,
+    Heartbeat,
+    HeartbeatResponse,
+    ServerConnection,
+)
+
+
+def main() -> None:
+    client = ClientConnection()
+    client.state = ConnectionState.AUTHENTICATED
+    server = ServerConnection()
+    server.state = ConnectionState.AUTHENTICATED
+    for conn, event in (
+        (client, Heartbeat(b"[object Object]")),
+        (server, HeartbeatResponse(114514, b"")),
+    ):
+        name = type(event).__name__
+        cached = min(repeat(lambda: conn.send(event), number=100_000)) / 100_000
+        encoded = (
+            min(repeat(lambda: conn.send(event, buffer=bytearray()), number=100_000))
+            / 100_000
+        )
+        print(
+            f"{name:>17}: cached {cached * 1e9:6.0f} ns, encoded {encoded * 1e9:6.0f} ns"
+        )
+
+
+if __name__ == "__main__":
+    main()
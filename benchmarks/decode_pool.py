@@ -0,0 +1,66 @@
+"""Decoding brotli packets in this process vs in a DecodePool of worker processes.
+
+Run with ``python -m benchmarks.decode_pool``; each packet holds 200 DANMU_MSG
+frames and the packets are spread over 10 rooms. "io cpu" is the CPU time of
+this process, the part a pool takes off the event loop; throughput only
+scales with workers up to the number of cores. Workers send commands back as
+msgpack (or as raw JSON for lazy=True) because unpickling built structs costs
+more than decoding the JSON again.
+"""
+
+import os
+import time
+
+import brotli
+
+from broadcastlv import Connection, DecodePool
+from broadcastlv.command import DanmuMsg  # noqa: F401  # register DANMU_MSG
+
+from .samples import DANMU_MSG, frame
+
+PACKET = frame(brotli.compress(frame(DANMU_MSG) * 200), 3)
+PACKETS = 200
+ROOMS = 10
+
+
+def inline(lazy: bool) -> int:
+    conn = Connection(lazy=lazy)
+    count = 0
+    for _ in range(PACKETS):
+        conn.receive_data(PACKET)
+        count += len(conn.next_events())
+    return count
+
+
+def pooled(pool: DecodePool) -> int:
+    conn = Connection(offload=True)
+    for i in range(PACKETS):
+        conn.receive_data(PACKET)
+        pool.submit(i % ROOMS, conn.next_events())
+    return sum(len(events) for _, events, _ in pool.drain())
+
+
+def measure(name: str, func, *args) -> None:
+    cpu, start = time.process_time(), time.perf_counter()
+    count = func(*args)
+    cpu, elapsed = time.process_time() - cpu, time.perf_counter() - start
+    print(
+        f"{name:>10}: {count / elapsed:10.0f} events/s,"
+        f" io cpu {cpu / count * 1e6:6.2f} us/event"
+    )
+
+
+def main() -> None:
+    print(f"{os.cpu_count()} cpus")
+    for lazy in (False, True):
+        print(f"lazy={lazy}")
+        measure("inline", inline, lazy)
+        for workers in (1, 2, 4):
+            pool = DecodePool(workers, lazy=lazy)
+            pooled(pool)  # start the workers
+            measure(f"{workers} workers", pooled, pool)
+            pool.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,35 @@
+"""Scanning a dump of raw frames with scan_frames vs Header.from_bytes per frame.
+
+Run with ``python -m benchmarks.frame_scanner``.
+"""
+
+from timeit import repeat
+
+from broadcastlv import Header, scan_frames
+
+from .samples import DANMU_MSG, WATCHED_CHANGE, frame
+
+DUMP = (
+    frame(DANMU_MSG) + frame(WATCHED_CHANGE) + frame(b"\x00\x00\x00\x01", 1, 3)
+) * 100_000
+
+
+def headers() -> None:
+    offset = 0
+    while offset < len(DUMP):
+        offset += Header.from_bytes(DUMP, offset).size
+
+
+def main() -> None:
+    frames = len(scan_frames(DUMP, numpy=False))
+    for name, func in (
+        ("Header.from_bytes", headers),
+        ("scan_frames(array)", lambda: scan_frames(DUMP, numpy=False)),
+        ("scan_frames(numpy)", lambda: scan_frames(DUMP)),
+    ):
+        elapsed = min(repeat(func, number=1, repeat=3))
+        print(f"{name:>18}: {elapsed / frames * 1e9:6.1f} ns/frame")
+
+
+if __name__ == "__main__":
+    main()
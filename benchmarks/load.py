@@ -0,0 +1,220 @@
+"""End-to-end load test: a local Server broadcasting to many ClientConnections.
+
+Run with ``python -m benchmarks.load --help`` for the options. The server
+runs in this process and emits batches of commands at a fixed rate, round
+robin over the rooms; the clients run in child processes and authenticate
+with a mix of protovers. Every command carries its send time, so delivery
+latency is measured across processes with the wall clock of this host.
+
+The report gives events/s delivered, p50/p99 latency, CPU time per 1000
+delivered events on each side and resident memory per client connection.
+"""
+
+import argparse
+import asyncio
+import multiprocessing
+import os
+import resource
+import statistics
+import time
+from array import array
+from itertools import cycle
+
+from broadcastlv import (
+    Auth,
+    AuthResponse,
+    ClientConnection,
+    ConnectionProtocol,
+    LazyCommand,
+    Server,
+)
+
+from .samples import DANMU_MSG, GUARD_BUY, WATCHED_CHANGE
+
+SAMPLES = (DANMU_MSG, DANMU_MSG, DANMU_MSG, GUARD_BUY, WATCHED_CHANGE)
+
+
+def stamp(sample: bytes, now: float) -> bytes:
+    # the field goes right after "cmd", which has to stay first to be scanned
+    index = sample.index(b",") + 1
+    return b'%s"ts":%r,%s' % (sample[:index], now, sample[index:])
+
+
+def rss() -> int:
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except OSError:  # not linux, fall back to the peak
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def raise_limit() -> None:
+    _, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+
+
+async def clients(address, auths, decode, ready, stop, results) -> None:
+    loop = asyncio.get_running_loop()
+    latencies = array("d")
+    authenticated = 0
+    all_authenticated = loop.create_future()
+
+    def on_event(event) -> None:
+        nonlocal authenticated
+        match event:
+            case AuthResponse():
+                authenticated += 1
+                if authenticated == len(auths):
+                    all_authenticated.set_result(None)
+            case LazyCommand(raw=raw):
+                now = time.time()
+                start = raw.index(b'"ts":') + 5
+                latencies.append(now - float(raw[start : raw.index(b",", start)]))
+                if decode:
+                    event.decode()
+
+    before = rss()
+    protocols = []
+    for auth in auths:
+        _, protocol = await loop.create_connection(
+            lambda: ConnectionProtocol(ClientConnection(lazy=True), on_event),
+            *address,
+        )
+        protocol.send(auth)
+        protocols.append(protocol)
+    await all_authenticated
+    memory = rss() - before
+    ready.set()
+
+    cpu = time.process_time()
+    while not stop.is_set():
+        await asyncio.sleep(0.05)
+    cpu = time.process_time() - cpu
+    results.put((latencies.tobytes(), cpu, memory))
+    for protocol in protocols:
+        protocol.transport.close()
+
+
+def run_clients(*args) -> None:
+    raise_limit()
+    asyncio.run(clients(*args))
+
+
+async def run(args: argparse.Namespace) -> None:
+    loop = asyncio.get_running_loop()
+    server = Server(timeout=3600)
+    address = (
+        (await server.start("127.0.0.1", backlog=args.clients)).sockets[0].getsockname()
+    )
+
+    mix = [item.split(":") for item in args.mix.split(",")]
+    protovers = cycle(
+        [int(protover) for protover, weight in mix for _ in range(int(weight))]
+    )
+    auths = [
+        Auth(i % args.rooms, protover=next(protovers)) for i in range(args.clients)
+    ]
+    context = multiprocessing.get_context("spawn")
+    stop = context.Event()
+    results = context.Queue()
+    processes = []
+    readies = []
+    for i in range(args.processes):
+        ready = context.Event()
+        process = context.Process(
+            target=run_clients,
+            args=(
+                address,
+                auths[i :: args.processes],
+                args.decode,
+                ready,
+                stop,
+                results,
+            ),
+        )
+        process.start()
+        processes.append(process)
+        readies.append(ready)
+    for ready in readies:
+        await loop.run_in_executor(None, ready.wait)
+
+    # emit batches at the requested rate, catching up when the loop falls behind
+    interval = args.batch / args.rate
+    samples = cycle(SAMPLES)
+    rooms = cycle(range(args.rooms))
+    cpu = time.process_time()
+    start = deadline = time.perf_counter()
+    sent = delivered = 0
+    while (now := time.perf_counter()) - start < args.duration:
+        if now < deadline:
+            await asyncio.sleep(deadline - now)
+            continue
+        timestamp = time.time()
+        batch = [stamp(next(samples), timestamp) for _ in range(args.batch)]
+        delivered += server.broadcast(next(rooms), batch) * args.batch
+        sent += args.batch
+        deadline += interval
+        if time.perf_counter() > deadline:
+            await asyncio.sleep(0)
+    await asyncio.sleep(args.drain)
+    cpu = time.process_time() - cpu
+
+    stop.set()
+    latencies = array("d")
+    client_cpu = memory = 0
+    for _ in processes:
+        data, process_cpu, process_memory = await loop.run_in_executor(
+            None, results.get
+        )
+        latencies.frombytes(data)
+        client_cpu += process_cpu
+        memory += process_memory
+    for process in processes:
+        await loop.run_in_executor(None, process.join)
+    await server.close()
+
+    received = len(latencies)
+    quantiles = statistics.quantiles(latencies, n=100) if received > 1 else [0.0] * 99
+    print(
+        f"{args.clients} clients, {args.rooms} rooms, mix {args.mix},"
+        f" {sent / args.duration:.0f}/{args.rate:.0f} commands/s in batches of {args.batch}"
+    )
+    print(
+        f"delivered {received}/{delivered} events, {received / args.duration:.0f} events/s"
+    )
+    print(f"latency p50 {quantiles[49] * 1e3:.2f} ms, p99 {quantiles[98] * 1e3:.2f} ms")
+    print(
+        f"cpu per 1k events: server {cpu / received * 1e6:.2f} ms,"
+        f" clients {client_cpu / received * 1e6:.2f} ms"
+        if received
+        else "cpu per 1k events: nothing delivered"
+    )
+    print(f"client rss per connection: {memory / args.clients / 1024:.1f} KiB")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        prog="python -m benchmarks.load", description=__doc__.splitlines()[0]
+    )
+    parser.add_argument("--clients", type=int, default=1000)
+    parser.add_argument("--rooms", type=int, default=100)
+    parser.add_argument(
+        "--rate", type=float, default=10_000, help="commands per second, all rooms"
+    )
+    parser.add_argument("--batch", type=int, default=10, help="commands per batch")
+    parser.add_argument(
+        "--mix", default="0:1,2:1,3:2", help="protover:weight of the clients"
+    )
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--drain", type=float, default=1.0, help="seconds to wait")
+    parser.add_argument("--processes", type=int, default=1, help="client processes")
+    parser.add_argument(
+        "--decode", action="store_true", help="fully decode every command"
+    )
+    args = parser.parse_args()
+    raise_limit()
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
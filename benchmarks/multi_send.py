@@ -0,0 +1,53 @@
+"""Throughput and compression ratio of ServerConnection.multi_send.
+
+Run with ``python -m benchmarks.multi_send``; inner frames are fed to the
+compressor one at a time, so memory stays bounded by the compressed output.
+The last rows pick the codec adaptively under a few CPU budgets.
+"""
+
+from timeit import repeat
+
+from broadcastlv import (
+    AdaptiveCompression,
+    ConnectionState,
+    LazyCommand,
+    ServerConnection,
+)
+
+from .samples import DANMU_MSG
+
+
+def main() -> None:
+    conn = ServerConnection()
+    conn.state = ConnectionState.AUTHENTICATED
+    command = LazyCommand.from_bytes(DANMU_MSG)
+    raw = len(DANMU_MSG) + 16
+    for protover in (2, 3, *map(AdaptiveCompression, (None, 2e-9, 0.0))):
+        if isinstance(protover, AdaptiveCompression):
+            label = f"budget {protover.budget}"
+        else:
+            label = f"protover {protover}"
+        for count in (10, 100, 1_000, 10_000):
+            events = [command] * count
+            number = max(1, 1_000 // count)
+            elapsed = min(
+                repeat(
+                    lambda: conn.multi_send(events, protover), number=number, repeat=3
+                )
+            )
+            size = len(conn.multi_send(events, protover))
+            print(
+                f"{label}, {count:>6} commands: "
+                f"{raw * count * number / elapsed / 1e6:8.1f} MB/s, "
+                f"ratio {raw * count / size:6.1f}"
+            )
+        if isinstance(protover, AdaptiveCompression):
+            for (codec, level), stats in protover.totals().items():
+                print(
+                    f"  protover {codec} level {level:>2}: {stats.count:>4} batches, "
+                    f"ratio {stats.ratio:8.1f}, {stats.cost * 1e9:6.2f} ns/byte"
+                )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""Memory and startup time per room: one Client per room vs RoomMultiplexer.
+
+Run with ``python -m benchmarks.multiplexer``; a local server authenticates
+every room and answers heartbeats, and memory is traced from before the first
+connection until every room has been authenticated, so both numbers include
+the server side's receive buffers. Each room still has its
+own socket either way, the difference is the per-room tasks, timers and
+receive buffers.
+"""
+
+import asyncio
+import tracemalloc
+from time import perf_counter
+
+from broadcastlv import (
+    Auth,
+    AuthResponse,
+    Client,
+    ConnectionProtocol,
+    RoomMultiplexer,
+    ServerConnection,
+)
+
+ROOMS = 1000
+
+
+async def serve() -> asyncio.Server:
+    def factory():
+        protocol = ConnectionProtocol(
+            ServerConnection(), lambda event: on_event(protocol, event)
+        )
+        return protocol
+
+    def on_event(protocol, event) -> None:
+        if isinstance(event, Auth):
+            protocol.send(AuthResponse(0))
+
+    return await asyncio.get_running_loop().create_server(
+        factory, "127.0.0.1", 0, backlog=ROOMS
+    )
+
+
+async def run(multiplexed: bool) -> tuple[float, int]:
+    server = await serve()
+    address = server.sockets[0].getsockname()
+    done = asyncio.get_running_loop().create_future()
+    authenticated = 0
+
+    def on_event(*args) -> None:
+        nonlocal authenticated
+        if isinstance(args[-1], AuthResponse):
+            authenticated += 1
+            if authenticated == ROOMS:
+                done.set_result(None)
+
+    tracemalloc.start()
+    start = perf_counter()
+    if multiplexed:
+        mux = RoomMultiplexer(*address, on_event)
+        for roomid in range(ROOMS):
+            mux.add(roomid)
+    else:
+        clients = [Client(*address, Auth(roomid), on_event) for roomid in range(ROOMS)]
+        tasks = [asyncio.create_task(client.run()) for client in clients]
+    await done
+    elapsed = perf_counter() - start
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    if multiplexed:
+        mux.close()
+    else:
+        for client in clients:
+            client.close()
+        await asyncio.gather(*tasks)
+    server.close()
+    await server.wait_closed()
+    return elapsed, size
+
+
+def main() -> None:
+    for name, multiplexed in (("Client", False), ("RoomMultiplexer", True)):
+        elapsed, size = asyncio.run(run(multiplexed))
+        print(
+            f"{ROOMS} rooms, {name:>15}: {elapsed * 1e3:7.1f} ms,"
+            f" {size / ROOMS / 1024:6.1f} KiB/room"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,31 @@
+"""Per-frame cost of draining a receive buffer holding many frames at once.
+
+Run with ``python -m benchmarks.receive_buffer``; the cost per frame should
+stay flat as the number of frames buffered by a single read grows.
+"""
+
+from timeit import timeit
+
+from broadcastlv import COMMAND_MAP, Command, Connection, NeedData
+
+COMMAND_MAP["TEST"] = Command
+FRAME = bytes(Connection().send(b'{"cmd":"TEST","data":"%s"}' % (b"x" * 1024), 0, 5))
+
+
+def drain(data: bytes) -> None:
+    conn = Connection()
+    conn.receive_data(data)
+    while not isinstance(conn.next_event(), NeedData):
+        pass
+
+
+def main() -> None:
+    for depth in (10, 100, 1_000, 10_000, 100_000):
+        data = FRAME * depth
+        number = max(1, 100_000 // depth)
+        elapsed = timeit(lambda: drain(data), number=number)
+        print(f"{depth:>7} frames: {elapsed / number / depth * 1e9:8.1f} ns/frame")
+
+
+if __name__ == "__main__":
+    main()
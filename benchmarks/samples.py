@@ -0,0 +1,132 @@
+"""Representative command payloads shared by the benchmarks."""
+
+import json
+
+__all__ = [
+    "DANMU_MSG",
+    "GUARD_BUY",
+    "WATCHED_CHANGE",
+    "frame",
+]
+
+
+def _dumps(obj: object) -> bytes:
+    return json.dumps(obj, separators=(",", ":"), ensure_ascii=False).encode()
+
+
+_EXTRA = {
+    "send_from_me": False,
+    "mode": 0,
+    "color": 16777215,
+    "dm_type": 0,
+    "font_size": 25,
+    "player_mode": 1,
+    "show_player_type": 0,
+    "content": "hello",
+    "user_hash": "1",
+    "emoticon_unique": "",
+    "bulge_display": 0,
+    "recommend_score": 0,
+    "main_state_dm_color": "",
+    "objective_state_dm_color": "",
+    "direction": 0,
+    "pk_direction": 0,
+    "quartet_direction": 0,
+    "anniversary_crowd": 0,
+    "yeah_space_type": "",
+    "yeah_space_url": "",
+    "jump_to_url": "",
+    "space_type": "",
+    "space_url": "",
+    "animation": {},
+    "emots": None,
+}
+
+DANMU_MSG = _dumps(
+    {
+        "cmd": "DANMU_MSG",
+        "info": [
+            [
+                0,
+                1,
+                25,
+                16777215,
+                1681234567890,
+                1681234567,
+                0,
+                "abcdef01",
+                0,
+                0,
+                0,
+                "",
+                0,
+                "{}",
+                "{}",
+                {"mode": 0, "show_player_type": 0, "extra": _dumps(_EXTRA).decode()},
+                {"activity_identity": "", "activity_source": 0, "not_show": 0},
+            ],
+            "hello",
+            [12345, "user", 0, 0, 0, 10000, 1, ""],
+            [
+                21,
+                "medal",
+                "anchor",
+                1000,
+                398668,
+                "",
+                0,
+                398668,
+                398668,
+                398668,
+                0,
+                1,
+                54321,
+            ],
+            [20, 0, 6406234, ">50000", 0],
+            ["", ""],
+            0,
+            0,
+            None,
+            {"ts": 1681234567, "ct": "ABCDEF"},
+            0,
+            0,
+            None,
+            None,
+            0,
+            14,
+        ],
+    }
+)
+
+GUARD_BUY = _dumps(
+    {
+        "cmd": "GUARD_BUY",
+        "data": {
+            "uid": 12345,
+            "username": "user",
+            "guard_level": 3,
+            "num": 1,
+            "price": 198000,
+            "gift_id": 10003,
+            "gift_name": "舰长",
+            "start_time": 1681234567,
+            "end_time": 1681234567,
+        },
+    }
+)
+
+WATCHED_CHANGE = _dumps(
+    {
+        "cmd": "WATCHED_CHANGE",
+        "data": {"num": 12345, "text_small": "1.2万", "text_large": "1.2万人看过"},
+    }
+)
+
+
+def frame(body: bytes, protover: int = 0, op: int = 5) -> bytes:
+    from broadcastlv import Header, HeaderStruct
+
+    return (
+        bytes(Header(HeaderStruct.size + len(body), HeaderStruct.size, protover, op, 0))
+        + body
+    )
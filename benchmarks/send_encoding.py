@@ -0,0 +1,26 @@
+"""Cost of Connection.send with a fresh buffer and with a reused one.
+
+Run with ``python -m benchmarks.send_encoding``.
+"""
+
+from timeit import repeat
+
+from broadcastlv import Command, Connection, Heartbeat
+
+from .samples import DANMU_MSG
+
+
+def main() -> None:
+    conn = Connection()
+    buffer = bytearray()
+    for event in (Command.from_bytes(DANMU_MSG), Heartbeat(b"[object Object]")):
+        name = type(event).__name__
+        fresh = min(repeat(lambda: conn.send(event), number=50_000)) / 50_000
+        reused = (
+            min(repeat(lambda: conn.send(event, buffer=buffer), number=50_000)) / 50_000
+        )
+        print(f"{name:>9}: fresh {fresh * 1e9:6.0f} ns, reused {reused * 1e9:6.0f} ns")
+
+
+if __name__ == "__main__":
+    main()
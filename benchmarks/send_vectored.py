@@ -0,0 +1,27 @@
+"""Cost of framing a payload the caller already holds, copied vs vectored.
+
+Run with ``python -m benchmarks.send_vectored``; the vectored cost should not
+grow with the payload size.
+"""
+
+from timeit import repeat
+
+from broadcastlv import Connection
+
+
+def main() -> None:
+    conn = Connection()
+    for size in (1 << 10, 1 << 16, 1 << 20):
+        payload = bytes(size)
+        copied = min(repeat(lambda: conn.send(payload, 0, 5), number=1_000)) / 1_000
+        vectored = (
+            min(repeat(lambda: conn.send_vectored(payload, 0, 5), number=1_000)) / 1_000
+        )
+        print(
+            f"{size:>8} bytes: send {copied * 1e9:8.0f} ns, "
+            f"send_vectored {vectored * 1e9:8.0f} ns"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+"""Memory per client of Server with many concurrent local connections.
+
+Run with ``python -m benchmarks.server``; the clients run in a child process,
+each authenticates into one of a hundred rooms and then one command is
+broadcast to every room. Memory of the server process is traced from before
+it starts listening, "broadcastlv" counts only the allocations made by this
+package, "total" also counts the asyncio transports.
+"""
+
+import asyncio
+import multiprocessing
+import resource
+import tracemalloc
+from time import perf_counter
+
+from broadcastlv import Auth, ClientConnection, Command, Server
+
+CLIENTS = 10_000
+ROOMS = 100
+
+
+class Client(asyncio.Protocol):
+    def __init__(self, roomid: int, done) -> None:
+        self.roomid = roomid
+        self.done = done
+        self.received = 0
+
+    def connection_made(self, transport) -> None:
+        transport.write(ClientConnection().send(Auth(self.roomid, protover=3)))
+
+    def data_received(self, data: bytes) -> None:
+        self.received += 1
+        if self.received == 2:  # the auth response and the broadcast
+            self.done()
+
+
+async def clients(address) -> None:
+    loop = asyncio.get_running_loop()
+    received = loop.create_future()
+    remaining = CLIENTS
+
+    def done() -> None:
+        nonlocal remaining
+        remaining -= 1
+        if not remaining:
+            received.set_result(None)
+
+    transports = []
+    for i in range(CLIENTS):
+        transport, _ = await loop.create_connection(
+            lambda: Client(i % ROOMS, done), *address
+        )
+        transports.append(transport)
+    await received
+    for transport in transports:
+        transport.close()
+
+
+def run_clients(address) -> None:
+    raise_limit()
+    asyncio.run(clients(address))
+
+
+async def run() -> None:
+    loop = asyncio.get_running_loop()
+    tracemalloc.start()
+    server = Server(timeout=3600)
+    address = (
+        (await server.start("127.0.0.1", backlog=CLIENTS)).sockets[0].getsockname()
+    )
+    # a forked child would share the event loop of this process
+    process = multiprocessing.get_context("spawn").Process(
+        target=run_clients, args=(address,)
+    )
+    start = perf_counter()
+    process.start()
+    while sum(len(room) for room in server.hub.rooms.values()) < CLIENTS:
+        await asyncio.sleep(0.01)
+    elapsed = perf_counter() - start
+    snapshot = tracemalloc.take_snapshot()
+    total, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    start = perf_counter()
+    for roomid in range(ROOMS):
+        server.broadcast(roomid, [Command("DANMU_MSG")])
+    await loop.run_in_executor(None, process.join)
+    broadcast = perf_counter() - start
+
+    owned = sum(
+        stat.size
+        for stat in snapshot.statistics("filename")
+        if "broadcastlv" in stat.traceback[0].filename
+    )
+    print(f"{CLIENTS} clients connected and authenticated in {elapsed:.2f} s")
+    print(f"broadcast to {ROOMS} rooms delivered in {broadcast * 1e3:.1f} ms")
+    print(f"broadcastlv: {owned / CLIENTS:8.0f} B/client")
+    print(f"      total: {total / CLIENTS:8.0f} B/client")
+    await server.close()
+
+
+def raise_limit() -> None:
+    _, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+
+
+def main() -> None:
+    raise_limit()
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+"""Time to first event and peak memory for a large compressed packet.
+
+Run with ``python -m benchmarks.streaming_decompression``.
+"""
+
+import tracemalloc
+import zlib
+from time import perf_counter
+
+import brotli
+
+from broadcastlv import Connection
+from broadcastlv.command import DanmuMsg  # noqa: F401  # register DANMU_MSG
+
+from .samples import DANMU_MSG, frame
+
+BODY = frame(DANMU_MSG) * 5_000
+PACKETS = {
+    "zlib": frame(zlib.compress(BODY), 2),
+    "brotli": frame(brotli.compress(BODY), 3),
+}
+
+
+def measure(packet: bytes, chunk_size: int | None) -> tuple[float, int]:
+    conn = Connection(chunk_size=chunk_size)
+    conn.receive_data(packet)
+    tracemalloc.start()
+    start = perf_counter()
+    conn.next_event()
+    first = perf_counter() - start
+    while conn.next_events(100):
+        pass
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return first, peak
+
+
+def main() -> None:
+    for name, packet in PACKETS.items():
+        for chunk_size in (None, 65536, 16384):
+            first, peak = measure(packet, chunk_size)
+            print(
+                f"{name:>6} chunk_size={chunk_size!s:>5}:"
+                f" first event {first * 1e3:7.2f} ms, peak {peak / 1024:8.0f} KiB"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""Decompressing large packets inline vs on a shared ThreadPoolExecutor.
+
+Run with ``python -m benchmarks.threaded_decompression``. Eight connections
+each receive large zlib or brotli packets and are polled round robin, 100
+events per call, the way an event loop would. "longest call" is the longest
+time one next_events() call held the polling thread, during which no other
+connection was served. zlib and brotli release the GIL while inflating, so
+throughput scales with threads up to the number of cores, and decoding does
+too on free-threaded builds.
+"""
+
+import os
+import sys
+import zlib
+from concurrent.futures import ThreadPoolExecutor, wait
+from time import perf_counter
+
+import brotli
+
+from broadcastlv import Connection
+
+from .samples import DANMU_MSG, frame
+
+BODY = frame(DANMU_MSG) * 5_000
+PACKETS = {
+    "zlib": frame(zlib.compress(BODY), 2),
+    "brotli": frame(brotli.compress(BODY), 3),
+}
+CONNECTIONS = 8
+ROUNDS = 4
+
+
+def measure(packet: bytes, executor: ThreadPoolExecutor | None) -> tuple[float, float]:
+    conns = [Connection(lazy=True, executor=executor) for _ in range(CONNECTIONS)]
+    count = 0
+    longest = 0.0
+    start = perf_counter()
+    for _ in range(ROUNDS):
+        for conn in conns:
+            conn.receive_data(packet)
+        while any(conn.end1 > conn.offset1 or conn.pending for conn in conns):
+            for conn in conns:
+                call = perf_counter()
+                count += len(conn.next_events(100))
+                longest = max(longest, perf_counter() - call)
+            if pending := [conn.pending for conn in conns if conn.pending]:
+                wait(pending, return_when="FIRST_COMPLETED")
+    return count / (perf_counter() - start), longest
+
+
+def main() -> None:
+    gil = getattr(sys, "_is_gil_enabled", lambda: True)()
+    print(f"{os.cpu_count()} cpus, gil {'enabled' if gil else 'disabled'}")
+    for name, packet in PACKETS.items():
+        for threads in (None, 1, 2, 4):
+            executor = None if threads is None else ThreadPoolExecutor(threads)
+            rate, longest = measure(packet, executor)
+            label = "inline" if threads is None else f"{threads} threads"
+            print(
+                f"{name:>6} {label:>9}: {rate:9.0f} events/s,"
+                f" longest call {longest * 1e3:6.2f} ms"
+            )
+            if executor is not None:
+                executor.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""Loopback receive throughput of WebSocket framing vs plain TCP.
+
+Run with ``python -m benchmarks.websocket``; every packet is sent as its own
+binary message, as the live service does. "unmasked" is what a client
+receives, "masked" is what a server receives and has to unmask. The sender
+runs in a thread with a blocking socket so that only the receiving side is
+measured.
+"""
+
+import asyncio
+import socket
+import threading
+from time import perf_counter
+
+from broadcastlv import Connection, HeartbeatResponse, LazyCommand, WebSocket
+
+from .samples import DANMU_MSG
+
+FRAMES = 20_000
+SAMPLES = {
+    "DANMU_MSG": bytes(Connection().send(LazyCommand.from_bytes(DANMU_MSG))),
+    "64 KiB HeartbeatResponse": bytes(
+        Connection().send(HeartbeatResponse(1, bytes(1 << 16)))
+    ),
+}
+
+
+class Protocol(asyncio.BufferedProtocol):
+    def __init__(self, target, connection: Connection, on_event) -> None:
+        self.target = target
+        self.connection = connection
+        self.on_event = on_event
+
+    def get_buffer(self, sizehint: int) -> memoryview:
+        return self.target.get_buffer(sizehint)
+
+    def buffer_updated(self, nbytes: int) -> None:
+        self.target.buffer_updated(nbytes)
+        for event in self.connection.next_events():
+            self.on_event(event)
+
+
+def send(listener: socket.socket, data: bytes) -> None:
+    conn, _ = listener.accept()
+    with conn:
+        conn.sendall(data)
+
+
+async def run(data: bytes, framing: str) -> float:
+    loop = asyncio.get_running_loop()
+    listener = socket.create_server(("127.0.0.1", 0))
+    thread = threading.Thread(target=send, args=(listener, data))
+    thread.start()
+    done = loop.create_future()
+    count = 0
+
+    def on_event(event) -> None:
+        nonlocal count
+        count += 1
+        if count == FRAMES:
+            done.set_result(None)
+
+    def factory():
+        connection = Connection(lazy=True)
+        match framing:
+            case "TCP":
+                return Protocol(connection, connection, on_event)
+            case "unmasked":
+                return Protocol(WebSocket(connection, mask=True), connection, on_event)
+            case _:
+                return Protocol(WebSocket(connection, mask=False), connection, on_event)
+
+    start = perf_counter()
+    transport, _ = await loop.create_connection(factory, *listener.getsockname())
+    await done
+    elapsed = perf_counter() - start
+    transport.close()
+    thread.join()
+    listener.close()
+    return elapsed
+
+
+def main() -> None:
+    for sample, frame in SAMPLES.items():
+        data = {
+            "TCP": frame * FRAMES,
+            "unmasked": WebSocket(Connection(), mask=False).frame(frame) * FRAMES,
+            "masked": WebSocket(Connection(), mask=True).frame(frame) * FRAMES,
+        }
+        for framing in data:
+            elapsed = min(asyncio.run(run(data[framing], framing)) for _ in range(5))
+            print(
+                f"{sample}, {framing:>8}: {len(data[framing]) / elapsed / 1e6:8.1f} MB/s,"
+                f" {elapsed / FRAMES * 1e6:6.2f} us/packet"
+            )
+
+
+if __name__ == "__main__":
+    main()
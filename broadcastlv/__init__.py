@@ -1,4 +1,17 @@
+# .command must be initialised before anything that imports .event
 from .command import COMMAND_MAP
+
+# isort: split
+from .cache import PacketCache
+from .client import Client
+from .columnar import DanmuTable, decode_danmu_msgs
+from .compression import (
+    AdaptiveCompression,
+    CodecStats,
+    Compressor,
+    Decompressor,
+    decompress,
+)
 from .connection import (
     ClientConnection,
     Connection,
@@ -6,6 +19,7 @@ from .connection import (
     ConnectionState,
     ServerConnection,
     connect,
+    encode_commands,
 )
 from .event import (
     EVENT_TO_OP,
@@ -13,10 +27,12 @@ from .event import (
     Auth,
     AuthResponse,
     Command,
+    CompressedPacket,
     ConnectionClosed,
     Event,
     Heartbeat,
     HeartbeatResponse,
+    LazyCommand,
     NeedData,
 )
 from .exception import (
@@ -26,11 +42,32 @@ from .exception import (
     UnknownCommandWarning,
 )
 from .header import Header, HeaderStruct
-from .util import add_from_bytes, pascal_to_snake, pascal_to_upper_snake
+from .hub import BroadcastHub
+from .multiplexer import RoomMultiplexer
+from .pool import DecodePool
+from .protocol import ConnectionProtocol
+from .scanner import Frames, scan_frames
+from .scheduler import Coalescer, CoalescerMetrics
+from .server import Server
+from .util import add_from_bytes, pascal_to_snake, pascal_to_upper_snake, scan_cmd
+from .websocket import WebSocket
 
 __all__ = [
+    # cache
+    "PacketCache",
+    # client
+    "Client",
+    # columnar
+    "DanmuTable",
+    "decode_danmu_msgs",
     # command
     "COMMAND_MAP",
+    # compression
+    "AdaptiveCompression",
+    "CodecStats",
+    "Compressor",
+    "Decompressor",
+    "decompress",
     # connection
     "ClientConnection",
     "Connection",
@@ -38,16 +75,19 @@ __all__ = [
     "ConnectionState",
     "ServerConnection",
     "connect",
+    "encode_commands",
     # event
     "EVENT_TO_OP",
     "OP_TO_EVENT",
     "Auth",
     "AuthResponse",
     "Command",
+    "CompressedPacket",
     "ConnectionClosed",
     "Event",
     "Heartbeat",
     "HeartbeatResponse",
+    "LazyCommand",
     "NeedData",
     # exception
     "LocalProtocolError",
@@ -57,8 +97,27 @@ __all__ = [
     # header
     "Header",
     "HeaderStruct",
+    # hub
+    "BroadcastHub",
+    # multiplexer
+    "RoomMultiplexer",
+    # pool
+    "DecodePool",
+    # protocol
+    "ConnectionProtocol",
+    # scanner
+    "Frames",
+    "scan_frames",
+    # scheduler
+    "Coalescer",
+    "CoalescerMetrics",
+    # server
+    "Server",
     # util
     "add_from_bytes",
     "pascal_to_snake",
     "pascal_to_upper_snake",
+    "scan_cmd",
+    # websocket
+    "WebSocket",
 ]
@@ -0,0 +1,66 @@
+from __future__ import annotations
+
+from collections import OrderedDict
+from hashlib import blake2b
+from typing import Literal
+
+from .compression import decompress
+from .exception import RemoteProtocolError
+
+__all__ = [
+    "PacketCache",
+]
+
+
+class PacketCache:
+    """按压缩正文的哈希缓存解压结果，可在多个 Connection 间共享
+
+    缓存的解压结果总大小不超过 maxbytes，给定 maxsize 时条目数也不超过 maxsize，超出时淘汰最久未用的条目
+    """
+
+    maxsize: int | None
+    maxbytes: int
+    nbytes: int
+    """缓存的解压结果的总大小"""
+    hits: int
+    misses: int
+    entries: OrderedDict[tuple[int, bytes], bytes]
+
+    def __init__(self, maxsize: int | None = None, *, maxbytes: int = 1 << 24) -> None:
+        self.maxsize = maxsize
+        self.maxbytes = maxbytes
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.entries = OrderedDict()
+
+    def decompress(
+        self, protover: Literal[2, 3], data: bytes, max_size: int | None = None
+    ) -> bytes:
+        key = protover, blake2b(data, digest_size=16).digest()
+        try:
+            result = self.entries[key]
+        except KeyError:
+            self.misses += 1
+            result = decompress(protover, data, max_size)
+            if len(result) <= self.maxbytes:  # a larger one would evict everything
+                self.entries[key] = result
+                self.nbytes += len(result)
+                while self.nbytes > self.maxbytes or (
+                    self.maxsize is not None and len(self.entries) > self.maxsize
+                ):
+                    self.nbytes -= len(self.entries.popitem(last=False)[1])
+        else:
+            self.hits += 1
+            self.entries.move_to_end(key)
+            if max_size is not None and len(result) > max_size:
+                raise RemoteProtocolError(
+                    f"Decompressed size {len(result)} exceeds {max_size}"
+                )
+        return result
+
+    def clear(self) -> None:
+        self.entries.clear()
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
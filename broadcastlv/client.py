@@ -0,0 +1,160 @@
+from __future__ import annotations
+
+import asyncio
+import random
+from typing import Any, Awaitable, Callable, TypeVar
+
+from .connection import ClientConnection, ConnectionState
+from .event import (
+    Auth,
+    AuthResponse,
+    ConnectionClosed,
+    Event,
+    Heartbeat,
+    HeartbeatResponse,
+)
+from .exception import RemoteProtocolError
+from .protocol import ConnectionProtocol
+
+__all__ = [
+    "Client",
+]
+
+_T = TypeVar("_T")
+
+
+def _backoff(
+    attempts: int, min_backoff: float, max_backoff: float, jitter: Callable[[], float]
+) -> float:
+    # full jitter: a random delay up to the exponential cap, the exponent is clamped
+    # so that a long outage cannot overflow the float
+    return min(max_backoff, min_backoff * 2 ** min(attempts, 32)) * jitter()
+
+
+class Client:
+    """单个房间的 asyncio 客户端，连接后自动认证、定时发送心跳，断线后以带抖动的指数退避重连
+
+    run() 在一个任务中处理整个生命周期，事件通过 on_event 回调传出
+    """
+
+    host: str
+    port: int
+    auth: Auth
+    on_event: Callable[[Event], Any] | None
+    heartbeat: Heartbeat
+    heartbeat_interval: float
+    min_backoff: float
+    max_backoff: float
+    jitter: Callable[[], float]
+    """返回 [0, 1) 中的随机数，用于退避的抖动"""
+    kwargs: dict[str, Any]
+    """创建 ClientConnection 时的参数"""
+    popularity: int | None
+    """最近一次心跳回应中的人气值"""
+    attempts: int
+    """自上次认证成功以来连续失败的次数"""
+    protocol: ConnectionProtocol[ClientConnection] | None
+    pending: asyncio.Future[Any] | None
+    """正在进行的退避等待或连接建立，close() 时取消"""
+    closing: bool
+
+    def __init__(
+        self,
+        host: str,
+        port: int,
+        auth: Auth,
+        on_event: Callable[[Event], Any] | None = None,
+        *,
+        heartbeat: Heartbeat = Heartbeat(b"[object Object]"),
+        heartbeat_interval: float = 30.0,
+        min_backoff: float = 1.0,
+        max_backoff: float = 60.0,
+        jitter: Callable[[], float] = random.random,
+        **kwargs: Any,
+    ) -> None:
+        self.host = host
+        self.port = port
+        self.auth = auth
+        self.on_event = on_event
+        self.heartbeat = heartbeat
+        self.heartbeat_interval = heartbeat_interval
+        self.min_backoff = min_backoff
+        self.max_backoff = max_backoff
+        self.jitter = jitter
+        self.kwargs = kwargs
+        self.popularity = None
+        self.attempts = 0
+        self.protocol = None
+        self.pending = None
+        self.closing = False
+
+    async def run(self) -> None:
+        try:
+            while not self.closing:
+                try:
+                    await self._session()
+                except (OSError, RemoteProtocolError):
+                    pass
+                if self.closing:
+                    return
+                await self._wait(asyncio.sleep(self.backoff()))
+                self.attempts += 1
+        except asyncio.CancelledError:
+            # close() cancels the pending sleep or connect, any other cancellation propagates
+            if not self.closing:
+                raise
+
+    def backoff(self) -> float:
+        return _backoff(self.attempts, self.min_backoff, self.max_backoff, self.jitter)
+
+    def close(self) -> None:
+        self.closing = True
+        if self.pending is not None:
+            self.pending.cancel()
+        if self.protocol is not None:
+            self.protocol.send(ConnectionClosed())
+
+    async def _wait(self, awaitable: Awaitable[_T]) -> _T:
+        self.pending = asyncio.ensure_future(awaitable)
+        try:
+            return await self.pending
+        finally:
+            self.pending = None
+
+    async def _session(self) -> None:
+        loop = asyncio.get_running_loop()
+        _, protocol = await self._wait(
+            loop.create_connection(
+                lambda: ConnectionProtocol(ClientConnection(**self.kwargs)),
+                self.host,
+                self.port,
+            )
+        )
+        if self.closing:  # close() was called after the connection was established
+            protocol.send(ConnectionClosed())
+            return
+        self.protocol = protocol
+        timer = None
+
+        def heartbeat() -> None:
+            nonlocal timer
+            if ConnectionState.CLOSED not in protocol.connection.state:
+                protocol.send(self.heartbeat)
+                timer = loop.call_later(self.heartbeat_interval, heartbeat)
+
+        try:
+            protocol.send(self.auth)
+            async for event in protocol:
+                match event:
+                    case HeartbeatResponse(popularity):
+                        self.popularity = popularity
+                    case AuthResponse(0):
+                        self.attempts = 0
+                        heartbeat()
+                if self.on_event is not None:
+                    self.on_event(event)
+        finally:
+            if timer is not None:
+                timer.cancel()
+            protocol.send(ConnectionClosed())
+            self.protocol = None
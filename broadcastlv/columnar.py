@@ -0,0 +1,147 @@
+from __future__ import annotations
+
+from array import array
+from typing import Any, Iterable, NamedTuple
+
+import msgspec
+
+from .event import LazyCommand
+from .exception import RemoteProtocolError
+from .util import _numpy
+
+__all__ = [
+    "DanmuTable",
+    "decode_danmu_msgs",
+]
+
+
+# unused elements decode to msgspec.Raw, which only references their bytes in the input
+# instead of building their contents, trailing elements are skipped entirely
+class _Meta(msgspec.Struct, array_like=True, gc=False):
+    _0: msgspec.Raw
+    _1: msgspec.Raw
+    _2: msgspec.Raw
+    color: int
+    time: int
+    _5: msgspec.Raw
+    _6: msgspec.Raw
+    _7: msgspec.Raw
+    _8: msgspec.Raw
+    _9: msgspec.Raw
+    _10: msgspec.Raw
+    _11: msgspec.Raw
+    dm_type: int
+
+
+class _Sender(msgspec.Struct, array_like=True, gc=False):
+    uid: int = 0
+    username: str = ""
+
+
+class _Medal(msgspec.Struct, array_like=True, gc=False):
+    medal_level: int = 0
+
+
+class _Level(msgspec.Struct, array_like=True, gc=False):
+    user_level: int = 0
+
+
+class _Info(msgspec.Struct, array_like=True, gc=False):
+    meta: _Meta
+    content: str
+    sender: _Sender
+    medal: _Medal
+    level: _Level
+    _5: msgspec.Raw
+    _6: msgspec.Raw
+    guard_level: int = 0
+
+
+class _DanmuMsg(msgspec.Struct, gc=False):
+    info: _Info
+
+
+_decode = msgspec.json.Decoder(_DanmuMsg).decode
+
+
+class DanmuTable(NamedTuple):
+    """按列存储的一批弹幕，数值列在安装了 NumPy 时为 ndarray，否则为 array.array，文本列为 list"""
+
+    timestamp: Any
+    """同 DanmuMsg.info.meta.time"""
+    uid: Any
+    """同 DanmuMsg.info.sender.uid"""
+    username: list[str]
+    """同 DanmuMsg.info.sender.username"""
+    content: list[str]
+    """同 DanmuMsg.info.content"""
+    medal_level: Any
+    """同 DanmuMsg.info.medal.medal_level"""
+    user_level: Any
+    """同 DanmuMsg.info.level.user_level"""
+    guard_level: Any
+    """同 DanmuMsg.info.guard_level"""
+    color: Any
+    """同 DanmuMsg.info.meta.color"""
+    dm_type: Any
+    """同 DanmuMsg.info.meta.dm_type"""
+
+    def __len__(self) -> int:
+        return len(self.content)
+
+
+def decode_danmu_msgs(
+    payloads: Iterable[bytes | bytearray | memoryview | LazyCommand],
+    *,
+    numpy: bool = True,
+) -> DanmuTable:
+    columns = (
+        array("q"),
+        array("q"),
+        [],
+        [],
+        array("H"),
+        array("H"),
+        array("B"),
+        array("I"),
+        array("B"),
+    )
+    (
+        append_timestamp,
+        append_uid,
+        append_username,
+        append_content,
+        append_medal_level,
+        append_user_level,
+        append_guard_level,
+        append_color,
+        append_dm_type,
+    ) = (column.append for column in columns)
+    try:
+        for payload in payloads:
+            info = _decode(
+                payload.raw if isinstance(payload, LazyCommand) else payload
+            ).info
+            meta, sender = info.meta, info.sender
+            append_timestamp(meta.time)
+            append_uid(sender.uid)
+            append_username(sender.username)
+            append_content(info.content)
+            append_medal_level(info.medal.medal_level)
+            append_user_level(info.level.user_level)
+            append_guard_level(info.guard_level)
+            append_color(meta.color)
+            append_dm_type(meta.dm_type)
+    except (msgspec.DecodeError, OverflowError) as e:
+        raise RemoteProtocolError from e
+
+    if numpy and (np := _numpy()) is not None:
+        return DanmuTable(
+            *(
+                column
+                if isinstance(column, list)
+                else np.frombuffer(column, column.typecode)
+                for column in columns
+            )
+        )
+    return DanmuTable(*columns)
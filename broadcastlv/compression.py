@@ -0,0 +1,209 @@
+from __future__ import annotations
+
+import zlib
+from dataclasses import dataclass
+from typing import Literal
+
+import brotli
+
+from .exception import RemoteProtocolError
+
+__all__ = [
+    "AdaptiveCompression",
+    "CodecStats",
+    "Compressor",
+    "Decompressor",
+    "decompress",
+]
+
+
+class Compressor:
+    protover: Literal[2, 3]
+
+    def __init__(self, protover: Literal[2, 3], level: int | None = None) -> None:
+        match protover:
+            case 2:
+                self.compressor = zlib.compressobj(-1 if level is None else level)
+            case 3:
+                self.compressor = brotli.Compressor(
+                    quality=11 if level is None else level
+                )
+            case _:
+                raise ValueError(f"Unknown protover: {protover}")
+        self.protover = protover
+
+    def write(self, data: bytes) -> bytes:
+        match self.protover:
+            case 2:
+                return self.compressor.compress(data)
+            case _:
+                return self.compressor.process(data)
+
+    def flush(self) -> bytes:
+        match self.protover:
+            case 2:
+                return self.compressor.flush()
+            case _:
+                return self.compressor.finish()
+
+
+@dataclass
+class CodecStats:
+    """某一 protover 与压缩等级的累计统计"""
+
+    count: int = 0
+    input_size: int = 0
+    output_size: int = 0
+    time: float = 0.0
+    """压缩耗时（秒）"""
+
+    @property
+    def ratio(self) -> float:
+        return self.input_size / self.output_size if self.output_size else 0.0
+
+    @property
+    def cost(self) -> float:
+        """每字节输入的压缩耗时（秒）"""
+        return self.time / self.input_size if self.input_size else 0.0
+
+
+class AdaptiveCompression:
+    """根据批次大小与 CPU 预算为每批命令选择 protover 与压缩等级"""
+
+    budget: float | None
+    """每字节输入允许的压缩耗时（秒），None 表示不限"""
+    min_size: int
+    """小于此大小的批次不压缩，以 protover 0 逐条发送"""
+    codecs: tuple[tuple[Literal[2, 3], int], ...]
+    """候选的 (protover, level)，按压缩率从高到低排列"""
+    stats: dict[tuple[int, int, int], CodecStats]
+    """(protover, level, 批次大小的二进制位数) -> 统计"""
+
+    def __init__(
+        self,
+        budget: float | None = None,
+        *,
+        min_size: int = 1024,
+        codecs: tuple[tuple[Literal[2, 3], int], ...] = (
+            (3, 11),
+            (3, 5),
+            (2, 6),
+            (2, 1),
+        ),
+    ) -> None:
+        self.budget = budget
+        self.min_size = min_size
+        self.codecs = codecs
+        self.stats = {}
+
+    def select(self, size: int) -> tuple[Literal[0, 2, 3], int | None]:
+        if size < self.min_size:
+            return 0, None
+        # per-call overhead dominates small batches, so costs are kept per size class
+        size_class = size.bit_length()
+        for protover, level in self.codecs:
+            if (stats := self.stats.get((protover, level, size_class))) is None:
+                return protover, level  # not measured yet
+            if self.budget is None or stats.cost <= self.budget:
+                return protover, level
+        return self.codecs[-1]
+
+    def record(
+        self,
+        protover: int,
+        level: int,
+        input_size: int,
+        output_size: int,
+        time: float,
+    ) -> None:
+        key = protover, level, input_size.bit_length()
+        if (stats := self.stats.get(key)) is None:
+            stats = self.stats[key] = CodecStats()
+        stats.count += 1
+        stats.input_size += input_size
+        stats.output_size += output_size
+        stats.time += time
+
+    def totals(self) -> dict[tuple[int, int], CodecStats]:
+        result: dict[tuple[int, int], CodecStats] = {}
+        for (protover, level, _), stats in self.stats.items():
+            if (total := result.get((protover, level))) is None:
+                total = result[protover, level] = CodecStats()
+            total.count += stats.count
+            total.input_size += stats.input_size
+            total.output_size += stats.output_size
+            total.time += stats.time
+        return result
+
+
+class Decompressor:
+    protover: Literal[2, 3]
+    chunk_size: int
+    max_size: int | None
+    size: int
+    finished: bool
+
+    def __init__(
+        self,
+        protover: Literal[2, 3],
+        data: bytes,
+        chunk_size: int,
+        max_size: int | None = None,
+    ) -> None:
+        match protover:
+            case 2:
+                self.decompressor = zlib.decompressobj()
+            case 3:
+                self.decompressor = brotli.Decompressor()
+            case _:
+                raise ValueError(f"Unknown protover: {protover}")
+        self.protover = protover
+        self.chunk_size = chunk_size
+        self.max_size = max_size
+        self.size = 0
+        self.finished = False
+        self.pending = memoryview(bytes(data))
+
+    def read(self) -> bytes:
+        match self.protover:
+            case 2:
+                data = self.decompressor.decompress(self.pending, self.chunk_size)
+                self.pending = memoryview(self.decompressor.unconsumed_tail)
+                self.finished = self.decompressor.eof
+            case _:
+                # brotli >= 1.2 stops growing the output near the limit but emits whole
+                # 32 KiB blocks, a read returns less than 2 * chunk_size + 32 KiB
+                # however much the input expands
+                data = self.decompressor.process(
+                    self.pending, output_buffer_limit=self.chunk_size
+                )
+                self.pending = self.pending[:0]
+                self.finished = self.decompressor.is_finished()
+
+        if not (data or self.finished or self.pending):
+            raise RemoteProtocolError("Truncated compressed packet")
+        self.size += len(data)
+        if self.max_size is not None and self.size > self.max_size:
+            raise RemoteProtocolError(
+                f"Decompressed size {self.size} exceeds {self.max_size}"
+            )
+        return data
+
+
+def decompress(
+    protover: Literal[2, 3], data: bytes, max_size: int | None = None
+) -> bytes:
+    if max_size is None:
+        match protover:
+            case 2:
+                return zlib.decompress(data)
+            case 3:
+                return brotli.decompress(data)
+            case _:
+                raise ValueError(f"Unknown protover: {protover}")
+
+    decompressor = Decompressor(protover, data, max_size, max_size)
+    chunks = [decompressor.read()]
+    while not decompressor.finished:
+        chunks.append(decompressor.read())
+    return b"".join(chunks)
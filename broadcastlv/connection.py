@@ -1,26 +1,32 @@
 from __future__ import annotations
 
-import zlib
+import sys
+from concurrent.futures import Executor, Future
 from enum import Enum, Flag, auto
-from operator import length_hint
-from typing import Iterable, Literal, overload
-
-import brotli
+from math import inf
+from time import perf_counter
+from typing import Any, Iterable, Iterator, Literal, overload
 
+from .cache import PacketCache
+from .compression import AdaptiveCompression, Compressor, Decompressor, decompress
 from .event import (
     EVENT_TO_OP,
     OP_TO_EVENT,
     Auth,
     AuthResponse,
     Command,
+    CompressedPacket,
     ConnectionClosed,
     Event,
     Heartbeat,
     HeartbeatResponse,
+    LazyCommand,
     NeedData,
+    _command_decode,
 )
 from .exception import LocalProtocolError, RemoteProtocolError
 from .header import Header, HeaderStruct
+from .util import scan_cmd
 
 __all__ = [
     "ClientConnection",
@@ -29,9 +35,23 @@ __all__ = [
     "ConnectionState",
     "ServerConnection",
     "connect",
+    "encode_commands",
 ]
 
 
+# pre-encoded frames of constant events, shared by all connections
+_frames: dict[tuple[type[Event], Any], bytes] = {}
+_frames_maxsize = 256
+
+# default size of the room handed out by Connection.get_buffer
+_zeros = memoryview(bytes(1 << 16))
+
+
+def _zeroed(size: int) -> bytes | memoryview:
+    # fresh zeroed allocations of this size are slow, copy a shared one
+    return _zeros[:size] if size <= len(_zeros) else bytes(size)
+
+
 class ConnectionRole(Enum):
     CLIENT = auto()
     SERVER = auto()
@@ -47,21 +67,79 @@ class ConnectionState(Flag):
 class Connection:
     state: ConnectionState
     buffer1: bytearray
-    buffer2: bytearray
+    offset1: int
+    end1: int
+    buffer2: bytes
+    offset2: int
     current: Header | None
+    decompressor: Decompressor | None
+    lazy: bool
+    commands: frozenset[str] | None
+    chunk_size: int | None
+    """不为 None 时压缩包分块解压，每块不超过 chunk_size（zlib）或 2 * chunk_size + 32 KiB（brotli）"""
+    max_packet_size: int | None
+    max_decompressed_size: int | None
+    high_water_mark: int | None
+    cache: PacketCache | None
+    """在本线程一次性解压的压缩包经过的缓存，不能与 offload、chunk_size 同时使用"""
+    offload: bool
+    """为 True 时压缩包作为 CompressedPacket 返回，不能与 chunk_size、executor、cache 同时使用"""
+    executor: Executor | None
+    """至少 executor_threshold 字节的压缩包在 executor 中解压，不经过 cache，不能与 chunk_size 同时使用"""
+    executor_threshold: int
+    pending: Future[bytes] | None
+
+    def __init__(
+        self,
+        *,
+        lazy: bool = False,
+        commands: Iterable[str] | None = None,
+        chunk_size: int | None = None,
+        max_packet_size: int | None = None,
+        max_decompressed_size: int | None = None,
+        high_water_mark: int | None = None,
+        cache: PacketCache | None = None,
+        offload: bool = False,
+        executor: Executor | None = None,
+        executor_threshold: int = 1 << 14,
+    ) -> None:
+        if offload and (
+            chunk_size is not None or executor is not None or cache is not None
+        ):
+            raise ValueError(
+                "offload cannot be combined with chunk_size, executor or cache"
+            )
+        if chunk_size is not None and (executor is not None or cache is not None):
+            raise ValueError("chunk_size cannot be combined with executor or cache")
 
-    def __init__(self) -> None:
         self.state = ConnectionState.CONNECTED
         self.buffer1 = bytearray()
-        self.buffer2 = bytearray()
+        self.offset1 = 0
+        self.end1 = 0
+        self.buffer2 = b""
+        self.offset2 = 0
         self.current = None
+        self.decompressor = None
+        self.lazy = lazy
+        self.commands = None if commands is None else frozenset(commands)
+        self.chunk_size = chunk_size
+        self.max_packet_size = max_packet_size
+        self.max_decompressed_size = max_decompressed_size
+        self.high_water_mark = high_water_mark
+        self.cache = cache
+        self.offload = offload
+        self.executor = executor
+        self.executor_threshold = executor_threshold
+        self.pending = None
 
     @overload
-    def send(self, event: Event) -> bytes:
+    def send(self, event: Event, *, buffer: bytearray | None = None) -> bytes:
         ...
 
     @overload
-    def send(self, event: bytes, protover: int, op: int) -> bytes:
+    def send(
+        self, event: bytes, protover: int, op: int, *, buffer: bytearray | None = None
+    ) -> bytes:
         ...
 
     @overload
@@ -73,93 +151,300 @@ class Connection:
         event: Event | bytes | ConnectionClosed,
         protover: int | None = None,
         op: int | None = None,
+        *,
+        buffer: bytearray | None = None,
     ) -> bytes | None:
+        if buffer is None:
+            buffer = bytearray(HeaderStruct.size)
+        elif len(buffer) < HeaderStruct.size:
+            buffer.extend(bytes(HeaderStruct.size - len(buffer)))
+
         match event:
             case ConnectionClosed():
                 return
-            case Command():
+            case Command() | LazyCommand():
                 protover = 0
                 op = 5
-                data = bytearray(2048)
-                event.into_buffer(data, HeaderStruct.size)
+                event.into_buffer(buffer, HeaderStruct.size)
             case Event() if op := EVENT_TO_OP.get(type(event)):
                 protover = 1
-                data = bytearray(256)
-                event.into_buffer(data, HeaderStruct.size)
+                event.into_buffer(buffer, HeaderStruct.size)
             case bytes() if protover is not None and op is not None:
-                data = bytearray(HeaderStruct.size + len(event))
-                data[HeaderStruct.size :] = event
+                buffer[HeaderStruct.size :] = event
             case _:
                 raise LocalProtocolError(f"Unknown event: {type(event).__name__}")
 
         Header(
-            len(data),
+            len(buffer),
             HeaderStruct.size,
             protover,
             op,
             0,
-        ).into_buffer(data)
-        return data
+        ).into_buffer(buffer)
+        return buffer
+
+    def _send_cached(self, key: Any, event: Event) -> bytes:
+        key = type(event), key
+        try:
+            return _frames[key]
+        except KeyError:
+            frame = bytes(Connection.send(self, event))
+            if len(_frames) < _frames_maxsize:
+                _frames[key] = frame
+            return frame
+
+    def send_vectored(
+        self,
+        event: Event | bytes | bytearray | memoryview | ConnectionClosed,
+        protover: int | None = None,
+        op: int | None = None,
+    ) -> list[bytes | bytearray | memoryview]:
+        match event:
+            case bytes() | bytearray() | memoryview():
+                # the payload is passed through as is, only the header is encoded
+                header = self.send(b"", protover, op)  # type: ignore
+                Header(
+                    HeaderStruct.size + memoryview(event).nbytes,
+                    HeaderStruct.size,
+                    protover,  # type: ignore
+                    op,  # type: ignore
+                    0,
+                ).into_buffer(header)
+                return [header, event]
+            case ConnectionClosed():
+                self.send(event)
+                return []
+            case _:
+                return [self.send(event)]  # type: ignore
 
     def receive_data(self, data: bytes) -> None:
-        self.buffer1.extend(data)
+        self._compact(len(data))
+        try:
+            if len(self.buffer1) > self.end1:  # drop the room handed out by get_buffer
+                del self.buffer1[self.end1 :]
+            self.buffer1 += data
+        except BufferError:  # a decoded event still holds a view of the buffer
+            self.buffer1 = self.buffer1[: self.end1] + data
+        self.end1 = len(self.buffer1)
+
+    def get_buffer(self, sizehint: int = -1) -> memoryview:
+        # any room will do when there is no hint, as long as reads stay large enough
+        needed = sizehint if sizehint > 0 else len(_zeros) // 2
+        size = sizehint if sizehint > 0 else len(_zeros)
+        if self._shrink(size):
+            self._compact(size)
+        elif len(self.buffer1) - self.end1 >= needed or self._move_to_front(needed):
+            return memoryview(self.buffer1)[self.end1 :]
+        else:
+            self._compact(size)
+
+        try:
+            self.buffer1 += _zeroed(self.end1 + size - len(self.buffer1))
+        except BufferError:
+            self.buffer1 = self.buffer1[: self.end1] + _zeroed(size)
+        return memoryview(self.buffer1)[self.end1 :]
+
+    def buffer_updated(self, nbytes: int) -> None:
+        # the buffer may still be exported here, so it must not be resized
+        self.end1 += nbytes
+
+    def _shrink(self, size: int) -> bool:
+        # reallocate to release the memory pinned by a past burst
+        return (
+            self.high_water_mark is not None
+            and sys.getsizeof(self.buffer1) > self.high_water_mark
+            and self.end1 - self.offset1 + size <= self.high_water_mark
+        )
+
+    def _move_to_front(self, size: int) -> bool:
+        # reuse the room of consumed frames instead of growing the buffer
+        retained = self.end1 - self.offset1
+        if retained + size > len(self.buffer1):
+            return False
+        try:
+            self.buffer1.append(0)
+        except BufferError:  # a decoded event still holds a view of the buffer
+            return False
+        del self.buffer1[-1]
+        self.buffer1[:retained] = self.buffer1[self.offset1 : self.end1]
+        self.offset1 = 0
+        self.end1 = retained
+        return True
+
+    def _compact(self, size: int) -> None:
+        # consumed frames are only dropped here, once per read, instead of once per frame
+        retained = self.end1 - self.offset1
+        if self._shrink(size):
+            self.buffer1 = self.buffer1[self.offset1 : self.end1]
+        elif self.offset1:
+            try:
+                del self.buffer1[: self.offset1]
+            except BufferError:  # a decoded event still holds a view of the buffer
+                self.buffer1 = self.buffer1[self.offset1 : self.end1]
+        else:
+            return
+        self.offset1 = 0
+        self.end1 = retained
 
     def next_event(self) -> Event | NeedData:
+        events: list[Event] = []
+        need_data = self._drain(events, 1)
+        return events[0] if events else need_data  # type: ignore
+
+    def next_events(self, max: int | None = None) -> list[Event]:
+        events: list[Event] = []
+        self._drain(events, inf if max is None else max)
+        return events
+
+    def _drain(self, events: list[Event], limit: float) -> NeedData | None:
         try:
-            if self.buffer2:
-                header = Header.from_bytes(self.buffer2)
-                event = Command.from_bytes(
-                    self.buffer2[header.header_size : header.size]
-                )
-                del self.buffer2[: header.size]
-                return event
-
-            if self.current is None:
-                if len(self.buffer1) < HeaderStruct.size:
-                    return NeedData(HeaderStruct.size - len(self.buffer1))
-                self.current = Header.from_bytes(self.buffer1)
-
-            if len(self.buffer1) < self.current.size:
-                return NeedData(self.current.size - len(self.buffer1))
-
-            header, self.current = self.current, None
-            buffer = self.buffer1[header.header_size : header.size]
-
-            match header.op:
-                case 2 | 3 | 7 | 8:
-                    event = OP_TO_EVENT[header.op].from_bytes(buffer)
-                case 5:
-                    match header.protover:
-                        case 0:
-                            event = Command.from_bytes(buffer)
-                        case 2:
-                            self.buffer2.extend(zlib.decompress(buffer))
-                            event: Event = self.next_event()  # type: ignore
-                        case 3:
-                            self.buffer2.extend(brotli.decompress(buffer))
-                            event: Event = self.next_event()  # type: ignore
+            while len(events) < limit:
+                if self.offset2 < len(self.buffer2) and self._next_commands(
+                    events, limit
+                ):
+                    continue
+
+                if self.pending is not None:
+                    if not self.pending.done():
+                        return NeedData(0)  # nothing to read, the packet is inflating
+                    pending, self.pending = self.pending, None
+                    self.buffer2, self.offset2 = pending.result(), 0
+                elif self.decompressor is not None:
+                    self._inflate()
+                elif self.offset2 < len(self.buffer2):
+                    raise RemoteProtocolError("Truncated compressed packet")
+                else:
+                    if self.buffer2:
+                        self.buffer2, self.offset2 = b"", 0
+                    match event := self._next_frame():
+                        case NeedData():
+                            return event
+                        case None:
+                            pass
                         case _:
-                            raise RemoteProtocolError(
-                                f"Unknown protover: {header.protover}"
-                            )
-                case _:
-                    raise RemoteProtocolError(f"Unknown op: {header.op}")
+                            events.append(event)
         except RemoteProtocolError:
             raise
         except Exception as e:
             raise RemoteProtocolError from e
 
-        del self.buffer1[: header.size]
-        return event
+        return None
+
+    def _next_frame(self) -> Event | CompressedPacket | NeedData | None:
+        available = self.end1 - self.offset1
+        if self.current is None:
+            if available < HeaderStruct.size:
+                return NeedData(HeaderStruct.size - available)
+            self.current = Header.from_bytes(self.buffer1, self.offset1)
+            if self.current.size < HeaderStruct.size:
+                raise RemoteProtocolError(f"Invalid packet size: {self.current.size}")
+            if (
+                self.max_packet_size is not None
+                and self.current.size > self.max_packet_size
+            ):
+                raise RemoteProtocolError(
+                    f"Packet size {self.current.size} exceeds {self.max_packet_size}"
+                )
+
+        if available < self.current.size:
+            return NeedData(self.current.size - available)
+
+        header, self.current = self.current, None
+        start, self.offset1 = self.offset1, self.offset1 + header.size
+        buffer = memoryview(self.buffer1)[start + header.header_size : self.offset1]
+
+        match header.op:
+            case 2 | 3 | 7 | 8:
+                return OP_TO_EVENT[header.op].from_bytes(buffer)
+            case 5:
+                match header.protover:
+                    case 0:
+                        return self._decode_command(buffer)
+                    case 2 | 3 if self.offload:
+                        return CompressedPacket(header.protover, bytes(buffer))
+                    case 2 | 3 if self.chunk_size is not None:
+                        self.decompressor = Decompressor(
+                            header.protover,
+                            buffer,
+                            self.chunk_size,
+                            self.max_decompressed_size,
+                        )
+                    case 2 | 3 if (
+                        self.executor is not None
+                        and len(buffer) >= self.executor_threshold
+                    ):
+                        # a copy, buffer1 may be compacted while the worker reads it
+                        self.pending = self.executor.submit(
+                            decompress,
+                            header.protover,
+                            bytes(buffer),
+                            self.max_decompressed_size,
+                        )
+                    case 2 | 3:
+                        self.buffer2 = (
+                            decompress if self.cache is None else self.cache.decompress
+                        )(header.protover, buffer, self.max_decompressed_size)
+                        self.offset2 = 0
+                    case _:
+                        raise RemoteProtocolError(
+                            f"Unknown protover: {header.protover}"
+                        )
+            case _:
+                raise RemoteProtocolError(f"Unknown op: {header.op}")
+
+        return None
+
+    def _next_commands(self, events: list[Event], limit: float) -> bool:
+        buffer, start = self.buffer2, self.offset2
+        offset = start
+        view = memoryview(buffer)
+        if self.commands is None:
+            decode = (LazyCommand if self.lazy else Command).from_bytes
+        else:
+            decode = self._decode_command
+        try:
+            while offset + HeaderStruct.size <= len(buffer) and len(events) < limit:
+                size, header_size, _, _, _ = HeaderStruct.unpack_from(buffer, offset)
+                if size < HeaderStruct.size:
+                    raise RemoteProtocolError(f"Invalid packet size: {size}")
+                if offset + size > len(buffer):
+                    break
+                if (
+                    event := decode(view[offset + header_size : offset + size])
+                ) is not None:
+                    events.append(event)
+                offset += size
+        finally:
+            self.offset2 = offset
+
+        return offset != start
+
+    def _inflate(self) -> None:
+        data = self.decompressor.read()  # type: ignore
+        if self.decompressor.finished:  # type: ignore
+            self.decompressor = None
+        self.buffer2, self.offset2 = self.buffer2[self.offset2 :] + data, 0
+
+    def _decode_command(self, data: bytes) -> Command | LazyCommand | None:
+        if self.commands is not None:
+            if (cmd := scan_cmd(data)) is None:
+                cmd = _command_decode(data).cmd
+            if cmd not in self.commands:
+                return None
+        return (LazyCommand if self.lazy else Command).from_bytes(data)
 
 
 class ClientConnection(Connection):
     @overload
-    def send(self, event: Heartbeat | Auth) -> bytes:
+    def send(
+        self, event: Heartbeat | Auth, *, buffer: bytearray | None = None
+    ) -> bytes:
         ...
 
     @overload
-    def send(self, event: bytes, protover: int, op: int) -> bytes:
+    def send(
+        self, event: bytes, protover: int, op: int, *, buffer: bytearray | None = None
+    ) -> bytes:
         ...
 
     @overload
@@ -171,6 +456,8 @@ class ClientConnection(Connection):
         event: Heartbeat | Auth | bytes | ConnectionClosed,
         protover: int = 1,
         op: int | None = None,
+        *,
+        buffer: bytearray | None = None,
     ) -> bytes | None:
         match event:
             case ConnectionClosed():
@@ -178,11 +465,13 @@ class ClientConnection(Connection):
                 return
             case _ if ConnectionState.CLOSED in self.state:
                 raise LocalProtocolError("Connection is closed")
-            case Heartbeat():
+            case Heartbeat(content):
                 if (  # pragma: worst case  # FIXME: coverage.py incorrectly assumes that this line is partially run
                     ConnectionState.AUTHENTICATED not in self.state
                 ):
                     raise LocalProtocolError("Connection is not authenticated")
+                if buffer is None:
+                    return self._send_cached(content, event)
             case Auth():
                 if ConnectionState.AUTHENTICATING in self.state:
                     raise LocalProtocolError("Connection is already authenticated")
@@ -192,7 +481,15 @@ class ClientConnection(Connection):
             case _:
                 raise LocalProtocolError(f"Unknown event: {type(event).__name__}")
 
-        return super().send(event, protover, op)  # type: ignore
+        return super().send(event, protover, op, buffer=buffer)  # type: ignore
+
+    def send_vectored(
+        self,
+        event: Heartbeat | Auth | bytes | bytearray | memoryview | ConnectionClosed,
+        protover: int = 1,
+        op: int | None = None,
+    ) -> list[bytes | bytearray | memoryview]:
+        return super().send_vectored(event, protover, op)
 
     def receive_data(self, data: bytes) -> None:
         if not data:
@@ -204,51 +501,95 @@ class ClientConnection(Connection):
 
         super().receive_data(data)
 
+    def buffer_updated(self, nbytes: int) -> None:
+        if ConnectionState.CLOSED in self.state:
+            raise RemoteProtocolError("Connection is closed")
+
+        super().buffer_updated(nbytes)
+
     def next_event(
         self,
-    ) -> HeartbeatResponse | Command | AuthResponse | NeedData | ConnectionClosed:
+    ) -> HeartbeatResponse | Command | LazyCommand | CompressedPacket | AuthResponse | NeedData | ConnectionClosed:
         try:
-            match event := super().next_event():
-                case HeartbeatResponse() | Command():
-                    if (  # pragma: worst case  # FIXME: coverage.py incorrectly assumes that this line is partially run
-                        ConnectionState.AUTHENTICATED not in self.state
-                    ):
-                        raise RemoteProtocolError(
-                            f"Connection is not authenticated, but received a {type(event).__name__}"
-                        )
-                case AuthResponse(code):
-                    if ConnectionState.AUTHENTICATED in self.state:
-                        raise RemoteProtocolError(
-                            "Connection is already authenticated, but received a AuthResponse"
-                        )
-                    elif ConnectionState.AUTHENTICATING not in self.state:
-                        raise RemoteProtocolError(
-                            "Connection is not authenticating, but received a AuthResponse"
-                        )
-                    elif code:
-                        raise RemoteProtocolError(
-                            f"Authentication failed (code: {code})"
-                        )
-                    self.state |= ConnectionState.AUTHENTICATED
-                case NeedData():
-                    if ConnectionState.CLOSED in self.state:
-                        event = ConnectionClosed()
-                case _:
-                    raise RemoteProtocolError(f"Unknown event: {type(event).__name__}")
+            return self._check_event(super().next_event())
         except RemoteProtocolError:
             self.state |= ConnectionState.CLOSED
             raise
 
+    def next_events(
+        self, max: int | None = None
+    ) -> list[
+        HeartbeatResponse
+        | Command
+        | LazyCommand
+        | CompressedPacket
+        | AuthResponse
+        | ConnectionClosed
+    ]:
+        try:
+            events = super().next_events(max)
+            if ConnectionState.AUTHENTICATED not in self.state or not all(
+                isinstance(
+                    event, (HeartbeatResponse, Command, LazyCommand, CompressedPacket)
+                )
+                for event in events
+            ):
+                for event in events:
+                    self._check_event(event)
+        except RemoteProtocolError:
+            self.state |= ConnectionState.CLOSED
+            raise
+
+        if not events and ConnectionState.CLOSED in self.state and self.pending is None:
+            events.append(ConnectionClosed())
+        return events  # type: ignore
+
+    def _check_event(
+        self, event: Event | NeedData
+    ) -> HeartbeatResponse | Command | LazyCommand | CompressedPacket | AuthResponse | NeedData | ConnectionClosed:
+        match event:
+            case HeartbeatResponse() | Command() | LazyCommand() | CompressedPacket():
+                if (  # pragma: worst case  # FIXME: coverage.py incorrectly assumes that this line is partially run
+                    ConnectionState.AUTHENTICATED not in self.state
+                ):
+                    raise RemoteProtocolError(
+                        f"Connection is not authenticated, but received a {type(event).__name__}"
+                    )
+            case AuthResponse(code):
+                if ConnectionState.AUTHENTICATED in self.state:
+                    raise RemoteProtocolError(
+                        "Connection is already authenticated, but received a AuthResponse"
+                    )
+                elif ConnectionState.AUTHENTICATING not in self.state:
+                    raise RemoteProtocolError(
+                        "Connection is not authenticating, but received a AuthResponse"
+                    )
+                elif code:
+                    raise RemoteProtocolError(f"Authentication failed (code: {code})")
+                self.state |= ConnectionState.AUTHENTICATED
+            case NeedData():
+                if ConnectionState.CLOSED in self.state and self.pending is None:
+                    return ConnectionClosed()
+            case _:
+                raise RemoteProtocolError(f"Unknown event: {type(event).__name__}")
+
         return event
 
 
 class ServerConnection(Connection):
     @overload
-    def send(self, event: HeartbeatResponse | AuthResponse | Command) -> bytes:
+    def send(
+        self,
+        event: HeartbeatResponse | AuthResponse | Command | LazyCommand,
+        *,
+        buffer: bytearray | None = None,
+    ) -> bytes:
         ...
 
     @overload
-    def send(self, event: bytes, protover: int, op: int) -> bytes:
+    def send(
+        self, event: bytes, protover: int, op: int, *, buffer: bytearray | None = None
+    ) -> bytes:
         ...
 
     @overload
@@ -257,9 +598,16 @@ class ServerConnection(Connection):
 
     def send(
         self,
-        event: HeartbeatResponse | AuthResponse | Command | bytes | ConnectionClosed,
+        event: HeartbeatResponse
+        | AuthResponse
+        | Command
+        | LazyCommand
+        | bytes
+        | ConnectionClosed,
         protover: int | None = None,
         op: int | None = None,
+        *,
+        buffer: bytearray | None = None,
     ) -> bytes | None:
         match event:
             case ConnectionClosed():
@@ -267,7 +615,21 @@ class ServerConnection(Connection):
                 return
             case _ if ConnectionState.CLOSED in self.state:
                 raise LocalProtocolError("Connection is closed")
-            case HeartbeatResponse() | Command():
+            case HeartbeatResponse(popularity, content):
+                if (  # pragma: worst case  # FIXME: coverage.py incorrectly assumes that this line is partially run
+                    ConnectionState.AUTHENTICATED not in self.state
+                ):
+                    raise LocalProtocolError("Connection is not authenticated")
+                if buffer is None:
+                    # only the popularity differs between responses
+                    buffer = bytearray(
+                        self._send_cached(content, HeartbeatResponse(0, content))
+                    )
+                    buffer[
+                        HeaderStruct.size : HeaderStruct.size + 4
+                    ] = popularity.to_bytes(4, "big", signed=False)
+                    return buffer
+            case Command() | LazyCommand():
                 if (  # pragma: worst case  # FIXME: coverage.py incorrectly assumes that this line is partially run
                     ConnectionState.AUTHENTICATED not in self.state
                 ):
@@ -282,45 +644,25 @@ class ServerConnection(Connection):
                     code
                 ):
                     self.state |= ConnectionState.CLOSED
+                if buffer is None:
+                    return self._send_cached(code, event)
             case bytes() if protover is not None and op is not None:
                 pass
             case _:
                 raise LocalProtocolError(f"Unknown event: {type(event).__name__}")
 
-        return super().send(event, protover, op)  # type: ignore
+        return super().send(event, protover, op, buffer=buffer)  # type: ignore
 
     def multi_send(
-        self, events: Iterable[Command | bytes], protover: Literal[2, 3] = 3
+        self,
+        events: Iterable[Command | LazyCommand | bytes],
+        protover: Literal[0, 2, 3] | AdaptiveCompression = 3,
+        level: int | None = None,
     ) -> bytes:
         if ConnectionState.AUTHENTICATED not in self.state:
             raise LocalProtocolError("Connection is not authenticated")
 
-        match protover:
-            case 2:
-                compress = zlib.compress
-            case 3:
-                compress = brotli.compress
-            case _:
-                raise LocalProtocolError(f"Unknown protover: {protover}")
-
-        data = bytearray(length_hint(events, 1) * 2048)
-        offset = 0
-        for event in events:
-            match event:
-                case Command():
-                    event.into_buffer(data, offset + HeaderStruct.size)
-                case bytes():
-                    data[offset + HeaderStruct.size :] = event
-                case _:
-                    raise LocalProtocolError(f"Unknown event: {type(event).__name__}")
-            Header(len(data) - offset, HeaderStruct.size, 0, 5, 0).into_buffer(
-                data, offset
-            )
-
-        data[HeaderStruct.size :] = compress(data)
-        Header(len(data), HeaderStruct.size, protover, 5, 0).into_buffer(data)
-
-        return data
+        return encode_commands(events, protover, level)
 
     def receive_data(self, data: bytes) -> None:
         if not data:
@@ -332,60 +674,151 @@ class ServerConnection(Connection):
 
         super().receive_data(data)
 
+    def buffer_updated(self, nbytes: int) -> None:
+        if ConnectionState.CLOSED in self.state:
+            raise RemoteProtocolError("Connection is closed")
+
+        super().buffer_updated(nbytes)
+
     def next_event(self) -> Heartbeat | Auth | NeedData | ConnectionClosed:
         try:
-            match event := super().next_event():
-                case Heartbeat():
-                    if (  # pragma: worst case  # FIXME: coverage.py incorrectly assumes that this line is partially run
-                        ConnectionState.AUTHENTICATED not in self.state
-                    ):
-                        raise RemoteProtocolError(
-                            "Connection is not authenticated, but received a Heartbeat"
-                        )
-                case Auth():
-                    if ConnectionState.AUTHENTICATED in self.state:
-                        raise RemoteProtocolError(
-                            "Connection is already authenticated, but received a Auth"
-                        )
-                    elif ConnectionState.AUTHENTICATING in self.state:
-                        raise RemoteProtocolError(
-                            "Connection is already authenticating, but received a Auth"
-                        )
-                    self.state |= ConnectionState.AUTHENTICATING
-                case NeedData():
-                    if ConnectionState.CLOSED in self.state:
-                        event = ConnectionClosed()
-                case _:
-                    raise RemoteProtocolError(f"Unknown event: {type(event).__name__}")
+            return self._check_event(super().next_event())
+        except RemoteProtocolError:
+            self.state |= ConnectionState.CLOSED
+            raise
+
+    def next_events(
+        self, max: int | None = None
+    ) -> list[Heartbeat | Auth | ConnectionClosed]:
+        if ConnectionState.AUTHENTICATED not in self.state:
+            # stop right after an Auth, the caller has to answer it before the rest is checked
+            max = 1 if max is None else min(max, 1)
+        try:
+            events = super().next_events(max)
+            if ConnectionState.AUTHENTICATED not in self.state or not all(
+                isinstance(event, Heartbeat) for event in events
+            ):
+                for event in events:
+                    self._check_event(event)
         except RemoteProtocolError:
             self.state |= ConnectionState.CLOSED
             raise
 
+        if not events and ConnectionState.CLOSED in self.state and self.pending is None:
+            events.append(ConnectionClosed())
+        return events  # type: ignore
+
+    def _check_event(
+        self, event: Event | NeedData
+    ) -> Heartbeat | Auth | NeedData | ConnectionClosed:
+        match event:
+            case Heartbeat():
+                if (  # pragma: worst case  # FIXME: coverage.py incorrectly assumes that this line is partially run
+                    ConnectionState.AUTHENTICATED not in self.state
+                ):
+                    raise RemoteProtocolError(
+                        "Connection is not authenticated, but received a Heartbeat"
+                    )
+            case Auth():
+                if ConnectionState.AUTHENTICATED in self.state:
+                    raise RemoteProtocolError(
+                        "Connection is already authenticated, but received a Auth"
+                    )
+                elif ConnectionState.AUTHENTICATING in self.state:
+                    raise RemoteProtocolError(
+                        "Connection is already authenticating, but received a Auth"
+                    )
+                self.state |= ConnectionState.AUTHENTICATING
+            case NeedData():
+                if ConnectionState.CLOSED in self.state and self.pending is None:
+                    return ConnectionClosed()
+            case _:
+                raise RemoteProtocolError(f"Unknown event: {type(event).__name__}")
+
         return event
 
 
 @overload
-def connect(role: Literal[ConnectionRole.CLIENT]) -> ClientConnection:
+def connect(role: Literal[ConnectionRole.CLIENT], **kwargs: Any) -> ClientConnection:
     ...
 
 
 @overload
-def connect(role: Literal[ConnectionRole.SERVER]) -> ServerConnection:
+def connect(role: Literal[ConnectionRole.SERVER], **kwargs: Any) -> ServerConnection:
     ...
 
 
 @overload
-def connect(role: None = None) -> Connection:
+def connect(role: None = None, **kwargs: Any) -> Connection:
     ...
 
 
-def connect(role: ConnectionRole | None = None) -> Connection:
+def connect(role: ConnectionRole | None = None, **kwargs: Any) -> Connection:
     match role:
         case ConnectionRole.CLIENT:
-            return ClientConnection()
+            return ClientConnection(**kwargs)
         case ConnectionRole.SERVER:
-            return ServerConnection()
+            return ServerConnection(**kwargs)
         case None:
-            return Connection()
+            return Connection(**kwargs)
 
     raise ValueError(f"Unknown role: {role}")
+
+
+def encode_commands(
+    events: Iterable[Command | LazyCommand | bytes],
+    protover: Literal[0, 2, 3] | AdaptiveCompression = 3,
+    level: int | None = None,
+) -> bytes:
+    match protover:
+        case AdaptiveCompression():
+            frames = encode_commands(events, 0)
+            codec, level = protover.select(len(frames))
+            if codec == 0:
+                return frames
+            start = perf_counter()
+            data = _compress((frames,), codec, level)
+            protover.record(
+                codec, level, len(frames), len(data), perf_counter() - start  # type: ignore
+            )
+            return data
+        case 0:
+            data = bytearray()
+            for frame in _encode_frames(events):
+                data += frame
+            return data
+        case _:
+            return _compress(_encode_frames(events), protover, level)
+
+
+def _encode_frames(
+    events: Iterable[Command | LazyCommand | bytes],
+) -> Iterator[bytearray]:
+    frame = bytearray(HeaderStruct.size)
+    for event in events:
+        match event:
+            case Command() | LazyCommand():
+                event.into_buffer(frame, HeaderStruct.size)
+            case bytes():
+                frame[HeaderStruct.size :] = event
+            case _:
+                raise LocalProtocolError(f"Unknown event: {type(event).__name__}")
+        Header(len(frame), HeaderStruct.size, 0, 5, 0).into_buffer(frame)
+        yield frame
+
+
+def _compress(
+    chunks: Iterable[bytes], protover: Literal[2, 3], level: int | None
+) -> bytearray:
+    try:
+        compressor = Compressor(protover, level)
+    except ValueError:
+        raise LocalProtocolError(f"Unknown protover: {protover}") from None
+
+    data = bytearray(HeaderStruct.size)
+    for chunk in chunks:
+        data += compressor.write(chunk)
+    data += compressor.flush()
+
+    Header(len(data), HeaderStruct.size, protover, 5, 0).into_buffer(data)
+    return data
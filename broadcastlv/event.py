@@ -2,8 +2,8 @@ from __future__ import annotations
 
 import sys
 from abc import ABCMeta, abstractmethod
-from dataclasses import dataclass
-from typing import Literal
+from dataclasses import dataclass, field
+from typing import Any, Literal
 
 if sys.version_info >= (3, 11):
     from typing import Self
@@ -14,7 +14,7 @@ import msgspec
 
 from .command import COMMAND_MAP
 from .exception import UnknownCommandWarning
-from .util import add_from_bytes, pascal_to_upper_snake
+from .util import add_from_bytes, pascal_to_upper_snake, scan_cmd
 
 __all__ = [
     "EVENT_TO_OP",
@@ -22,10 +22,12 @@ __all__ = [
     "Auth",
     "AuthResponse",
     "Command",
+    "CompressedPacket",
     "ConnectionClosed",
     "Event",
     "Heartbeat",
     "HeartbeatResponse",
+    "LazyCommand",
     "NeedData",
 ]
 
@@ -44,6 +46,14 @@ class NeedData:
     size: int
 
 
+@dataclass
+class CompressedPacket:
+    """Connection 设置了 offload 时，protover 2/3 的封包不在本进程解压，而是原样返回正文"""
+
+    protover: int
+    data: bytes
+
+
 class Event(metaclass=ABCMeta):
     @classmethod
     @abstractmethod
@@ -64,7 +74,10 @@ class Heartbeat(Event):
 
     @classmethod
     def from_bytes(cls, data: bytes) -> Self:
-        return Heartbeat(data)
+        return Heartbeat(bytes(data))
+
+    def into_buffer(self, buffer: bytearray, offset: int = 0) -> None:
+        buffer[offset:] = self.content
 
     def __bytes__(self) -> bytes:
         return self.content
@@ -78,9 +91,13 @@ class HeartbeatResponse(Event):
     @classmethod
     def from_bytes(cls, data: bytes) -> Self:
         return HeartbeatResponse(
-            int.from_bytes(data[:4], "big", signed=False), data[4:]
+            int.from_bytes(data[:4], "big", signed=False), bytes(data[4:])
         )
 
+    def into_buffer(self, buffer: bytearray, offset: int = 0) -> None:
+        buffer[offset:] = self.popularity.to_bytes(4, "big", signed=False)
+        buffer += self.content
+
     def __bytes__(self) -> bytes:
         return self.popularity.to_bytes(4, "big", signed=False) + self.content
 
@@ -113,41 +130,78 @@ class Command(EventStruct, gc=False):
 
     @classmethod
     def from_bytes(cls, data: bytes) -> Self:
-        if cls is Command:
-            self = _command_decode(data)
-            try:
-                if (cls := COMMAND_MAP[self.cmd]) is not Command:
-                    self = cls.from_bytes(data)
-            except KeyError:
-                from pprint import pformat
-                from warnings import warn
-
-                warn(
-                    f"Unknown command: {self.cmd} ({pformat(msgspec.json.decode(data))})\n"
-                    "Please raise an issue on GitHub.",
-                    UnknownCommandWarning,
-                )
-                COMMAND_MAP[self.cmd] = Command
-            except msgspec.ValidationError:
-                from pprint import pformat
-                from traceback import print_exc
-                from warnings import warn
-
-                print_exc()
-                warn(
-                    f"Failed to decode command: {self.cmd} ({pformat(msgspec.json.decode(data))})\n"
-                    "Please raise an issue on GitHub.",
-                    RuntimeWarning,
-                )
-        else:
-            self = super().from_bytes(data)
-
-        return self
+        if cls is not Command:
+            return super().from_bytes(data)
+
+        # below 512 bytes a generic decode beats scanning cmd in Python, so short
+        # payloads are still decoded twice, only longer ones take a single pass
+        self = None
+        if len(data) < 512 or (cmd := scan_cmd(data)) is None:
+            cmd = (self := _command_decode(data)).cmd
+
+        try:
+            if (cls := COMMAND_MAP[cmd]) is not Command:
+                return cls.from_bytes(data)
+        except KeyError:
+            from pprint import pformat
+            from warnings import warn
+
+            warn(
+                f"Unknown command: {cmd} ({pformat(msgspec.json.decode(data))})\n"
+                "Please raise an issue on GitHub.",
+                UnknownCommandWarning,
+            )
+            COMMAND_MAP[cmd] = Command
+        except msgspec.ValidationError:
+            from pprint import pformat
+            from traceback import print_exc
+            from warnings import warn
+
+            print_exc()
+            warn(
+                f"Failed to decode command: {cmd} ({pformat(msgspec.json.decode(data))})\n"
+                "Please raise an issue on GitHub.",
+                RuntimeWarning,
+            )
+
+        return _command_decode(data) if self is None else self
 
 
 _command_decode = msgspec.json.Decoder(Command).decode
 
 
+@dataclass(slots=True)
+class LazyCommand(Event):
+    """仅解析 cmd 的命令，首次访问其他属性或调用 decode() 时才完整解码"""
+
+    cmd: str
+    raw: bytes
+    _command: Command | None = field(default=None, repr=False, compare=False)
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> Self:
+        raw = bytes(data)
+        if (cmd := scan_cmd(raw)) is None:
+            cmd = _command_decode(raw).cmd
+        return cls(cmd, raw)
+
+    def decode(self) -> Command:
+        if self._command is None:
+            self._command = Command.from_bytes(self.raw)
+        return self._command
+
+    def __getattr__(self, name: str) -> Any:
+        if name.startswith("__"):
+            raise AttributeError(name)
+        return getattr(self.decode(), name)
+
+    def into_buffer(self, buffer: bytearray, offset: int = 0) -> None:
+        buffer[offset:] = self.raw
+
+    def __bytes__(self) -> bytes:
+        return self.raw
+
+
 @add_from_bytes
 class Auth(EventStruct, omit_defaults=True, gc=False):
     roomid: int
@@ -167,6 +221,7 @@ EVENT_TO_OP: dict[type[Event], Literal[2, 3, 5, 7, 8]] = {
     Heartbeat: 2,
     HeartbeatResponse: 3,
     Command: 5,
+    LazyCommand: 5,
     Auth: 7,
     AuthResponse: 8,
 }
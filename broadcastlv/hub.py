@@ -0,0 +1,73 @@
+from __future__ import annotations
+
+from typing import Iterable
+
+from .compression import AdaptiveCompression
+from .connection import ConnectionState, ServerConnection, encode_commands
+from .event import Command, LazyCommand
+from .exception import LocalProtocolError
+
+__all__ = [
+    "BroadcastHub",
+]
+
+
+class BroadcastHub:
+    """按房间登记订阅的 ServerConnection，每批命令对每种 protover 只编码压缩一次"""
+
+    rooms: dict[int, dict[ServerConnection, int | AdaptiveCompression]]
+    """房间号 -> 订阅的连接 -> 该连接使用的 protover"""
+
+    def __init__(self) -> None:
+        self.rooms = {}
+
+    def subscribe(
+        self,
+        roomid: int,
+        connection: ServerConnection,
+        protover: int | AdaptiveCompression = 3,
+    ) -> None:
+        match protover:
+            case 0 | 1 | 2 | 3 | AdaptiveCompression():
+                pass
+            case _:
+                raise LocalProtocolError(f"Unknown protover: {protover!r}")
+        self.rooms.setdefault(roomid, {})[connection] = protover
+
+    def unsubscribe(self, roomid: int, connection: ServerConnection) -> None:
+        if (subscribers := self.rooms.get(roomid)) is None:
+            return
+        subscribers.pop(connection, None)
+        if not subscribers:
+            del self.rooms[roomid]
+
+    def broadcast(
+        self, roomid: int, events: Iterable[Command | LazyCommand | bytes]
+    ) -> list[tuple[ServerConnection, bytes]]:
+        if (subscribers := self.rooms.get(roomid)) is None:
+            return []
+
+        events = list(events)
+        frames: dict[int | AdaptiveCompression, bytes] = {}
+        result = []
+        for connection, protover in list(subscribers.items()):
+            if ConnectionState.CLOSED in connection.state:
+                self.unsubscribe(roomid, connection)
+                continue
+            if ConnectionState.AUTHENTICATED not in connection.state:
+                continue
+            if (frame := frames.get(protover)) is None:
+                frame = frames[protover] = self.encode(events, protover)
+            result.append((connection, frame))
+        return result
+
+    def encode(
+        self,
+        events: list[Command | LazyCommand | bytes],
+        protover: int | AdaptiveCompression,
+    ) -> bytes:
+        match protover:
+            case 2 | 3 | AdaptiveCompression():
+                return bytes(encode_commands(events, protover))  # type: ignore
+            case _:  # 0 and 1 are sent uncompressed
+                return bytes(encode_commands(events, 0))
@@ -0,0 +1,177 @@
+from __future__ import annotations
+
+import asyncio
+import random
+from typing import Any, Callable
+
+from .cache import PacketCache
+from .client import _backoff
+from .connection import ClientConnection, ConnectionState
+from .event import Auth, AuthResponse, ConnectionClosed, Event, Heartbeat
+from .protocol import _SharedBufferProtocol
+
+__all__ = [
+    "RoomMultiplexer",
+]
+
+
+class _Room:
+    roomid: int
+    auth: Auth
+    protocol: _SharedBufferProtocol[ClientConnection] | None
+    attempts: int
+    pending: asyncio.TimerHandle | asyncio.Task | None
+
+    def __init__(self, roomid: int, auth: Auth) -> None:
+        self.roomid = roomid
+        self.auth = auth
+        self.protocol = None
+        self.attempts = 0
+        self.pending = None
+
+
+class RoomMultiplexer:
+    """在一个事件循环上管理多个房间的 ClientConnection，所有房间的事件合并为 (房间号, 事件) 的输出流
+
+    所有房间共用一个心跳定时器、一个接收缓冲区和一个解压缓存，断线的房间以带抖动的指数退避重连；
+    给定 on_event 时事件传给它，否则可以用 async for 逐个取出
+    """
+
+    host: str
+    port: int
+    on_event: Callable[[int, Event], Any] | None
+    heartbeat: Heartbeat
+    heartbeat_interval: float
+    min_backoff: float
+    max_backoff: float
+    jitter: Callable[[], float]
+    kwargs: dict[str, Any]
+    """创建 ClientConnection 时的参数"""
+    rooms: dict[int, _Room]
+    buffer: bytearray
+    events: asyncio.Queue[tuple[int, Event] | None]
+    timer: asyncio.TimerHandle | None
+
+    def __init__(
+        self,
+        host: str,
+        port: int,
+        on_event: Callable[[int, Event], Any] | None = None,
+        *,
+        heartbeat: Heartbeat = Heartbeat(b"[object Object]"),
+        heartbeat_interval: float = 30.0,
+        min_backoff: float = 1.0,
+        max_backoff: float = 60.0,
+        jitter: Callable[[], float] = random.random,
+        buffer_size: int = 1 << 18,
+        cache: PacketCache | None = None,
+        **kwargs: Any,
+    ) -> None:
+        self.host = host
+        self.port = port
+        self.on_event = on_event
+        self.heartbeat = heartbeat
+        self.heartbeat_interval = heartbeat_interval
+        self.min_backoff = min_backoff
+        self.max_backoff = max_backoff
+        self.jitter = jitter
+        if (
+            cache is None
+            and kwargs.get("chunk_size") is None
+            and not kwargs.get("offload")
+        ):
+            cache = PacketCache()  # streamed or offloaded packets never reach a cache
+        self.kwargs = {"cache": cache, **kwargs}
+        self.rooms = {}
+        self.buffer = bytearray(buffer_size)
+        self.events = asyncio.Queue()
+        self.timer = None
+
+    def add(self, roomid: int, auth: Auth | None = None) -> None:
+        if roomid in self.rooms:
+            return
+        room = self.rooms[roomid] = _Room(
+            roomid, Auth(roomid) if auth is None else auth
+        )
+        self._connect(room)
+        if self.timer is None:
+            self.timer = asyncio.get_running_loop().call_later(
+                self.heartbeat_interval, self._heartbeat
+            )
+
+    def remove(self, roomid: int) -> None:
+        if (room := self.rooms.pop(roomid, None)) is None:
+            return
+        if room.pending is not None:
+            room.pending.cancel()
+        if room.protocol is not None:
+            room.protocol.send(ConnectionClosed())
+
+    def close(self) -> None:
+        for roomid in list(self.rooms):
+            self.remove(roomid)
+        if self.timer is not None:
+            self.timer.cancel()
+            self.timer = None
+        self.events.put_nowait(None)
+
+    def _connect(self, room: _Room) -> None:
+        room.pending = asyncio.get_running_loop().create_task(self._open(room))
+
+    async def _open(self, room: _Room) -> None:
+        loop = asyncio.get_running_loop()
+        try:
+            _, protocol = await loop.create_connection(
+                lambda: _SharedBufferProtocol(
+                    ClientConnection(**self.kwargs),
+                    lambda event: self._on_event(room, event),
+                    self.buffer,
+                ),
+                self.host,
+                self.port,
+            )
+        except OSError:
+            self._retry(room)
+            return
+        room.pending = None
+        room.protocol = protocol
+        protocol.send(room.auth)
+
+    def _retry(self, room: _Room) -> None:
+        delay = _backoff(room.attempts, self.min_backoff, self.max_backoff, self.jitter)
+        room.attempts += 1
+        room.pending = asyncio.get_running_loop().call_later(delay, self._connect, room)
+
+    def _heartbeat(self) -> None:
+        for room in self.rooms.values():
+            if room.protocol is not None and ConnectionState.AUTHENTICATED in (
+                room.protocol.connection.state
+            ):
+                room.protocol.send(self.heartbeat)
+        self.timer = asyncio.get_running_loop().call_later(
+            self.heartbeat_interval, self._heartbeat
+        )
+
+    def _on_event(self, room: _Room, event: Event | ConnectionClosed) -> None:
+        match event:
+            case ConnectionClosed():
+                room.protocol = None
+                if self.rooms.get(room.roomid) is room:
+                    self._retry(room)
+                return
+            case AuthResponse(0):
+                room.attempts = 0
+                room.protocol.send(self.heartbeat)  # type: ignore
+        if self.on_event is None:
+            self.events.put_nowait((room.roomid, event))
+        else:
+            self.on_event(room.roomid, event)
+
+    def __aiter__(self) -> RoomMultiplexer:
+        return self
+
+    async def __anext__(self) -> tuple[int, Event]:
+        if (item := await self.events.get()) is None:
+            self.events.put_nowait(None)
+            raise StopAsyncIteration
+        return item
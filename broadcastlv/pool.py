@@ -0,0 +1,216 @@
+from __future__ import annotations
+
+import asyncio
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Executor, Future, ProcessPoolExecutor
+from concurrent.futures import wait as _wait
+from functools import cache
+from sys import intern
+from typing import Any, Callable, Hashable, Iterable, get_args, get_type_hints
+
+import msgspec
+
+from .compression import decompress
+from .connection import Connection
+from .event import Command, CompressedPacket, LazyCommand
+from .exception import RemoteProtocolError
+
+__all__ = [
+    "DecodePool",
+]
+
+
+_msgpack_encode = msgspec.msgpack.Encoder().encode
+
+
+@cache
+def _msgpack_decoder(cls: type[Command]) -> Callable[[bytes], list[Command]]:
+    return msgspec.msgpack.Decoder(list[cls]).decode  # type: ignore
+
+
+@cache
+def _by_msgpack(cls: type[Command]) -> bool:
+    # only commands built by a plain typed decoder (add_from_bytes) survive a msgpack
+    # round trip, and only if no field keeps msgspec.Raw, which would carry JSON along
+    return (
+        cls is Command
+        or isinstance(getattr(cls.from_bytes, "__self__", None), msgspec.json.Decoder)
+    ) and not _holds_raw(cls, set())
+
+
+def _holds_raw(annotation: Any, seen: set[type]) -> bool:
+    if annotation is msgspec.Raw:
+        return True
+    if isinstance(annotation, type) and issubclass(annotation, msgspec.Struct):
+        if annotation in seen:
+            return False
+        seen.add(annotation)
+        return any(_holds_raw(t, seen) for t in get_type_hints(annotation).values())
+    return any(_holds_raw(arg, seen) for arg in get_args(annotation))
+
+
+def _pack(events: list[Command | LazyCommand]) -> list[tuple[Any, Any]]:
+    # unpickling built structs costs more than decoding the JSON again, so each run of
+    # commands of one class travels as one msgpack array, a run of LazyCommand as its
+    # cmds and raws, and only commands msgpack cannot carry are pickled as they are
+    runs: list[tuple[Any, list[Any]]] = []
+    for event in events:
+        if isinstance(event, LazyCommand):
+            key: Any = LazyCommand
+        elif _by_msgpack(cls := type(event)):
+            key = cls
+        else:
+            key = None
+        if not runs or runs[-1][0] is not key:
+            runs.append((key, []))
+        runs[-1][1].append(event)
+
+    result = []
+    for key, run in runs:
+        if key is LazyCommand:
+            # interned, a pickle then carries each distinct cmd once
+            result.append((key, ([intern(e.cmd) for e in run], [e.raw for e in run])))
+        elif key is None:
+            result.append((key, run))
+        else:
+            result.append((key, _msgpack_encode(run)))
+    return result
+
+
+def _unpack(key: Any, data: Any) -> list[Any]:
+    if key is LazyCommand:
+        return list(map(LazyCommand, *data))
+    if key is None:
+        return data
+    return _msgpack_decoder(key)(data)
+
+
+def _decode(
+    protover: int,
+    data: bytes,
+    lazy: bool,
+    commands: frozenset[str] | None,
+    max_decompressed_size: int | None,
+) -> list[tuple[Any, Any]]:
+    # runs in a worker, the events travel back as one pickle per packet
+    connection = Connection(lazy=lazy, commands=commands)
+    try:
+        connection.buffer2 = decompress(protover, data, max_decompressed_size)  # type: ignore
+    except RemoteProtocolError:
+        raise
+    except Exception as e:
+        raise RemoteProtocolError from e
+    return _pack(connection.next_events())  # type: ignore
+
+
+class DecodePool:
+    """在进程池中解压和解码 Connection(offload=True) 返回的 CompressedPacket，本进程只解析封包头部
+
+    同一个 key（如房间号）的事件按 submit 的顺序由 poll() 以 (key, 事件, 异常) 交付，不同 key 之间互不等待；
+    某个 key 的包解码失败时，异常与失败前的事件一起交付，该 key 其后排队的内容被丢弃
+    """
+
+    executor: Executor
+    owned: bool
+    """executor 是否由本对象创建，close() 时关闭"""
+    lazy: bool
+    commands: frozenset[str] | None
+    max_decompressed_size: int | None
+    queues: dict[Hashable, deque[Future[list[tuple[Any, Any]]] | list[Any]]]
+    """每个 key 按顺序排队的解码任务和本进程的事件"""
+    submitted: asyncio.Event
+
+    def __init__(
+        self,
+        workers: int | None = None,
+        *,
+        executor: Executor | None = None,
+        lazy: bool = False,
+        commands: Iterable[str] | None = None,
+        max_decompressed_size: int | None = None,
+    ) -> None:
+        self.owned = executor is None
+        self.executor = ProcessPoolExecutor(workers) if executor is None else executor
+        self.lazy = lazy
+        self.commands = None if commands is None else frozenset(commands)
+        self.max_decompressed_size = max_decompressed_size
+        self.queues = {}
+        self.submitted = asyncio.Event()
+
+    def submit(self, key: Hashable, events: Iterable[Any]) -> None:
+        queue = self.queues.setdefault(key, deque())
+        for event in events:
+            if isinstance(event, CompressedPacket):
+                queue.append(
+                    self.executor.submit(
+                        _decode,
+                        event.protover,
+                        event.data,
+                        self.lazy,
+                        self.commands,
+                        self.max_decompressed_size,
+                    )
+                )
+            elif queue and isinstance(queue[-1], list):
+                queue[-1].append(event)
+            else:
+                queue.append([event])
+        self.submitted.set()
+
+    def poll(self) -> list[tuple[Hashable, list[Any], BaseException | None]]:
+        result = []
+        for key, queue in list(self.queues.items()):
+            events: list[Any] = []
+            error = None
+            while queue:
+                match queue[0]:
+                    case list() as ready:
+                        events += ready
+                    case future if future.done():
+                        try:
+                            for run in future.result():
+                                events += _unpack(*run)
+                        except Exception as e:  # the connection is broken anyway
+                            error = e
+                            queue.clear()
+                            break
+                    case _:
+                        break
+                queue.popleft()
+            if events or error is not None:
+                result.append((key, events, error))
+            if not queue:
+                del self.queues[key]
+        return result
+
+    def drain(
+        self, timeout: float | None = None
+    ) -> list[tuple[Hashable, list[Any], BaseException | None]]:
+        _wait(
+            [
+                item
+                for queue in self.queues.values()
+                for item in queue
+                if isinstance(item, Future)
+            ],
+            timeout,
+        )
+        return self.poll()
+
+    async def wait(self) -> None:
+        # with nothing queued there is nothing to poll until the next submit
+        while not self.queues:
+            self.submitted.clear()
+            await self.submitted.wait()
+        # only the head of each queue can make events deliverable
+        heads = [
+            asyncio.wrap_future(queue[0])
+            for queue in self.queues.values()
+            if queue and isinstance(queue[0], Future)
+        ]
+        if len(heads) == len(self.queues):
+            await asyncio.wait(heads, return_when=FIRST_COMPLETED)
+
+    def close(self) -> None:
+        if self.owned:
+            self.executor.shutdown()
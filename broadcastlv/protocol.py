@@ -0,0 +1,162 @@
+from __future__ import annotations
+
+import asyncio
+from concurrent.futures import Future
+from typing import Any, Callable, Generic, TypeVar
+
+from .connection import ClientConnection, ConnectionState, ServerConnection
+from .event import AuthResponse, ConnectionClosed, Event
+from .exception import RemoteProtocolError
+
+__all__ = [
+    "ConnectionProtocol",
+]
+
+_C = TypeVar("_C", ClientConnection, ServerConnection)
+
+
+class ConnectionProtocol(asyncio.BufferedProtocol, Generic[_C]):
+    """把 Connection 接到 asyncio 传输上，内核直接写入 Connection 的接收缓冲区
+
+    给定 on_event 时每个事件都会传给它，否则可以用 async for 逐个取出事件；
+    两种方式最后都会收到 ConnectionClosed，出错时异常保存在 exception 中
+    """
+
+    connection: _C
+    on_event: Callable[[Event | ConnectionClosed], Any] | None
+    transport: asyncio.Transport | None
+    events: asyncio.Queue[Event | ConnectionClosed]
+    closed: bool
+    exception: BaseException | None
+    waiting: Future[bytes] | None
+    """Connection 在 executor 中解压的正文，完成后再次分发事件"""
+
+    def __init__(
+        self,
+        connection: _C,
+        on_event: Callable[[Event | ConnectionClosed], Any] | None = None,
+    ) -> None:
+        self.connection = connection
+        self.on_event = on_event
+        self.transport = None
+        self.events = asyncio.Queue()
+        self.closed = False
+        self.exception = None
+        self.waiting = None
+
+    def connection_made(self, transport: asyncio.BaseTransport) -> None:
+        self.transport = transport  # type: ignore
+
+    def get_buffer(self, sizehint: int) -> memoryview:
+        return self.connection.get_buffer(sizehint)
+
+    def buffer_updated(self, nbytes: int) -> None:
+        try:
+            self.connection.buffer_updated(nbytes)
+        except RemoteProtocolError as e:
+            self._fail(e)
+        else:
+            self._dispatch()
+
+    def eof_received(self) -> bool:
+        self.connection.receive_data(b"")
+        self._dispatch()
+        return False
+
+    def connection_lost(self, exc: Exception | None) -> None:
+        if self.closed:
+            return
+        if exc is not None:
+            self._fail(exc)
+        else:
+            self.connection.receive_data(b"")
+            self._dispatch()
+
+    def send(self, event: Any, *args: Any, **kwargs: Any) -> None:
+        if (data := self.connection.send(event, *args, **kwargs)) is not None:
+            self.transport.write(data)  # type: ignore
+        if ConnectionState.CLOSED in self.connection.state:
+            self._close()
+        elif isinstance(event, AuthResponse):
+            # a server batch stops at the Auth, what was pipelined after it is read now
+            asyncio.get_running_loop().call_soon(self._resume)
+
+    def _dispatch(self) -> None:
+        try:
+            events = self.connection.next_events()
+        except RemoteProtocolError as e:
+            self._fail(e)
+            return
+
+        for event in events:
+            if isinstance(event, ConnectionClosed):
+                break
+            self._deliver(event)
+        if (pending := self.connection.pending) is not None:
+            # other connections keep running while a worker inflates the packet
+            if pending is not self.waiting:
+                self.waiting = pending
+                loop = asyncio.get_running_loop()
+                pending.add_done_callback(
+                    lambda _: loop.call_soon_threadsafe(self._resume)
+                )
+        elif ConnectionState.CLOSED in self.connection.state:
+            self._close()
+
+    def _resume(self) -> None:
+        if not self.closed:
+            self._dispatch()
+
+    def _deliver(self, event: Event | ConnectionClosed) -> None:
+        if self.on_event is None:
+            self.events.put_nowait(event)
+        else:
+            self.on_event(event)
+
+    def _fail(self, exc: BaseException) -> None:
+        self.exception = exc
+        self._close()
+
+    def _close(self) -> None:
+        if self.closed:
+            return
+        self.closed = True
+        if self.transport is not None:
+            self.transport.close()
+        self._deliver(ConnectionClosed())
+
+    def __aiter__(self) -> ConnectionProtocol[_C]:
+        return self
+
+    async def __anext__(self) -> Event:
+        if isinstance(event := await self.events.get(), ConnectionClosed):
+            self.events.put_nowait(event)
+            if self.exception is not None:
+                raise self.exception
+            raise StopAsyncIteration
+        return event
+
+
+class _SharedBufferProtocol(ConnectionProtocol[_C]):
+    # many connections read into one scratch buffer, each keeps only its partial frames
+    buffer: bytearray
+
+    def __init__(
+        self,
+        connection: _C,
+        on_event: Callable[[Event | ConnectionClosed], Any] | None,
+        buffer: bytearray,
+    ) -> None:
+        super().__init__(connection, on_event)
+        self.buffer = buffer
+
+    def get_buffer(self, sizehint: int) -> memoryview:
+        return memoryview(self.buffer)
+
+    def buffer_updated(self, nbytes: int) -> None:
+        try:
+            self.connection.receive_data(memoryview(self.buffer)[:nbytes])
+        except RemoteProtocolError as e:
+            self._fail(e)
+        else:
+            self._dispatch()
@@ -0,0 +1,97 @@
+from __future__ import annotations
+
+import struct
+from array import array
+from typing import Any, NamedTuple
+
+from .exception import RemoteProtocolError
+from .header import HeaderStruct
+from .util import _numpy
+
+__all__ = [
+    "Frames",
+    "scan_frames",
+]
+
+_size_struct = struct.Struct(">I")
+
+
+class Frames(NamedTuple):
+    """封包边界与头部字段，安装了 NumPy 时为 ndarray，否则为 array.array"""
+
+    offset: Any
+    """封包在缓冲区中的起始位置"""
+    size: Any
+    """同 Header.size"""
+    protover: Any
+    """同 Header.protover"""
+    op: Any
+    """同 Header.op"""
+    end: int
+    """已扫描部分的结束位置，其后为不完整的封包"""
+
+    def __len__(self) -> int:
+        return len(self.offset)
+
+    def where(self, protover: int | None = None, op: int | None = None) -> Any:
+        if not isinstance(self.offset, array):
+            np = _numpy()
+            mask = np.ones(len(self.offset), dtype=bool)
+            if protover is not None:
+                mask &= self.protover == protover
+            if op is not None:
+                mask &= self.op == op
+            return np.flatnonzero(mask)
+        return array(
+            "Q",
+            (
+                i
+                for i in range(len(self.offset))
+                if (protover is None or self.protover[i] == protover)
+                and (op is None or self.op[i] == op)
+            ),
+        )
+
+
+def scan_frames(buffer: bytes, offset: int = 0, *, numpy: bool = True) -> Frames:
+    offsets = array("Q")
+    unpack_from = _size_struct.unpack_from
+    end = len(buffer)
+    while offset + HeaderStruct.size <= end:
+        (size,) = unpack_from(buffer, offset)
+        if size < HeaderStruct.size:
+            raise RemoteProtocolError(f"Invalid packet size: {size}")
+        if offset + size > end:
+            break
+        offsets.append(offset)
+        offset += size
+
+    if numpy and (np := _numpy()) is not None:
+        header_dtype = np.dtype(
+            [
+                ("size", ">u4"),
+                ("header_size", ">u2"),
+                ("protover", ">u2"),
+                ("op", ">u4"),
+                ("seq", ">u4"),
+            ]
+        )
+        starts = np.frombuffer(offsets, dtype=np.uint64).astype(np.intp)
+        headers = np.frombuffer(buffer, dtype=np.uint8)[
+            starts[:, None] + np.arange(HeaderStruct.size)
+        ].view(header_dtype)[:, 0]
+        return Frames(
+            starts,
+            headers["size"].astype(np.uint32),
+            headers["protover"].astype(np.uint16),
+            headers["op"].astype(np.uint32),
+            offset,
+        )
+
+    sizes, protovers, ops = array("I"), array("H"), array("I")
+    for start in offsets:
+        size, _, protover, op, _ = HeaderStruct.unpack_from(buffer, start)
+        sizes.append(size)
+        protovers.append(protover)
+        ops.append(op)
+    return Frames(offsets, sizes, protovers, ops, offset)
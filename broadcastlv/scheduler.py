@@ -0,0 +1,147 @@
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from typing import Literal
+
+from .compression import AdaptiveCompression
+from .connection import ConnectionState, ServerConnection
+from .event import Command, LazyCommand
+from .exception import LocalProtocolError
+from .hub import BroadcastHub
+
+__all__ = [
+    "Coalescer",
+    "CoalescerMetrics",
+]
+
+
+@dataclass
+class CoalescerMetrics:
+    """合并发送的统计"""
+
+    batches: int = 0
+    commands: int = 0
+    size: int = 0
+    """压缩前的总大小"""
+    delay: float = 0.0
+    """所有命令的排队时间之和（秒）"""
+    max_delay: float = 0.0
+    size_flushes: int = 0
+    """因达到大小阈值而发送的批次数"""
+    deadline_flushes: int = 0
+    """因达到延迟期限而发送的批次数"""
+
+    @property
+    def mean_batch(self) -> float:
+        return self.commands / self.batches if self.batches else 0.0
+
+    @property
+    def mean_delay(self) -> float:
+        return self.delay / self.commands if self.commands else 0.0
+
+
+@dataclass
+class _Queue:
+    deadline: float
+    events: list[bytes] = field(default_factory=list)
+    times: list[float] = field(default_factory=list)
+    size: int = 0
+
+
+class Coalescer:
+    """按连接（或给定 hub 时按房间）合并命令，达到大小阈值或延迟期限时发送一个封包
+
+    不读取时钟，由调用方传入单调递增的当前时间，可用 deadline() 设置下一次 poll() 的定时器；
+    给定 hub 时各订阅者使用其在 hub 中登记的 protover
+    """
+
+    max_size: int
+    max_delay: float
+    protover: Literal[0, 2, 3] | AdaptiveCompression
+    hub: BroadcastHub | None
+    queues: dict[ServerConnection | int, _Queue]
+    metrics: CoalescerMetrics
+
+    def __init__(
+        self,
+        max_size: int = 16384,
+        max_delay: float = 0.05,
+        protover: Literal[0, 2, 3] | AdaptiveCompression = 3,
+        *,
+        hub: BroadcastHub | None = None,
+    ) -> None:
+        self.max_size = max_size
+        self.max_delay = max_delay
+        self.protover = protover
+        self.hub = hub
+        self.queues = {}
+        self.metrics = CoalescerMetrics()
+
+    def add(
+        self,
+        target: ServerConnection | int,
+        event: Command | LazyCommand | bytes,
+        now: float,
+    ) -> list[tuple[ServerConnection, bytes]]:
+        if self.hub is None:
+            if ConnectionState.CLOSED in target.state:  # type: ignore
+                raise LocalProtocolError("Connection is closed")
+            if ConnectionState.AUTHENTICATED not in target.state:  # type: ignore
+                raise LocalProtocolError("Connection is not authenticated")
+
+        match event:
+            case Command() | LazyCommand():
+                data = bytes(event)
+            case bytes():
+                data = event
+            case _:
+                raise LocalProtocolError(f"Unknown event: {type(event).__name__}")
+
+        if (queue := self.queues.get(target)) is None:
+            queue = self.queues[target] = _Queue(now + self.max_delay)
+        queue.events.append(data)
+        queue.times.append(now)
+        queue.size += len(data)
+        if queue.size < self.max_size:
+            return []
+        self.metrics.size_flushes += 1
+        return self._flush(target, now)
+
+    def deadline(self) -> float | None:
+        # queues are created in time order and removed when flushed
+        if not self.queues:
+            return None
+        return next(iter(self.queues.values())).deadline
+
+    def poll(self, now: float) -> list[tuple[ServerConnection, bytes]]:
+        result = []
+        while self.queues:
+            target, queue = next(iter(self.queues.items()))
+            if queue.deadline > now:
+                break
+            self.metrics.deadline_flushes += 1
+            result += self._flush(target, now)
+        return result
+
+    def flush(self, now: float) -> list[tuple[ServerConnection, bytes]]:
+        result = []
+        for target in list(self.queues):
+            result += self._flush(target, now)
+        return result
+
+    def _flush(
+        self, target: ServerConnection | int, now: float
+    ) -> list[tuple[ServerConnection, bytes]]:
+        queue = self.queues.pop(target)
+        metrics = self.metrics
+        metrics.batches += 1
+        metrics.commands += len(queue.events)
+        metrics.size += queue.size
+        metrics.delay += now * len(queue.times) - sum(queue.times)
+        metrics.max_delay = max(metrics.max_delay, now - queue.times[0])
+
+        if self.hub is not None:
+            return self.hub.broadcast(target, queue.events)  # type: ignore
+        if ConnectionState.CLOSED in target.state:  # type: ignore
+            return []
+        return [(target, bytes(target.multi_send(queue.events, self.protover)))]  # type: ignore
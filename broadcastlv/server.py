@@ -0,0 +1,151 @@
+from __future__ import annotations
+
+import asyncio
+from typing import Any, Callable, Iterable
+
+from .connection import ServerConnection
+from .event import (
+    Auth,
+    AuthResponse,
+    Command,
+    ConnectionClosed,
+    Event,
+    Heartbeat,
+    HeartbeatResponse,
+    LazyCommand,
+)
+from .hub import BroadcastHub
+from .protocol import _SharedBufferProtocol
+
+__all__ = [
+    "Server",
+]
+
+
+class _ServerProtocol(_SharedBufferProtocol[ServerConnection]):
+    roomid: int | None
+    last_seen: float
+
+
+class Server:
+    """asyncio 服务端，每个客户端一个 ServerConnection，自动回复认证和心跳，并把房间的命令转发给订阅的客户端
+
+    所有客户端共用一个接收缓冲区和一个超时检查定时器，超过 timeout 秒没有收到认证或心跳的客户端、
+    发送缓冲区超过 max_write_buffer_size 的客户端会被断开
+    """
+
+    hub: BroadcastHub
+    authenticate: Callable[[Auth], int] | None
+    """返回认证包回复的 code，0 表示成功；为 None 时接受所有认证"""
+    popularity: Callable[[int], int] | None
+    """返回房间的人气值；为 None 时使用房间的订阅数"""
+    timeout: float
+    max_write_buffer_size: int
+    kwargs: dict[str, Any]
+    """创建 ServerConnection 时的参数"""
+    clients: dict[ServerConnection, _ServerProtocol]
+    buffer: bytearray
+    server: asyncio.Server | None
+    timer: asyncio.TimerHandle | None
+
+    def __init__(
+        self,
+        authenticate: Callable[[Auth], int] | None = None,
+        popularity: Callable[[int], int] | None = None,
+        *,
+        timeout: float = 70.0,
+        max_write_buffer_size: int = 1 << 20,
+        max_packet_size: int = 1 << 12,
+        buffer_size: int = 1 << 16,
+        **kwargs: Any,
+    ) -> None:
+        self.hub = BroadcastHub()
+        self.authenticate = authenticate
+        self.popularity = popularity
+        self.timeout = timeout
+        self.max_write_buffer_size = max_write_buffer_size
+        self.kwargs = {"max_packet_size": max_packet_size, **kwargs}
+        self.clients = {}
+        self.buffer = bytearray(buffer_size)
+        self.server = None
+        self.timer = None
+
+    async def start(
+        self, host: str | None = None, port: int = 0, **kwargs: Any
+    ) -> asyncio.Server:
+        loop = asyncio.get_running_loop()
+        self.server = await loop.create_server(self._protocol, host, port, **kwargs)
+        # a client is dropped between timeout and 1.5 * timeout after it was last seen
+        self.timer = loop.call_later(self.timeout / 2, self._sweep)
+        return self.server
+
+    async def close(self) -> None:
+        if self.timer is not None:
+            self.timer.cancel()
+            self.timer = None
+        for protocol in list(self.clients.values()):
+            protocol.send(ConnectionClosed())
+        if self.server is not None:
+            self.server.close()
+            await self.server.wait_closed()
+            self.server = None
+
+    def broadcast(
+        self, roomid: int, events: Iterable[Command | LazyCommand | bytes]
+    ) -> int:
+        count = 0
+        for connection, data in self.hub.broadcast(roomid, events):
+            protocol = self.clients[connection]
+            if protocol.transport.get_write_buffer_size() > self.max_write_buffer_size:  # type: ignore
+                protocol.send(ConnectionClosed())  # a slow reader must not pin memory
+                continue
+            protocol.transport.write(data)  # type: ignore
+            count += 1
+        return count
+
+    def _protocol(self) -> _ServerProtocol:
+        connection = ServerConnection(**self.kwargs)
+        protocol = _ServerProtocol(
+            connection, lambda event: self._on_event(protocol, event), self.buffer
+        )
+        protocol.roomid = None
+        protocol.last_seen = asyncio.get_running_loop().time()
+        self.clients[connection] = protocol
+        return protocol
+
+    def _on_event(
+        self, protocol: _ServerProtocol, event: Event | ConnectionClosed
+    ) -> None:
+        match event:
+            case Heartbeat():
+                protocol.last_seen = asyncio.get_running_loop().time()
+                protocol.send(HeartbeatResponse(self._popularity(protocol.roomid), b""))  # type: ignore
+            case Auth(roomid, protover=protover):
+                protocol.last_seen = asyncio.get_running_loop().time()
+                code = 0 if self.authenticate is None else self.authenticate(event)
+                if code == 0:
+                    protocol.roomid = roomid
+                    # an unknown protover from the client is served uncompressed
+                    self.hub.subscribe(
+                        roomid,
+                        protocol.connection,
+                        protover if protover in (2, 3) else 0,
+                    )
+                protocol.send(AuthResponse(code))
+            case _:  # ConnectionClosed
+                del self.clients[protocol.connection]
+                if protocol.roomid is not None:
+                    self.hub.unsubscribe(protocol.roomid, protocol.connection)
+
+    def _popularity(self, roomid: int) -> int:
+        if self.popularity is not None:
+            return self.popularity(roomid)
+        return len(self.hub.rooms.get(roomid, ()))
+
+    def _sweep(self) -> None:
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() - self.timeout
+        for protocol in list(self.clients.values()):
+            if protocol.last_seen < deadline:
+                protocol.send(ConnectionClosed())
+        self.timer = loop.call_later(self.timeout / 2, self._sweep)
@@ -1,7 +1,8 @@
 from __future__ import annotations
 
 import re
-from typing import TYPE_CHECKING, TypeVar
+from functools import cache
+from typing import TYPE_CHECKING, Any, TypeVar
 
 import msgspec
 
@@ -9,6 +10,7 @@ __all__ = [
     "add_from_bytes",
     "pascal_to_snake",
     "pascal_to_upper_snake",
+    "scan_cmd",
 ]
 
 
@@ -29,3 +31,22 @@ def pascal_to_upper_snake(name: str) -> str:
 
 def pascal_to_snake(name: str) -> str:
     return re.sub(r"(?<!^)(?=[A-Z])", "_", name).lower()
+
+
+_cmd_pattern = re.compile(rb'\{"cmd":"([^"\\]*)"')
+
+
+def scan_cmd(data: bytes) -> str | None:
+    if match := _cmd_pattern.match(data):
+        return match[1].decode()
+    return None
+
+
+@cache
+def _numpy() -> Any:
+    # imported on first use only, it would triple the import time of the package
+    try:
+        import numpy
+    except ImportError:
+        return None
+    return numpy
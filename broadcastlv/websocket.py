@@ -0,0 +1,226 @@
+from __future__ import annotations
+
+import os
+import struct
+from functools import partial
+from typing import Any, Callable, Generic, TypeVar
+
+from .connection import ClientConnection, Connection, ServerConnection
+from .event import ConnectionClosed
+from .exception import LocalProtocolError, RemoteProtocolError
+
+__all__ = [
+    "WebSocket",
+]
+
+_C = TypeVar("_C", Connection, ClientConnection, ServerConnection)
+
+_Short = struct.Struct(">H")
+_Long = struct.Struct(">Q")
+
+
+def _unmask(data: bytes | memoryview, key: bytes) -> bytes:
+    # one big-integer xor runs in C, a per-byte loop would not
+    size = len(data)
+    mask = (key * (size // 4 + 1))[:size]
+    return (int.from_bytes(data, "little") ^ int.from_bytes(mask, "little")).to_bytes(
+        size, "little"
+    )
+
+
+class WebSocket(Generic[_C]):
+    """RFC 6455 的帧层（不含 HTTP 握手），二进制消息的正文直接交给 Connection，send 的输出直接封装成帧
+
+    客户端发送的帧加掩码，服务端收到的帧去掩码；收到的 ping 和 close 的回复由 data_to_send() 取出
+    """
+
+    connection: _C
+    mask: bool
+    """发送的帧是否加掩码，默认客户端加、服务端不加；收到的帧必须与之相反"""
+    masking_key: Callable[[], bytes]
+    """返回 4 字节的掩码"""
+    buffer: bytearray
+    """不完整的帧头或控制帧"""
+    remaining: int
+    """当前数据帧还没收到的正文长度"""
+    key: bytes | None
+    """当前数据帧的掩码，已按收到的正文长度轮转"""
+    outgoing: bytearray
+    closed: bool
+    """是否已收到 close 帧"""
+    close_sent: bool
+    close_code: int | None
+    close_reason: str
+    read_buffer: bytearray
+
+    def __init__(
+        self,
+        connection: _C,
+        *,
+        mask: bool | None = None,
+        masking_key: Callable[[], bytes] = partial(os.urandom, 4),
+        read_size: int = 1 << 16,
+    ) -> None:
+        self.connection = connection
+        self.mask = isinstance(connection, ClientConnection) if mask is None else mask
+        self.masking_key = masking_key
+        self.buffer = bytearray()
+        self.remaining = 0
+        self.key = None
+        self.outgoing = bytearray()
+        self.closed = False
+        self.close_sent = False
+        self.close_code = None
+        self.close_reason = ""
+        self.read_buffer = bytearray(read_size)
+
+    def frame(self, data: bytes | bytearray | memoryview, opcode: int = 2) -> bytearray:
+        if self.close_sent:
+            raise LocalProtocolError("WebSocket is closed")
+        size = memoryview(data).nbytes
+        if size < 126:
+            frame = bytearray((0x80 | opcode, size))
+        elif size < 1 << 16:
+            frame = bytearray((0x80 | opcode, 126)) + _Short.pack(size)
+        else:
+            frame = bytearray((0x80 | opcode, 127)) + _Long.pack(size)
+        if self.mask:
+            frame[1] |= 0x80
+            frame += (key := self.masking_key())
+            frame += _unmask(data, key)
+        else:
+            frame += data
+        return frame
+
+    def send(self, event: Any, *args: Any, **kwargs: Any) -> bytearray:
+        if (data := self.connection.send(event, *args, **kwargs)) is None:
+            return self.close()
+        return self.frame(data)
+
+    def send_vectored(
+        self, event: Any, *args: Any, **kwargs: Any
+    ) -> list[bytes | bytearray | memoryview]:
+        if isinstance(event, ConnectionClosed):
+            self.connection.send(event)
+            return [self.close()]
+        parts = self.connection.send_vectored(event, *args, **kwargs)
+        if self.mask:
+            return [self.frame(b"".join(parts))]
+        # only the frame header is new, the payload parts are passed through
+        size = sum(memoryview(part).nbytes for part in parts)
+        header = self.frame(b"")
+        if size < 126:
+            header[1] = size
+        elif size < 1 << 16:
+            header[1:] = b"\x7e" + _Short.pack(size)
+        else:
+            header[1:] = b"\x7f" + _Long.pack(size)
+        return [header, *parts]
+
+    def ping(self, data: bytes = b"") -> bytearray:
+        return self.frame(data, 9)
+
+    def close(self, code: int = 1000, reason: str = "") -> bytearray:
+        frame = self.frame(_Short.pack(code) + reason.encode(), 8)
+        self.close_sent = True
+        return frame
+
+    def data_to_send(self) -> bytes:
+        data, self.outgoing = bytes(self.outgoing), bytearray()
+        return data
+
+    def get_buffer(self, sizehint: int = -1) -> memoryview:
+        return memoryview(self.read_buffer)
+
+    def buffer_updated(self, nbytes: int) -> None:
+        self.receive_data(memoryview(self.read_buffer)[:nbytes])
+
+    def receive_data(self, data: bytes | bytearray | memoryview) -> None:
+        if not data:
+            self.connection.receive_data(b"")
+            return
+        if self.closed:
+            raise RemoteProtocolError("Data after close frame")
+
+        if self.buffer:  # a frame header was split across reads
+            self.buffer += data
+            data, self.buffer = self.buffer, bytearray()
+        view = memoryview(data)
+        offset = 0
+        while offset < len(view):
+            if self.remaining:
+                size = min(self.remaining, len(view) - offset)
+                self._payload(view[offset : offset + size])
+                offset += size
+            elif (frame := self._header(view, offset)) is None:
+                self.buffer += view[offset:]
+                break
+            else:
+                offset = frame
+
+    def _header(self, view: memoryview, offset: int) -> int | None:
+        if len(view) - offset < 2:
+            return None
+        first, second = view[offset], view[offset + 1]
+        opcode = first & 0x0F
+        if first & 0x70:
+            raise RemoteProtocolError("Reserved bits are set")
+        if bool(second & 0x80) == self.mask:
+            raise RemoteProtocolError(
+                "Unexpected masked frame" if self.mask else "Unmasked frame"
+            )
+
+        start = offset + 2
+        size = second & 0x7F
+        if size == 126:
+            start += 2
+        elif size == 127:
+            start += 8
+        if second & 0x80:
+            start += 4
+        if len(view) < start:
+            return None
+        if size == 126:
+            (size,) = _Short.unpack_from(view, offset + 2)
+        elif size == 127:
+            (size,) = _Long.unpack_from(view, offset + 2)
+        key = bytes(view[start - 4 : start]) if second & 0x80 else None
+
+        match opcode:
+            case 0 | 2:
+                self.remaining = size
+                self.key = key
+                return start
+            case 8 | 9 | 10:
+                if size > 125 or not first & 0x80:
+                    raise RemoteProtocolError("Invalid control frame")
+                if len(view) < start + size:
+                    return None
+                payload = view[start : start + size]
+                self._control(opcode, payload if key is None else _unmask(payload, key))
+                return start + size
+            case _:
+                raise RemoteProtocolError(f"Unexpected opcode: {opcode}")
+
+    def _payload(self, data: memoryview) -> None:
+        self.remaining -= len(data)
+        if self.key is not None:
+            key = self.key
+            data = _unmask(data, key)  # type: ignore
+            shift = len(data) % 4
+            self.key = key[shift:] + key[:shift]
+        self.connection.receive_data(data)
+
+    def _control(self, opcode: int, payload: bytes | memoryview) -> None:
+        match opcode:
+            case 8:
+                self.closed = True
+                if len(payload) >= 2:
+                    (self.close_code,) = _Short.unpack_from(payload)
+                    self.close_reason = bytes(payload[2:]).decode(errors="replace")
+                if not self.close_sent:
+                    self.outgoing += self.close(self.close_code or 1000)
+                self.connection.receive_data(b"")
+            case 9:
+                if not self.close_sent:
+                    self.outgoing += self.frame(payload, 10)
@@ -0,0 +1,54 @@
+import zlib
+
+import brotli
+import pytest
+
+from broadcastlv.cache import PacketCache
+from broadcastlv.connection import connect
+from broadcastlv.event import Command
+from broadcastlv.exception import RemoteProtocolError
+
+
+def test_packet_cache():
+    cache = PacketCache(2)
+    assert cache.decompress(2, zlib.compress(b"a")) == b"a"
+    assert cache.decompress(3, brotli.compress(b"b")) == b"b"
+    assert cache.decompress(2, zlib.compress(b"a")) == b"a"
+    assert (cache.hits, cache.misses) == (1, 2)
+
+    assert cache.decompress(2, zlib.compress(b"c")) == b"c"
+    assert len(cache.entries) == 2
+    assert cache.decompress(3, brotli.compress(b"b")) == b"b"
+    assert (cache.hits, cache.misses) == (1, 4)
+
+    with pytest.raises(RemoteProtocolError, match="Decompressed size 1 exceeds 0"):
+        cache.decompress(2, zlib.compress(b"c"), 0)
+
+    cache.clear()
+    assert (cache.hits, cache.misses, len(cache.entries), cache.nbytes) == (0, 0, 0, 0)
+
+
+def test_packet_cache_maxbytes():
+    cache = PacketCache(maxbytes=8)
+    assert cache.decompress(2, zlib.compress(b"aaaa")) == b"aaaa"
+    assert cache.decompress(2, zlib.compress(b"bbb")) == b"bbb"
+    assert cache.nbytes == 7
+
+    assert cache.decompress(2, zlib.compress(b"cc")) == b"cc"
+    assert list(cache.entries.values()) == [b"bbb", b"cc"]
+    assert cache.nbytes == 5
+
+    # too large to be cached at all
+    assert cache.decompress(2, zlib.compress(b"d" * 9)) == b"d" * 9
+    assert list(cache.entries.values()) == [b"bbb", b"cc"]
+    assert (cache.hits, cache.misses) == (0, 4)
+
+
+def test_shared_cache():
+    cache = PacketCache()
+    packet = b"\x00\x00\x001\x00\x10\x00\x02\x00\x00\x00\x05\x00\x00\x00\x00x\x9cc``\x90c\x10`\x00\x01V\x10Q\xad\x94\x9c\x9b\xa2d\xa5\x14\xe2\x1a\x1c\xa2T\x0b\x00%0\x04b"
+    for _ in range(3):
+        conn = connect(cache=cache)
+        conn.receive_data(packet)
+        assert conn.next_events() == [Command("TEST")]
+    assert (cache.hits, cache.misses) == (2, 1)
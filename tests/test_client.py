@@ -0,0 +1,226 @@
+import asyncio
+import socket
+
+import pytest
+
+from broadcastlv.client import Client, _backoff
+from broadcastlv.connection import ConnectionState, ServerConnection
+from broadcastlv.event import (
+    Auth,
+    AuthResponse,
+    Command,
+    ConnectionClosed,
+    Heartbeat,
+    HeartbeatResponse,
+)
+from broadcastlv.protocol import ConnectionProtocol
+
+
+def test_client():
+    async def main():
+        servers: list[ConnectionProtocol[ServerConnection]] = []
+
+        def factory():
+            protocol = ConnectionProtocol(
+                ServerConnection(), lambda event: on_event(protocol, event)
+            )
+            servers.append(protocol)
+            return protocol
+
+        def on_event(protocol, event):
+            match event:
+                case Auth():
+                    protocol.send(AuthResponse(0))
+                    protocol.send(Command("TEST"))
+                case Heartbeat():
+                    protocol.send(HeartbeatResponse(len(servers), b""))
+                    if len(servers) == 1:  # drop the first connection
+                        protocol.send(ConnectionClosed())
+
+        loop = asyncio.get_running_loop()
+        server = await loop.create_server(factory, "127.0.0.1", 0)
+        events = []
+
+        def on_client_event(event):
+            events.append(event)
+            if event == HeartbeatResponse(2, b""):
+                # a heartbeat due after the connection closed is not sent, marked
+                # here while no heartbeat is waiting for its response
+                client.protocol.connection.state |= ConnectionState.CLOSED
+
+        client = Client(
+            *server.sockets[0].getsockname(),
+            Auth(1),
+            on_client_event,
+            heartbeat_interval=0.01,
+            # reconnect at once after the first drop, any later reconnect waits long
+            # enough for close() to cancel it
+            jitter=lambda: 0 if len(servers) < 2 else 1,
+        )
+        task = asyncio.create_task(client.run())
+        while len(events) < 6:
+            await asyncio.sleep(0.01)
+        await asyncio.sleep(0.02)
+        client.close()
+        await task
+
+        assert len(servers) == 2
+        assert events[:6] == [
+            AuthResponse(0),
+            Command("TEST"),
+            HeartbeatResponse(1, b""),
+            AuthResponse(0),
+            Command("TEST"),
+            HeartbeatResponse(2, b""),
+        ]
+        assert client.popularity == 2
+        assert client.attempts == 0
+        assert client.protocol is None
+
+        server.close()
+        await server.wait_closed()
+
+    asyncio.run(main())
+
+
+def test_client_rejected():
+    async def main():
+        servers = []
+
+        def factory():
+            protocol = ConnectionProtocol(
+                ServerConnection(), lambda event: on_event(protocol, event)
+            )
+            servers.append(protocol)
+            return protocol
+
+        def on_event(protocol, event):
+            if isinstance(event, Auth):  # only the first connection is accepted
+                protocol.send(AuthResponse(0 if len(servers) == 1 else 1))
+            else:
+                protocol.send(ConnectionClosed())
+
+        loop = asyncio.get_running_loop()
+        server = await loop.create_server(factory, "127.0.0.1", 0)
+        client = Client(*server.sockets[0].getsockname(), Auth(1), jitter=lambda: 0)
+        task = asyncio.create_task(client.run())
+        while client.attempts < 2:
+            await asyncio.sleep(0.01)
+        client.close()
+        await task
+        assert len(servers) >= 3
+        assert client.popularity is None
+
+        server.close()
+        await server.wait_closed()
+
+    asyncio.run(main())
+
+
+def test_client_backoff():
+    async def main():
+        with socket.socket() as sock:
+            sock.bind(("127.0.0.1", 0))
+            address = sock.getsockname()
+        client = Client(*address, Auth(1), jitter=lambda: 0)
+        task = asyncio.create_task(client.run())
+        while client.attempts < 3:
+            await asyncio.sleep(0)
+        client.close()
+        await task
+
+    asyncio.run(main())
+
+    client = Client("", 0, Auth(1), min_backoff=1, max_backoff=5, jitter=lambda: 0.5)
+    delays = []
+    for client.attempts in range(5):
+        delays.append(client.backoff())
+    assert delays == [0.5, 1, 2, 2.5, 2.5]
+    assert _backoff(1100, 1, 5, lambda: 1) == 5
+
+
+def test_client_close():
+    async def main():
+        with socket.socket() as sock:
+            sock.bind(("127.0.0.1", 0))
+            address = sock.getsockname()
+
+        # close() while connecting
+        client = Client(*address, Auth(1))
+        task = asyncio.create_task(client.run())
+        await asyncio.sleep(0)
+        assert client.pending is not None
+        client.close()
+        await asyncio.wait_for(task, 1)
+        assert client.attempts == 0
+
+        # close() while waiting to reconnect
+        sleeping = asyncio.Event()
+        client = Client(
+            *address, Auth(1), min_backoff=60, jitter=lambda: sleeping.set() or 1
+        )
+        task = asyncio.create_task(client.run())
+        await sleeping.wait()
+        client.close()
+        await asyncio.wait_for(task, 1)
+        assert (client.attempts, client.pending) == (0, None)
+
+        # cancellation from elsewhere still propagates
+        client = Client(*address, Auth(1))
+        task = asyncio.create_task(client.run())
+        await asyncio.sleep(0)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(main())
+
+
+def test_client_close_late(monkeypatch):
+    async def main():
+        with socket.socket() as sock:
+            sock.bind(("127.0.0.1", 0))
+            address = sock.getsockname()
+        loop = asyncio.get_running_loop()
+        client = Client(*address, Auth(1))
+
+        async def sleep(delay):
+            # runs after the sleep completed, too late to cancel it
+            loop.call_soon(client.close)
+
+        monkeypatch.setattr(asyncio, "sleep", sleep)
+        await asyncio.wait_for(client.run(), 1)
+        assert client.attempts == 1
+
+    asyncio.run(main())
+
+
+def test_client_close_connected():
+    async def main():
+        servers = []
+        loop = asyncio.get_running_loop()
+        server = await loop.create_server(
+            lambda: servers.append(ConnectionProtocol(ServerConnection()))
+            or servers[-1],
+            "127.0.0.1",
+            0,
+        )
+        client = Client(*server.sockets[0].getsockname(), Auth(1))
+        create_connection = loop.create_connection
+
+        async def connect(*args, **kwargs):
+            result = await create_connection(*args, **kwargs)
+            # runs after the connect completed, too late to cancel it
+            loop.call_soon(client.close)
+            return result
+
+        loop.create_connection = connect  # type: ignore
+        await asyncio.wait_for(client.run(), 1)
+        assert client.protocol is None
+        await asyncio.sleep(0.01)
+        assert servers[0].closed
+
+        server.close()
+        await server.wait_closed()
+
+    asyncio.run(main())
@@ -1,3 +1,6 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
+
 import pytest
 
 from broadcastlv.connection import (
@@ -6,12 +9,22 @@ from broadcastlv.connection import (
     ConnectionState,
     connect,
 )
-from broadcastlv.event import Auth, Command, ConnectionClosed, Heartbeat
+from broadcastlv.event import (
+    Auth,
+    AuthResponse,
+    Command,
+    ConnectionClosed,
+    Heartbeat,
+    HeartbeatResponse,
+    LazyCommand,
+    NeedData,
+)
 from broadcastlv.exception import LocalProtocolError, RemoteProtocolError
 
 
 def test_init():
     assert type(connect(ConnectionRole.CLIENT)) is ClientConnection
+    assert not hasattr(ClientConnection(), "multi_send")
 
 
 def test_send():
@@ -35,7 +48,9 @@ def test_send():
         b'\x00\x00\x00\x1a\x00\x10\x00\x01\x00\x00\x00\x08\x00\x00\x00\x00{"code":0}'
     )
     conn.next_event()
-    conn.send(Heartbeat(b""))
+    assert conn.send(Heartbeat(b"")) is conn.send(Heartbeat(b""))
+    buffer = bytearray()
+    assert conn.send(Heartbeat(b""), buffer=buffer) is buffer
     conn.send(b"", 0, 0)
     with pytest.raises(LocalProtocolError, match="Connection is already authenticated"):
         conn.send(Auth(0))
@@ -43,12 +58,33 @@ def test_send():
         conn.send(Command("TEST"))  # type: ignore
 
 
+def test_send_vectored():
+    conn = ClientConnection()
+
+    header, body = conn.send_vectored(b"test", op=2)
+    assert header == b"\x00\x00\x00\x14\x00\x10\x00\x01\x00\x00\x00\x02\x00\x00\x00\x00"
+    assert body == b"test"
+    with pytest.raises(LocalProtocolError, match="Connection is not authenticated"):
+        conn.send_vectored(Heartbeat(b""))
+
+    conn.send_vectored(ConnectionClosed())
+    with pytest.raises(LocalProtocolError, match="Connection is closed"):
+        conn.send_vectored(b"test", op=2)
+
+
 def test_receive_data():
     conn = ClientConnection()
     conn.receive_data(b"")
     conn.receive_data(b"")
     with pytest.raises(RemoteProtocolError, match="Connection is closed"):
         conn.receive_data(b"test")
+    with pytest.raises(RemoteProtocolError, match="Connection is closed"):
+        conn.buffer_updated(4)
+
+    conn = ClientConnection()
+    conn.get_buffer(4)[:] = b"test"
+    conn.buffer_updated(4)
+    assert conn.end1 == 4
 
 
 def test_next_event():
@@ -118,3 +154,62 @@ def test_next_event():
     conn = ClientConnection()
     conn.send(ConnectionClosed())
     assert conn.next_event() == ConnectionClosed()
+
+
+def test_next_events():
+    conn = ClientConnection()
+    conn.send(Auth(0))
+    conn.receive_data(
+        b'\x00\x00\x00\x1a\x00\x10\x00\x01\x00\x00\x00\x08\x00\x00\x00\x00{"code":0}'
+        b"\x00\x00\x00\x18\x00\x10\x00\x01\x00\x00\x00\x03\x00\x00\x00\x00\x00\x01\xbfRtest"
+    )
+    assert conn.next_events() == [AuthResponse(0), HeartbeatResponse(114514, b"test")]
+    assert conn.state & ConnectionState.AUTHENTICATED
+
+    conn.receive_data(
+        b'\x00\x00\x00\x1e\x00\x10\x00\x00\x00\x00\x00\x05\x00\x00\x00\x00{"cmd":"TEST"}'
+    )
+    assert conn.next_events() == [Command("TEST")]
+
+    conn.receive_data(
+        b'\x00\x00\x00\x1e\x00\x10\x00\x00\x00\x00\x00\x05\x00\x00\x00\x00{"cmd":"TEST"}'
+        b"\x00\x00\x00\x14\x00\x10\x00\x01\x00\x00\x00\x02\x00\x00\x00\x00test"
+    )
+    with pytest.raises(RemoteProtocolError, match="Unknown event: Heartbeat"):
+        conn.next_events()
+    assert conn.state & ConnectionState.CLOSED
+
+    conn = ClientConnection(lazy=True)
+    conn.send(Auth(0))
+    conn.receive_data(
+        b'\x00\x00\x00\x1a\x00\x10\x00\x01\x00\x00\x00\x08\x00\x00\x00\x00{"code":0}'
+        b'\x00\x00\x00\x1e\x00\x10\x00\x00\x00\x00\x00\x05\x00\x00\x00\x00{"cmd":"TEST"}'
+    )
+    assert conn.next_event() == AuthResponse(0)
+    assert conn.next_events() == [LazyCommand("TEST", b'{"cmd":"TEST"}')]
+
+    conn = ClientConnection()
+    conn.send(ConnectionClosed())
+    assert conn.next_events() == [ConnectionClosed()]
+
+
+def test_executor():
+    executor = ThreadPoolExecutor(1)
+    blocked = threading.Event()
+    executor.submit(blocked.wait)
+    conn = ClientConnection(executor=executor, executor_threshold=0)
+    conn.send(Auth(0))
+    conn.receive_data(
+        b'\x00\x00\x00\x1a\x00\x10\x00\x01\x00\x00\x00\x08\x00\x00\x00\x00{"code":0}'
+        b"\x00\x00\x00;\x00\x10\x00\x03\x00\x00\x00\x05\x00\x00\x00\x00\x1bY\x00\xe8\x9f\t\xbc\t\xeb2\xfa}@\xe3H\rP\xe0\xb1\xb7\x01 \x8a\xda\xb6\x08\xd5\x14\xd9\xd4\x19\xeb\x8b\xaf\xa2\xa5\x85\t\x04\xd7\x8f\xb6\x0c"
+    )
+    conn.receive_data(b"")
+    assert conn.next_events() == [AuthResponse(0)]
+    # the packet received before the close is still delivered
+    assert conn.next_events() == []
+    assert conn.next_event() == NeedData(0)
+    blocked.set()
+    wait([conn.pending])  # type: ignore
+    assert conn.next_events() == [Command("TEST")] * 3
+    assert conn.next_events() == [ConnectionClosed()]
+    executor.shutdown()
@@ -0,0 +1,46 @@
+import pytest
+
+from broadcastlv.columnar import decode_danmu_msgs
+from broadcastlv.event import LazyCommand
+from broadcastlv.exception import RemoteProtocolError
+
+DANMU_MSGS = [
+    b'{"cmd":"DANMU_MSG","info":[[0,1,25,16777215,1681234567890,1681234567,0,"abcdef01",0,0,0,"",0,"{}","{}"],"hello",[12345,"user",0,0,0,10000,1,""],[21,"medal","anchor",1000,398668,"",0,398668,398668,398668,3,1,54321],[20,0,6406234,">50000",0],["",""],0,3,null],"dm_v2":""}',
+    b'{"cmd":"DANMU_MSG","info":[[0,1,25,14893055,1681234567891,1681234567,0,"abcdef02",0,0,0,"",1,"{}","{}"],"[dog]",[67890,"other",0,0,0,10000,1,""],[],[5,0,6406234,">50000",0],["",""],0]}',
+]
+
+
+def test_decode_danmu_msgs():
+    table = decode_danmu_msgs(
+        [LazyCommand.from_bytes(DANMU_MSGS[0]), memoryview(DANMU_MSGS[1])],
+        numpy=False,
+    )
+    assert len(table) == 2
+    assert list(table.timestamp) == [1681234567890, 1681234567891]
+    assert list(table.uid) == [12345, 67890]
+    assert table.username == ["user", "other"]
+    assert table.content == ["hello", "[dog]"]
+    assert list(table.medal_level) == [21, 0]
+    assert list(table.user_level) == [20, 5]
+    assert list(table.guard_level) == [3, 0]
+    assert list(table.color) == [16777215, 14893055]
+    assert list(table.dm_type) == [0, 1]
+
+    assert len(decode_danmu_msgs([], numpy=False)) == 0
+
+    with pytest.raises(RemoteProtocolError):
+        decode_danmu_msgs([b'{"cmd":"DANMU_MSG","info":[]}'])
+    with pytest.raises(RemoteProtocolError):
+        decode_danmu_msgs([DANMU_MSGS[1].replace(b'"",1,"{}"', b'"",256,"{}"')])
+
+
+def test_decode_danmu_msgs_numpy():
+    np = pytest.importorskip("numpy")
+
+    table = decode_danmu_msgs(DANMU_MSGS)
+    assert isinstance(table.uid, np.ndarray)
+    assert table.uid.tolist() == [12345, 67890]
+    assert table.medal_level.dtype == np.uint16
+    assert table.username == ["user", "other"]
+    assert int(table.timestamp.max()) == 1681234567891
+    assert (table.medal_level > 0).sum() == 1
@@ -0,0 +1,129 @@
+import zlib
+
+import brotli
+import pytest
+
+from broadcastlv.compression import (
+    AdaptiveCompression,
+    CodecStats,
+    Compressor,
+    Decompressor,
+    decompress,
+)
+from broadcastlv.exception import RemoteProtocolError
+
+DATA = bytes(range(256)) * 64
+
+
+def read_all(decompressor: Decompressor) -> list[bytes]:
+    chunks = []
+    while not decompressor.finished:
+        chunks.append(decompressor.read())
+    return chunks
+
+
+def test_compressor():
+    for protover in (2, 3):
+        compressor = Compressor(protover)
+        data = b"".join(
+            compressor.write(DATA[i : i + 1000]) for i in range(0, len(DATA), 1000)
+        )
+        assert decompress(protover, data + compressor.flush()) == DATA
+
+    with pytest.raises(ValueError, match="Unknown protover: 1"):
+        Compressor(1)  # type: ignore
+
+
+def test_compressor_level():
+    for protover, fast, best in ((2, 1, 9), (3, 0, 11)):
+        sizes = []
+        for level in (fast, best):
+            compressor = Compressor(protover, level)
+            sizes.append(len(compressor.write(DATA * 4) + compressor.flush()))
+        assert sizes[0] > sizes[1]
+
+
+def test_codec_stats():
+    stats = CodecStats()
+    assert stats.ratio == stats.cost == 0.0
+    stats = CodecStats(2, 4000, 1000, 0.004)
+    assert stats.ratio == 4.0
+    assert stats.cost == 1e-6
+
+
+def test_adaptive_compression():
+    compression = AdaptiveCompression(1e-6, min_size=100, codecs=((3, 11), (2, 6)))
+    assert compression.select(99) == (0, None)
+    assert compression.select(1000) == (3, 11)
+
+    compression.record(3, 11, 1000, 100, 0.01)
+    assert compression.select(1000) == (2, 6)
+    compression.record(2, 6, 1000, 200, 0.0001)
+    assert compression.select(1000) == (2, 6)
+    compression.record(2, 6, 1000, 200, 0.01)
+    # nothing fits the budget, fall back to the cheapest codec
+    assert compression.select(1000) == (2, 6)
+    # costs are tracked separately per size class
+    assert compression.select(100_000) == (3, 11)
+    compression.record(3, 11, 100_000, 1000, 0.01)
+    assert compression.select(100_000) == (3, 11)
+
+    totals = compression.totals()
+    assert totals[3, 11] == CodecStats(2, 101_000, 1100, 0.02)
+    assert totals[2, 6] == CodecStats(2, 2000, 400, 0.0101)
+
+    compression.budget = None
+    assert compression.select(1000) == (3, 11)
+
+
+def test_decompressor():
+    chunks = read_all(Decompressor(2, zlib.compress(DATA), 1024))
+    assert b"".join(chunks) == DATA
+    assert max(map(len, chunks)) == 1024
+
+    assert b"".join(read_all(Decompressor(3, brotli.compress(DATA), 1024))) == DATA
+    # brotli reads are bounded by 2 * chunk_size + 32 KiB, not by chunk_size alone
+    for chunk_size in (16, 1 << 15, 1 << 16):
+        chunks = read_all(Decompressor(3, brotli.compress(bytes(1 << 20)), chunk_size))
+        assert max(map(len, chunks)) < 2 * chunk_size + (1 << 15)
+
+    with pytest.raises(ValueError, match="Unknown protover: 1"):
+        Decompressor(1, b"", 1024)  # type: ignore
+
+
+def test_decompressor_truncated():
+    with pytest.raises(RemoteProtocolError, match="Truncated compressed packet"):
+        read_all(Decompressor(2, zlib.compress(DATA)[:-8], 1024))
+
+    with pytest.raises(RemoteProtocolError, match="Truncated compressed packet"):
+        read_all(Decompressor(3, brotli.compress(DATA)[:-8], 1024))
+
+
+def test_decompressor_max_size():
+    decompressor = Decompressor(2, zlib.compress(DATA), 1024, len(DATA))
+    assert b"".join(read_all(decompressor)) == DATA
+    assert decompressor.size == len(DATA)
+
+    with pytest.raises(
+        RemoteProtocolError, match="Decompressed size 16384 exceeds 16383"
+    ):
+        read_all(Decompressor(2, zlib.compress(DATA), 16384, len(DATA) - 1))
+
+    # a bomb stops within a read past the limit instead of expanding fully
+    decompressor = Decompressor(3, brotli.compress(bytes(1 << 24)), 1 << 16, 1 << 20)
+    with pytest.raises(RemoteProtocolError, match="exceeds 1048576"):
+        read_all(decompressor)
+    assert decompressor.size < (1 << 20) + (1 << 17)
+
+
+def test_decompress():
+    assert decompress(2, zlib.compress(DATA)) == DATA
+    assert decompress(3, brotli.compress(DATA)) == DATA
+    assert decompress(2, zlib.compress(DATA), len(DATA)) == DATA
+    assert decompress(3, brotli.compress(DATA), len(DATA)) == DATA
+
+    with pytest.raises(RemoteProtocolError, match="exceeds 1024"):
+        decompress(2, zlib.compress(DATA), 1024)
+
+    with pytest.raises(ValueError, match="Unknown protover: 1"):
+        decompress(1, b"")  # type: ignore
@@ -1,6 +1,12 @@
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
+
 import pytest
 
-from broadcastlv.connection import Connection, connect
+from broadcastlv.cache import PacketCache
+from broadcastlv.compression import AdaptiveCompression
+from broadcastlv.connection import Connection, connect, encode_commands
 from broadcastlv.event import (
     Auth,
     AuthResponse,
@@ -8,6 +14,7 @@ from broadcastlv.event import (
     ConnectionClosed,
     Heartbeat,
     HeartbeatResponse,
+    LazyCommand,
     NeedData,
 )
 from broadcastlv.exception import LocalProtocolError, RemoteProtocolError
@@ -19,6 +26,18 @@ def test_init():
         connect(2)  # type: ignore
 
 
+def test_init_conflicts():
+    executor, cache = ThreadPoolExecutor(1), PacketCache()
+    for kwargs in ({"chunk_size": 16}, {"executor": executor}, {"cache": cache}):
+        with pytest.raises(ValueError, match="offload cannot be combined"):
+            Connection(offload=True, **kwargs)
+    for kwargs in ({"executor": executor}, {"cache": cache}):
+        with pytest.raises(ValueError, match="chunk_size cannot be combined"):
+            Connection(chunk_size=16, **kwargs)
+    assert Connection(executor=executor, cache=cache).cache is cache
+    executor.shutdown()
+
+
 def test_send():
     conn = Connection()
 
@@ -46,17 +65,150 @@ def test_send():
         conn.send(b"test", 1, 2)
         == b"\x00\x00\x00\x14\x00\x10\x00\x01\x00\x00\x00\x02\x00\x00\x00\x00test"
     )
+    assert (
+        conn.send(LazyCommand("TEST", b'{"cmd":"TEST"}'))
+        == b'\x00\x00\x00\x1e\x00\x10\x00\x00\x00\x00\x00\x05\x00\x00\x00\x00{"cmd":"TEST"}'
+    )
     with pytest.raises(LocalProtocolError, match="Unknown event: object"):
         conn.send(object())  # type: ignore
 
     assert conn.send(ConnectionClosed()) is None
 
 
+def test_send_buffer():
+    conn = Connection()
+    buffer = bytearray()
+
+    assert conn.send(Command("TEST"), buffer=buffer) is buffer
+    assert (
+        buffer
+        == b'\x00\x00\x00\x1e\x00\x10\x00\x00\x00\x00\x00\x05\x00\x00\x00\x00{"cmd":"TEST"}'
+    )
+    assert conn.send(Heartbeat(b"test"), buffer=buffer) is buffer
+    assert (
+        buffer
+        == b"\x00\x00\x00\x14\x00\x10\x00\x01\x00\x00\x00\x02\x00\x00\x00\x00test"
+    )
+    assert conn.send(HeartbeatResponse(114514, b"test"), buffer=buffer) is buffer
+    assert (
+        buffer
+        == b"\x00\x00\x00\x18\x00\x10\x00\x01\x00\x00\x00\x03\x00\x00\x00\x00\x00\x01\xbfRtest"
+    )
+    assert conn.send(b"test", 1, 2, buffer=buffer) is buffer
+    assert (
+        buffer
+        == b"\x00\x00\x00\x14\x00\x10\x00\x01\x00\x00\x00\x02\x00\x00\x00\x00test"
+    )
+
+
+def test_encode_commands():
+    events = [Command("TEST"), b'{"cmd":"TEST"}']
+
+    assert (
+        encode_commands(iter(events), 0)
+        == b'\x00\x00\x00\x1e\x00\x10\x00\x00\x00\x00\x00\x05\x00\x00\x00\x00{"cmd":"TEST"}'
+        * 2
+    )
+    assert len(encode_commands(events, 2, 0)) > len(encode_commands(events, 2, 9))
+
+    compression = AdaptiveCompression(min_size=61, codecs=((2, 9),))
+    assert encode_commands(events, compression) == encode_commands(events, 0)
+    data = encode_commands(events * 2, compression)
+    assert data == encode_commands(events * 2, 2, 9)
+    ((codec, stats),) = compression.totals().items()
+    assert codec == (2, 9)
+    assert (stats.count, stats.input_size, stats.output_size) == (1, 120, len(data))
+
+
+def test_send_vectored():
+    conn = Connection()
+    payload = b"test"
+
+    header, body = conn.send_vectored(payload, 1, 2)
+    assert header == b"\x00\x00\x00\x14\x00\x10\x00\x01\x00\x00\x00\x02\x00\x00\x00\x00"
+    assert body is payload
+    view = memoryview(b"xtestx")[1:-1]
+    assert conn.send_vectored(view, 1, 2) == [header, view]
+    assert conn.send_vectored(Heartbeat(b"test")) == [header + payload]
+    assert conn.send_vectored(ConnectionClosed()) == []
+
+    with pytest.raises(LocalProtocolError, match="Unknown event: bytes"):
+        conn.send_vectored(payload)
+
+
 def test_receive_data():
     conn = Connection()
 
     conn.receive_data(b"test")
 
+    conn = Connection()
+    conn.receive_data(
+        b"\x00\x00\x00\x14\x00\x10\x00\x01\x00\x00\x00\x02\x00\x00\x00\x00test"
+    )
+    assert conn.next_event() == Heartbeat(b"test")
+    assert conn.offset1 == 20
+    conn.receive_data(b"test")
+    assert conn.buffer1 == b"test"
+    assert conn.offset1 == 0
+
+    view = memoryview(conn.buffer1)  # noqa: F841  # an event still refers to the buffer
+    conn.offset1 = 2
+    conn.receive_data(b"data")
+    assert conn.buffer1 == b"stdata"
+    assert conn.offset1 == 0
+
+
+def test_get_buffer():
+    conn = Connection()
+    frame = b"\x00\x00\x00\x14\x00\x10\x00\x01\x00\x00\x00\x02\x00\x00\x00\x00test"
+
+    view = conn.get_buffer()
+    assert len(view) == 65536
+    view[:30] = frame + frame[:10]
+    conn.buffer_updated(30)
+    assert conn.next_event() == Heartbeat(b"test")
+    assert conn.next_event() == NeedData(6)
+
+    # the data is moved to the front, and the buffer is still exported
+    view = conn.get_buffer(16)
+    assert conn.buffer1[:10] == frame[:10]
+    view[:10] = frame[10:]
+    conn.buffer_updated(10)
+    assert conn.next_event() == Heartbeat(b"test")
+    view = conn.get_buffer(65536)
+    assert len(view) == 65536
+    assert conn.end1 == 0
+
+    conn.receive_data(frame)
+    assert conn.buffer1 == frame
+    view = conn.get_buffer(4)
+    conn.receive_data(b"test")
+    assert conn.buffer1 == frame + b"test"
+    conn.offset1 = 20
+    view = conn.get_buffer(4)  # noqa: F841
+    conn.receive_data(b"")
+    assert conn.buffer1 == b"test"
+
+    conn = Connection()
+    buffer = conn.buffer1
+    conn.get_buffer(32)[:30] = frame + frame[:10]
+    conn.buffer_updated(30)
+    assert conn.next_event() == Heartbeat(b"test")
+    # the unread part is moved to the front of the same buffer
+    assert len(conn.get_buffer(16)) == 22
+    assert conn.buffer1 is buffer
+    assert conn.buffer1[:10] == frame[:10]
+
+    conn = Connection()
+    view = conn.get_buffer(4)
+    assert len(conn.get_buffer(4)) == 4
+    assert len(conn.get_buffer(8)) == 8  # reallocated while exported
+
+    conn = connect(high_water_mark=1024)
+    conn.get_buffer(4096)
+    conn.get_buffer(16)
+    assert sys.getsizeof(conn.buffer1) < 1024
+
 
 def test_next_event():
     conn = Connection()
@@ -103,3 +255,153 @@ def test_next_event():
     )
     with pytest.raises(RemoteProtocolError):
         conn.next_event()
+
+
+def test_next_events():
+    conn = Connection()
+    assert conn.next_events() == []
+
+    conn.receive_data(
+        b"\x00\x00\x00\x14\x00\x10\x00\x01\x00\x00\x00\x02\x00\x00\x00\x00test"
+        b"\x00\x00\x00;\x00\x10\x00\x03\x00\x00\x00\x05\x00\x00\x00\x00\x1bY\x00\xe8\x9f\t\xbc\t\xeb2\xfa}@\xe3H\rP\xe0\xb1\xb7\x01 \x8a\xda\xb6\x08\xd5\x14\xd9\xd4\x19\xeb\x8b\xaf\xa2\xa5\x85\t\x04\xd7\x8f\xb6\x0c"
+        b'\x00\x00\x00\x1a\x00\x10\x00\x01\x00\x00\x00\x08\x00\x00\x00\x00{"code":1}'
+        b"\x00\x00\x00\x14\x00\x10\x00\x01"
+    )
+    assert conn.next_events(2) == [Heartbeat(b"test"), Command("TEST")]
+    assert conn.next_events() == [Command("TEST"), Command("TEST"), AuthResponse(1)]
+    assert conn.next_events() == []
+    assert conn.next_event() == NeedData(8)
+
+    conn = Connection()
+    conn.receive_data(
+        b"\x00\x00\x00\x10\x00\x10\x00\x00\x00\x00\x00\x05\x00\x00\x00\x00"
+        b"\x00\x00\x00\x00\x00\x10\x00\x00\x00\x00\x00\x05\x00\x00\x00\x00"
+    )
+    with pytest.raises(RemoteProtocolError):
+        conn.next_events()
+    with pytest.raises(RemoteProtocolError, match="Invalid packet size: 0"):
+        conn.next_events()
+
+    conn = Connection()
+    conn.buffer2 = b"\x00\x00\x00\x00\x00\x10\x00\x00\x00\x00\x00\x05\x00\x00\x00\x00"
+    with pytest.raises(RemoteProtocolError, match="Invalid packet size: 0"):
+        conn.next_event()
+
+
+def test_lazy():
+    conn = connect(lazy=True)
+    conn.receive_data(
+        b'\x00\x00\x00\x1e\x00\x10\x00\x00\x00\x00\x00\x05\x00\x00\x00\x00{"cmd":"TEST"}'
+        b"\x00\x00\x00;\x00\x10\x00\x03\x00\x00\x00\x05\x00\x00\x00\x00\x1bY\x00\xe8\x9f\t\xbc\t\xeb2\xfa}@\xe3H\rP\xe0\xb1\xb7\x01 \x8a\xda\xb6\x08\xd5\x14\xd9\xd4\x19\xeb\x8b\xaf\xa2\xa5\x85\t\x04\xd7\x8f\xb6\x0c"
+    )
+    assert conn.next_event() == LazyCommand("TEST", b'{"cmd":"TEST"}')
+    assert conn.next_events() == [LazyCommand("TEST", b'{"cmd":"TEST"}')] * 3
+
+
+def test_commands():
+    conn = connect(commands=["TEST"])
+    conn.receive_data(
+        b'\x00\x00\x00\x1e\x00\x10\x00\x00\x00\x00\x00\x05\x00\x00\x00\x00{"cmd":"SKIP"}'
+        b'\x00\x00\x00\x1e\x00\x10\x00\x00\x00\x00\x00\x05\x00\x00\x00\x00{"cmd":"TEST"}'
+        b"\x00\x00\x00;\x00\x10\x00\x03\x00\x00\x00\x05\x00\x00\x00\x00\x1bY\x00\xe8\x9f\t\xbc\t\xeb2\xfa}@\xe3H\rP\xe0\xb1\xb7\x01 \x8a\xda\xb6\x08\xd5\x14\xd9\xd4\x19\xeb\x8b\xaf\xa2\xa5\x85\t\x04\xd7\x8f\xb6\x0c"
+        b'\x00\x00\x00\x22\x00\x10\x00\x00\x00\x00\x00\x05\x00\x00\x00\x00{ "cmd" : "TEST" }'
+    )
+    assert conn.commands == frozenset({"TEST"})
+    assert conn.next_event() == Command("TEST")
+    assert conn.next_events() == [Command("TEST")] * 4
+    assert conn.next_event() == NeedData(16)
+
+    conn = connect(commands=["TEST"], lazy=True)
+    conn.receive_data(
+        b"\x00\x00\x00;\x00\x10\x00\x03\x00\x00\x00\x05\x00\x00\x00\x00\x1bY\x00\xe8\x9f\t\xbc\t\xeb2\xfa}@\xe3H\rP\xe0\xb1\xb7\x01 \x8a\xda\xb6\x08\xd5\x14\xd9\xd4\x19\xeb\x8b\xaf\xa2\xa5\x85\t\x04\xd7\x8f\xb6\x0c"
+    )
+    assert conn.next_events() == [LazyCommand("TEST", b'{"cmd":"TEST"}')] * 3
+
+    conn = connect(commands=())
+    conn.receive_data(
+        b'\x00\x00\x00\x1e\x00\x10\x00\x00\x00\x00\x00\x05\x00\x00\x00\x00{"cmd":"TEST"}'
+        b"\x00\x00\x00;\x00\x10\x00\x03\x00\x00\x00\x05\x00\x00\x00\x00\x1bY\x00\xe8\x9f\t\xbc\t\xeb2\xfa}@\xe3H\rP\xe0\xb1\xb7\x01 \x8a\xda\xb6\x08\xd5\x14\xd9\xd4\x19\xeb\x8b\xaf\xa2\xa5\x85\t\x04\xd7\x8f\xb6\x0c"
+    )
+    assert conn.next_event() == NeedData(16)
+
+
+def test_chunk_size():
+    conn = connect(chunk_size=16)
+    conn.receive_data(
+        b"\x00\x00\x004\x00\x10\x00\x02\x00\x00\x00\x05\x00\x00\x00\x00x\x9cc``\x90c\x10`\x00\x01V\x10Q\xad\x94\x9c\x9b\xa2d\xa5\x14\xe2\x1a\x1c\xa2T\xcb@\x81,\x00\xf9\xb9\r$"
+        b"\x00\x00\x00;\x00\x10\x00\x03\x00\x00\x00\x05\x00\x00\x00\x00\x1bY\x00\xe8\x9f\t\xbc\t\xeb2\xfa}@\xe3H\rP\xe0\xb1\xb7\x01 \x8a\xda\xb6\x08\xd5\x14\xd9\xd4\x19\xeb\x8b\xaf\xa2\xa5\x85\t\x04\xd7\x8f\xb6\x0c"
+    )
+    assert conn.next_event() == Command("TEST")
+    assert conn.decompressor is not None
+    assert len(conn.buffer2) <= 32
+    assert conn.next_events() == [Command("TEST")] * 5
+    assert conn.decompressor is None
+    assert conn.next_event() == NeedData(16)
+
+    conn = Connection()
+    conn.receive_data(
+        b"\x00\x00\x00\x20\x00\x10\x00\x02\x00\x00\x00\x05\x00\x00\x00\x00x\x9cc``\x90c\x10``\x00\x00\x00\xce\x00/"
+    )
+    with pytest.raises(RemoteProtocolError, match="Truncated compressed packet"):
+        conn.next_event()
+
+
+def test_executor():
+    executor = ThreadPoolExecutor(1)
+    blocked = threading.Event()
+    executor.submit(blocked.wait)
+    conn = connect(executor=executor, executor_threshold=40)
+    conn.receive_data(
+        b"\x00\x00\x004\x00\x10\x00\x02\x00\x00\x00\x05\x00\x00\x00\x00x\x9cc``\x90c\x10`\x00\x01V\x10Q\xad\x94\x9c\x9b\xa2d\xa5\x14\xe2\x1a\x1c\xa2T\xcb@\x81,\x00\xf9\xb9\r$"
+        b"\x00\x00\x00;\x00\x10\x00\x03\x00\x00\x00\x05\x00\x00\x00\x00\x1bY\x00\xe8\x9f\t\xbc\t\xeb2\xfa}@\xe3H\rP\xe0\xb1\xb7\x01 \x8a\xda\xb6\x08\xd5\x14\xd9\xd4\x19\xeb\x8b\xaf\xa2\xa5\x85\t\x04\xd7\x8f\xb6\x0c"
+        b'\x00\x00\x00\x1e\x00\x10\x00\x00\x00\x00\x00\x05\x00\x00\x00\x00{"cmd":"TEST"}'
+    )
+    assert conn.next_events() == [Command("TEST")] * 3
+    assert conn.pending is not None
+    assert conn.next_event() == NeedData(0)
+    blocked.set()
+    wait([conn.pending])
+    assert conn.next_events() == [Command("TEST")] * 4
+    assert conn.pending is None
+
+    conn.receive_data(
+        b"\x00\x00\x008\x00\x10\x00\x03\x00\x00\x00\x05\x00\x00\x00\x00" + b"\xff" * 40
+    )
+    assert conn.next_events() == []
+    wait([conn.pending])  # type: ignore
+    with pytest.raises(RemoteProtocolError):
+        conn.next_events()
+    executor.shutdown()
+
+
+def test_limits():
+    conn = connect(max_packet_size=32)
+    conn.receive_data(
+        b'\x00\x00\x00\x1e\x00\x10\x00\x00\x00\x00\x00\x05\x00\x00\x00\x00{"cmd":"TEST"}'
+        b"\x00\x00\x00S\x00\x10\x00\x01\x00\x00\x00\x07\x00\x00\x00\x00"
+    )
+    assert conn.next_event() == Command("TEST")
+    with pytest.raises(RemoteProtocolError, match="Packet size 83 exceeds 32"):
+        conn.next_event()
+
+    conn = connect(max_decompressed_size=60)
+    conn.receive_data(
+        b"\x00\x00\x001\x00\x10\x00\x02\x00\x00\x00\x05\x00\x00\x00\x00x\x9cc``\x90c\x10`\x00\x01V\x10Q\xad\x94\x9c\x9b\xa2d\xa5\x14\xe2\x1a\x1c\xa2T\x0b\x00%0\x04b"
+        b"\x00\x00\x004\x00\x10\x00\x02\x00\x00\x00\x05\x00\x00\x00\x00x\x9cc``\x90c\x10`\x00\x01V\x10Q\xad\x94\x9c\x9b\xa2d\xa5\x14\xe2\x1a\x1c\xa2T\xcb@\x81,\x00\xf9\xb9\r$"
+    )
+    assert conn.next_events(1) == [Command("TEST")]
+    with pytest.raises(RemoteProtocolError, match="Decompressed size 90 exceeds 60"):
+        conn.next_events()
+
+
+def test_high_water_mark():
+    conn = connect(high_water_mark=1024)
+    conn.receive_data(
+        b"\x00\x00\x00\x14\x00\x10\x00\x01\x00\x00\x00\x02\x00\x00\x00\x00"
+    )
+    conn.receive_data(bytes(4096))
+    assert conn.next_event() == Heartbeat(bytes(4))
+    conn.offset1 = len(conn.buffer1)
+    conn.receive_data(b"test")
+    assert conn.buffer1 == b"test"
+    assert sys.getsizeof(conn.buffer1) < 1024
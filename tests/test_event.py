@@ -4,8 +4,10 @@ from broadcastlv.event import (
     Auth,
     AuthResponse,
     Command,
+    Event,
     Heartbeat,
     HeartbeatResponse,
+    LazyCommand,
     NeedData,
 )
 from broadcastlv.exception import UnknownCommandWarning
@@ -15,10 +17,27 @@ def test_need_data():
     assert NeedData(1).size == 1
 
 
+def test_event_into_buffer():
+    class Test(Event):
+        @classmethod
+        def from_bytes(cls, data: bytes) -> "Test":
+            return cls()
+
+        def __bytes__(self) -> bytes:
+            return b"test"
+
+    buffer = bytearray(b"\x00\x00data")
+    Test().into_buffer(buffer, 2)
+    assert buffer == b"\x00\x00test"
+
+
 def test_heartbeat():
     assert Heartbeat(b"abc").content == b"abc"
     assert Heartbeat.from_bytes(b"abc") == Heartbeat(b"abc")
     assert bytes(Heartbeat(b"abc")) == b"abc"
+    buffer = bytearray(b"\x00")
+    Heartbeat(b"abc").into_buffer(buffer, 1)
+    assert buffer == b"\x00abc"
 
 
 def test_heartbeat_response():
@@ -27,6 +46,9 @@ def test_heartbeat_response():
     assert heartbeat_response.content == b"abc"
     assert HeartbeatResponse.from_bytes(b"\x00\x00\x00\x01abc") == heartbeat_response
     assert bytes(heartbeat_response) == b"\x00\x00\x00\x01abc"
+    buffer = bytearray(b"\x00")
+    heartbeat_response.into_buffer(buffer, 1)
+    assert buffer == b"\x00\x00\x00\x00\x01abc"
 
 
 def test_command():
@@ -36,6 +58,14 @@ def test_command():
         == b'{"cmd":"TEST"}'
     )
     Command.from_bytes(b'{"cmd":"TEST"}')
+    assert Command.from_bytes(b'{"ignored":"field","cmd":"TEST"}') == Command("TEST")
+    padding = b"x" * 512
+    assert Command.from_bytes(b'{"cmd":"TEST","ignored":"%s"}' % padding) == Command(
+        "TEST"
+    )
+    assert Command.from_bytes(b'{"ignored":"%s","cmd":"TEST"}' % padding) == Command(
+        "TEST"
+    )
 
     with pytest.warns(UnknownCommandWarning, match="Unknown command: UNKNOWN"):
         Command.from_bytes(b'{"cmd":"UNKNOWN"}')
@@ -47,6 +77,31 @@ def test_command():
         Command.from_bytes(b'{"cmd":"TEST","a":"1"}')
 
 
+def test_lazy_command():
+    lazy = LazyCommand.from_bytes(memoryview(b'{"cmd":"TEST"}'))
+    assert lazy == LazyCommand("TEST", b'{"cmd":"TEST"}')
+    assert bytes(lazy) == b'{"cmd":"TEST"}'
+    assert lazy.decode() == Command("TEST")
+    assert lazy.decode() is lazy.decode()
+
+    lazy = LazyCommand.from_bytes(b'{"a":1,"cmd":"LAZY"}')
+    assert lazy.cmd == "LAZY"
+
+    class Lazy(Command):
+        a: int
+
+    assert lazy.a == 1
+    assert lazy.decode() == Lazy("LAZY", 1)
+    with pytest.raises(AttributeError):
+        lazy.b
+    with pytest.raises(AttributeError):
+        lazy.__deepcopy__
+
+    buffer = bytearray(4)
+    lazy.into_buffer(buffer, 2)
+    assert buffer == b'\x00\x00{"a":1,"cmd":"LAZY"}'
+
+
 def test_auth():
     auth = Auth(123, 456, 3, "web", 2, "token")
     assert auth.roomid == 123
@@ -0,0 +1,68 @@
+import pytest
+
+from broadcastlv.connection import Connection, ConnectionState, ServerConnection
+from broadcastlv.event import Command
+from broadcastlv.exception import LocalProtocolError
+from broadcastlv.hub import BroadcastHub
+
+
+def test_broadcast():
+    hub = BroadcastHub()
+    a, b, c, d = (
+        ServerConnection(),
+        ServerConnection(),
+        ServerConnection(),
+        ServerConnection(),
+    )
+    a.state = b.state = c.state = ConnectionState.AUTHENTICATED
+    hub.subscribe(1, a, 2)
+    hub.subscribe(1, b, 2)
+    hub.subscribe(1, c, 0)
+    hub.subscribe(1, d)
+    assert hub.broadcast(2, [Command("TEST")]) == []
+
+    result = hub.broadcast(1, iter([Command("TEST"), b'{"cmd":"TEST"}']))
+    assert [conn for conn, _ in result] == [a, b, c]
+    assert result[0][1] is result[1][1]
+    assert (
+        result[0][1]
+        == b"\x00\x00\x004\x00\x10\x00\x02\x00\x00\x00\x05\x00\x00\x00\x00x\x9cc``\x90c\x10`\x00\x01V\x10Q\xad\x94\x9c\x9b\xa2d\xa5\x14\xe2\x1a\x1c\xa2T\xcb\x80W\x16\x00\xcd\xbe\x08\xc3"
+    )
+    assert (
+        result[2][1]
+        == b'\x00\x00\x00\x1e\x00\x10\x00\x00\x00\x00\x00\x05\x00\x00\x00\x00{"cmd":"TEST"}'
+        * 2
+    )
+
+    receiver = Connection()
+    hub.subscribe(1, a, 3)
+    receiver.receive_data(hub.broadcast(1, [Command("TEST")])[0][1])
+    assert receiver.next_events() == [Command("TEST")]
+
+    b.state |= ConnectionState.CLOSED
+    assert [conn for conn, _ in hub.broadcast(1, [])] == [a, c]
+    assert list(hub.rooms[1]) == [a, c, d]
+
+
+def test_unsubscribe():
+    hub = BroadcastHub()
+    conn, other = ServerConnection(), ServerConnection()
+    conn.state = other.state = ConnectionState.AUTHENTICATED
+    hub.unsubscribe(1, conn)
+    hub.subscribe(1, conn)
+    hub.subscribe(1, other)
+    hub.unsubscribe(1, conn)
+    assert len(hub.rooms[1]) == 1
+    hub.unsubscribe(1, next(iter(hub.rooms[1])))
+    assert hub.rooms == {}
+
+
+def test_subscribe_protover():
+    hub = BroadcastHub()
+    conn = ServerConnection()
+    conn.state = ConnectionState.AUTHENTICATED
+    hub.subscribe(1, conn, 1)
+    assert hub.broadcast(1, [b""])[0][1] == hub.encode([b""], 0)
+    with pytest.raises(LocalProtocolError, match="Unknown protover: 4"):
+        hub.subscribe(1, conn, 4)
+    assert hub.rooms[1][conn] == 1
@@ -0,0 +1,138 @@
+import asyncio
+import socket
+
+from broadcastlv.connection import ServerConnection
+from broadcastlv.event import (
+    Auth,
+    AuthResponse,
+    Command,
+    ConnectionClosed,
+    Heartbeat,
+    HeartbeatResponse,
+)
+from broadcastlv.multiplexer import RoomMultiplexer
+from broadcastlv.protocol import ConnectionProtocol
+
+
+async def serve(rooms: dict[int, int]):
+    """Authenticates any room, drops the first connection of room 2"""
+
+    def factory():
+        protocol = ConnectionProtocol(
+            ServerConnection(), lambda event: on_event(protocol, event)
+        )
+        return protocol
+
+    def on_event(protocol, event):
+        match event:
+            case Auth(roomid):
+                protocol.roomid = roomid
+                rooms[roomid] = rooms.get(roomid, 0) + 1
+                protocol.send(AuthResponse(0))
+                protocol.send(Command("TEST"))
+                if roomid == 2 and rooms[roomid] == 1:
+                    protocol.send(ConnectionClosed())
+            case Heartbeat():
+                protocol.send(HeartbeatResponse(protocol.roomid, b""))
+
+    return await asyncio.get_running_loop().create_server(factory, "127.0.0.1", 0)
+
+
+def test_multiplexer():
+    async def main():
+        rooms = {}
+        server = await serve(rooms)
+        mux = RoomMultiplexer(
+            *server.sockets[0].getsockname(), heartbeat_interval=0.01, jitter=lambda: 0
+        )
+        mux.add(1)
+        mux.add(1)
+        mux.add(2, Auth(2, 0))
+        mux.add(3)
+        mux.remove(3)
+        mux.remove(4)
+
+        events = {}
+        async for roomid, event in mux:
+            events.setdefault(roomid, []).append(event)
+            if sum(isinstance(e, HeartbeatResponse) for e in events.get(2, [])) == 2:
+                break
+
+        assert rooms == {1: 1, 2: 2}
+        assert events[1][:2] == [AuthResponse(0), Command("TEST")]
+        assert events[2][:4] == [
+            AuthResponse(0),
+            Command("TEST"),
+            AuthResponse(0),
+            Command("TEST"),
+        ]
+        assert HeartbeatResponse(1, b"") in events[1]
+        assert mux.rooms[1].attempts == mux.rooms[2].attempts == 0
+
+        mux.close()
+        async for _ in mux:
+            pass  # pragma: no cover
+        assert mux.rooms == {}
+        server.close()
+        await server.wait_closed()
+
+    asyncio.run(main())
+
+
+def test_multiplexer_cache():
+    assert RoomMultiplexer("", 0).kwargs["cache"] is not None
+    assert RoomMultiplexer("", 0, chunk_size=16).kwargs["cache"] is None
+    assert RoomMultiplexer("", 0, offload=True).kwargs["cache"] is None
+
+
+def test_multiplexer_callback():
+    async def main():
+        server = await serve({})
+        events = asyncio.Queue()
+        mux = RoomMultiplexer(
+            *server.sockets[0].getsockname(),
+            lambda roomid, event: events.put_nowait((roomid, event)),
+        )
+        mux.add(1)
+        assert await events.get() == (1, AuthResponse(0))
+        mux.close()
+        server.close()
+        await server.wait_closed()
+
+    asyncio.run(main())
+
+
+def test_multiplexer_retry():
+    async def main():
+        with socket.socket() as sock:
+            sock.bind(("127.0.0.1", 0))
+            address = sock.getsockname()
+        mux = RoomMultiplexer(*address, heartbeat_interval=0, jitter=lambda: 0)
+        mux.add(1)
+        while mux.rooms[1].attempts < 3:
+            await asyncio.sleep(0)
+        assert mux.rooms[1].protocol is None
+        mux.close()
+
+    asyncio.run(main())
+
+
+def test_multiplexer_error():
+    async def main():
+        def factory():
+            protocol = asyncio.Protocol()
+            protocol.connection_made = lambda transport: transport.write(bytes(16))
+            return protocol
+
+        server = await asyncio.get_running_loop().create_server(factory, "127.0.0.1", 0)
+        mux = RoomMultiplexer(*server.sockets[0].getsockname(), jitter=lambda: 0)
+        mux.add(1)
+        while mux.rooms[1].attempts < 2:
+            await asyncio.sleep(0)
+        mux.close()
+        mux.close()
+
+        server.close()
+        await server.wait_closed()
+
+    asyncio.run(main())
@@ -0,0 +1,171 @@
+import asyncio
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from multiprocessing import get_context
+from typing import Literal
+
+import msgspec
+import pytest
+
+from broadcastlv.connection import ClientConnection, Connection, encode_commands
+from broadcastlv.event import (
+    Auth,
+    AuthResponse,
+    Command,
+    CompressedPacket,
+    HeartbeatResponse,
+    LazyCommand,
+)
+from broadcastlv.exception import RemoteProtocolError
+from broadcastlv.pool import DecodePool, _pack
+from broadcastlv.util import add_from_bytes
+
+FRAME = (
+    b'\x00\x00\x00\x1e\x00\x10\x00\x00\x00\x00\x00\x05\x00\x00\x00\x00{"cmd":"TEST"}'
+)
+BROTLI = bytes(encode_commands([FRAME[16:]] * 2, 3))
+ZLIB = bytes(encode_commands([FRAME[16:]], 2))
+TEST = LazyCommand("TEST", b'{"cmd":"TEST"}')
+
+
+class Node(msgspec.Struct, gc=False):
+    next: "Node | None" = None
+
+
+@add_from_bytes
+class PoolTyped(Command, kw_only=True, gc=False):
+    cmd: Literal["POOL_TYPED"] = "POOL_TYPED"
+    node: Node
+
+
+@add_from_bytes
+class PoolRaw(Command, kw_only=True, gc=False):
+    cmd: Literal["POOL_RAW"] = "POOL_RAW"
+    data: msgspec.Raw
+
+
+class PoolCustom(Command, kw_only=True, gc=False):
+    cmd: Literal["POOL_CUSTOM"] = "POOL_CUSTOM"
+
+
+def test_offload():
+    conn = ClientConnection(offload=True)
+    conn.send(Auth(1))
+    conn.receive_data(
+        b'\x00\x00\x00\x1a\x00\x10\x00\x01\x00\x00\x00\x08\x00\x00\x00\x00{"code":0}'
+        + BROTLI
+        + FRAME
+    )
+    assert conn.next_events() == [
+        AuthResponse(0),
+        CompressedPacket(3, BROTLI[16:]),
+        Command("TEST"),
+    ]
+    conn.receive_data(ZLIB)
+    assert conn.next_events() == [CompressedPacket(2, ZLIB[16:])]
+
+
+def test_pool():
+    with ThreadPoolExecutor(1) as executor:
+        pool = DecodePool(executor=executor, lazy=True)
+        # room 1 is held back by an unfinished packet at its head
+        blocker: Future = Future()
+        pool.queues[1] = deque([blocker])
+        pool.submit(1, [CompressedPacket(3, BROTLI[16:]), Command("A")])
+        pool.submit(1, [Command("B")])
+        pool.submit(2, [HeartbeatResponse(1, b""), CompressedPacket(2, ZLIB[16:])])
+        assert pool.drain(timeout=1) == [(2, [HeartbeatResponse(1, b""), TEST], None)]
+
+        blocker.set_result([(None, [Command("Z")])])
+        assert pool.poll() == [
+            (1, [Command("Z"), TEST, TEST, Command("A"), Command("B")], None)
+        ]
+        assert pool.queues == {}
+        assert pool.poll() == []
+
+        # a broken packet ends its own room only
+        pool.submit(1, [Command("A"), CompressedPacket(3, b"\x00")])
+        pool.submit(1, [Command("B")])
+        pool.submit(2, [CompressedPacket(2, ZLIB[16:])])
+        ((key, events, error), other) = pool.drain()
+        assert (key, events) == (1, [Command("A")])
+        assert isinstance(error, RemoteProtocolError)
+        assert other == (2, [TEST], None)
+        assert pool.queues == {}
+        pool.max_decompressed_size = 8
+        pool.submit(1, [CompressedPacket(3, BROTLI[16:])])
+        ((_, events, error),) = pool.drain()
+        assert events == []
+        with pytest.raises(RemoteProtocolError, match="exceeds 8"):
+            raise error
+        pool.close()
+
+
+def test_pool_transport():
+    payloads = [
+        b'{"cmd":"POOL_TYPED","node":{"next":{}}}',
+        b'{"cmd":"POOL_TYPED","node":{}}',
+        b'{"cmd":"POOL_RAW","data":[1]}',
+        b'{"cmd":"POOL_CUSTOM"}',
+        b'{"cmd":"TEST"}',
+    ]
+    packet = encode_commands(payloads, 3)
+    for lazy in (False, True):
+        conn = Connection(lazy=lazy)
+        conn.receive_data(packet)
+        expected = conn.next_events()
+        with ThreadPoolExecutor(1) as executor:
+            pool = DecodePool(executor=executor, lazy=lazy)
+            pool.submit(1, [CompressedPacket(3, bytes(packet[16:]))])
+            ((_, events, _),) = pool.drain()
+        assert events == expected
+        assert list(map(type, events)) == list(map(type, expected))
+
+    # typed commands travel as msgpack, the others as they are
+    assert [key for key, _ in _pack(expected)] == [LazyCommand]
+    conn = Connection()
+    conn.receive_data(packet)
+    assert [key for key, _ in _pack(conn.next_events())] == [PoolTyped, None, Command]
+
+
+def test_pool_wait():
+    async def main():
+        with ThreadPoolExecutor(1) as executor:
+            pool = DecodePool(executor=executor, commands=["OTHER"])
+            # with nothing queued wait() sleeps until the next submit
+            waiter = asyncio.create_task(pool.wait())
+            await asyncio.sleep(0.01)
+            assert not waiter.done()
+            pool.submit(3, [])
+            await waiter
+            assert pool.poll() == []
+
+            blocker: Future = Future()
+            pool.queues[1] = deque([blocker])
+            pool.submit(2, [Command("A")])
+            await pool.wait()  # room 2 is ready
+            assert pool.poll() == [(2, [Command("A")], None)]
+
+            pool.submit(1, [CompressedPacket(3, BROTLI[16:])])
+            asyncio.get_running_loop().call_later(0.01, blocker.set_result, [])
+            await pool.wait()
+            assert pool.drain() == []
+            assert pool.queues == {}
+
+    asyncio.run(main())
+
+
+def test_pool_process():
+    # a spawned worker imports its own copy of the package
+    with ProcessPoolExecutor(1, mp_context=get_context("spawn")) as executor:
+        pool = DecodePool(executor=executor)
+        pool.submit(
+            1, [CompressedPacket(3, BROTLI[16:]), CompressedPacket(2, ZLIB[16:])]
+        )
+        ((key, events, error),) = pool.drain()
+        assert (key, error) == (1, None)
+        assert [event.cmd for event in events] == ["TEST"] * 3
+        pool.close()
+    pool = DecodePool(1)
+    assert pool.owned
+    pool.close()
@@ -0,0 +1,177 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from broadcastlv.connection import ClientConnection, ServerConnection
+from broadcastlv.event import (
+    Auth,
+    AuthResponse,
+    Command,
+    ConnectionClosed,
+    Heartbeat,
+    HeartbeatResponse,
+)
+from broadcastlv.exception import RemoteProtocolError
+from broadcastlv.protocol import ConnectionProtocol, _SharedBufferProtocol
+
+
+class Transport:
+    def __init__(self) -> None:
+        self.data = bytearray()
+        self.closed = False
+
+    def write(self, data: bytes) -> None:
+        self.data += data
+
+    def close(self) -> None:
+        self.closed = True
+
+
+def test_protocol():
+    async def main():
+        servers: list[ConnectionProtocol[ServerConnection]] = []
+
+        def factory():
+            servers.append(ConnectionProtocol(ServerConnection()))
+            return servers[-1]
+
+        loop = asyncio.get_running_loop()
+        server = await loop.create_server(factory, "127.0.0.1", 0)
+        received = []
+        _, client = await loop.create_connection(
+            lambda: ConnectionProtocol(ClientConnection(), received.append),
+            *server.sockets[0].getsockname(),
+        )
+
+        client.send(Auth(1))
+        while not servers:
+            await asyncio.sleep(0)
+        assert await anext(servers[0]) == Auth(1)
+        servers[0].send(AuthResponse(0))
+        servers[0].send(Command("TEST"))
+        while len(received) < 2:
+            await asyncio.sleep(0.01)
+        client.send(Heartbeat(b"test"))
+        assert await anext(servers[0]) == Heartbeat(b"test")
+        servers[0].send(HeartbeatResponse(1, b""))
+        servers[0].send(ConnectionClosed())
+        with pytest.raises(StopAsyncIteration):
+            await anext(servers[0])
+        async for _ in servers[0]:
+            pass  # pragma: no cover
+
+        while not client.closed:
+            await asyncio.sleep(0.01)
+        assert received == [
+            AuthResponse(0),
+            Command("TEST"),
+            HeartbeatResponse(1, b""),
+            ConnectionClosed(),
+        ]
+
+        server.close()
+        await server.wait_closed()
+
+    asyncio.run(main())
+
+
+def test_protocol_error():
+    async def main():
+        protocol = ConnectionProtocol(ClientConnection())
+        transport = Transport()
+        protocol.connection_made(transport)  # type: ignore
+        protocol.get_buffer(-1)[:16] = bytes(16)
+        protocol.buffer_updated(16)
+        assert transport.closed
+        with pytest.raises(RemoteProtocolError, match="Invalid packet size: 0"):
+            await anext(protocol)
+        protocol.connection_lost(None)
+
+        protocol = ConnectionProtocol(ClientConnection())
+        protocol.eof_received()
+        protocol.buffer_updated(0)
+        assert isinstance(protocol.exception, RemoteProtocolError)
+        assert protocol.events.qsize() == 1
+
+        protocol = ConnectionProtocol(ServerConnection())
+        protocol.connection_lost(ConnectionResetError())
+        with pytest.raises(ConnectionResetError):
+            await anext(protocol)
+
+        protocol = ConnectionProtocol(ServerConnection())
+        protocol.connection_lost(None)
+        assert protocol.closed
+
+    asyncio.run(main())
+
+
+def test_shared_buffer_protocol():
+    buffer = bytearray(64)
+    received = []
+    protocol = _SharedBufferProtocol(ClientConnection(), received.append, buffer)
+    protocol.connection_made(Transport())  # type: ignore
+    protocol.send(Auth(1))
+    data = b'\x00\x00\x00\x1a\x00\x10\x00\x01\x00\x00\x00\x08\x00\x00\x00\x00{"code":0}'
+    protocol.get_buffer(-1)[:20] = data[:20]
+    protocol.buffer_updated(20)
+    assert received == []
+    assert protocol.get_buffer(-1).obj is buffer
+    buffer[:6] = data[20:]
+    protocol.buffer_updated(6)
+    assert received == [AuthResponse(0)]
+
+    protocol.connection.receive_data(b"")
+    protocol.buffer_updated(6)
+    assert protocol.closed
+    assert isinstance(protocol.exception, RemoteProtocolError)
+
+
+def test_executor():
+    async def main():
+        executor = ThreadPoolExecutor(1)
+        blocked = threading.Event()
+        executor.submit(blocked.wait)
+        received = []
+        protocol = ConnectionProtocol(
+            ClientConnection(executor=executor, executor_threshold=0), received.append
+        )
+        protocol.connection_made(Transport())  # type: ignore
+        protocol.send(Auth(1))
+        data = (
+            b'\x00\x00\x00\x1a\x00\x10\x00\x01\x00\x00\x00\x08\x00\x00\x00\x00{"code":0}'
+            b"\x00\x00\x00;\x00\x10\x00\x03\x00\x00\x00\x05\x00\x00\x00\x00\x1bY\x00\xe8\x9f\t\xbc\t\xeb2\xfa}@\xe3H\rP\xe0\xb1\xb7\x01 \x8a\xda\xb6\x08\xd5\x14\xd9\xd4\x19\xeb\x8b\xaf\xa2\xa5\x85\t\x04\xd7\x8f\xb6\x0c"
+            b'\x00\x00\x00\x1e\x00\x10\x00\x00\x00\x00\x00\x05\x00\x00\x00\x00{"cmd":"TEST"}'
+        )
+        protocol.get_buffer(-1)[:85] = data[:85]
+        protocol.buffer_updated(85)
+        protocol.get_buffer(-1)[:30] = data[85:]
+        protocol.buffer_updated(30)
+        protocol.eof_received()
+        assert received == [AuthResponse(0)]
+        assert not protocol.closed
+        blocked.set()
+        while not protocol.closed:
+            await asyncio.sleep(0.01)
+        assert received == [AuthResponse(0), *[Command("TEST")] * 4, ConnectionClosed()]
+
+        # a protocol closed meanwhile ignores the inflated packet
+        blocked.clear()
+        executor.submit(blocked.wait)
+        received.clear()
+        protocol = ConnectionProtocol(
+            ClientConnection(executor=executor, executor_threshold=0), received.append
+        )
+        protocol.connection_made(Transport())  # type: ignore
+        protocol.send(Auth(1))
+        protocol.get_buffer(-1)[:85] = data[:85]
+        protocol.buffer_updated(85)
+        protocol.send(ConnectionClosed())
+        blocked.set()
+        await asyncio.wrap_future(protocol.waiting)  # type: ignore
+        await asyncio.sleep(0)
+        assert received == [AuthResponse(0), ConnectionClosed()]
+        executor.shutdown()
+
+    asyncio.run(main())
@@ -0,0 +1,64 @@
+import subprocess
+import sys
+
+import pytest
+
+from broadcastlv.exception import RemoteProtocolError
+from broadcastlv.scanner import scan_frames
+
+DUMP = (
+    b"\x00\x00\x00\x14\x00\x10\x00\x01\x00\x00\x00\x02\x00\x00\x00\x00test"
+    b'\x00\x00\x00\x1e\x00\x10\x00\x00\x00\x00\x00\x05\x00\x00\x00\x00{"cmd":"TEST"}'
+    b"\x00\x00\x001\x00\x10\x00\x02\x00\x00\x00\x05\x00\x00\x00\x00x\x9cc``\x90c\x10`\x00\x01V\x10Q\xad\x94\x9c\x9b\xa2d\xa5\x14\xe2\x1a\x1c\xa2T\x0b\x00%0\x04b"
+    b"\x00\x00\x00\x14\x00\x10\x00\x01\x00\x00\x00\x02\x00\x00\x00\x00te"
+)
+
+
+def test_scan_frames():
+    frames = scan_frames(DUMP, numpy=False)
+    assert len(frames) == 3
+    assert list(frames.offset) == [0, 20, 50]
+    assert list(frames.size) == [20, 30, 49]
+    assert list(frames.protover) == [1, 0, 2]
+    assert list(frames.op) == [2, 5, 5]
+    assert frames.end == 99
+    assert list(frames.where(op=5)) == [1, 2]
+    assert list(frames.where(protover=2, op=5)) == [2]
+    assert list(frames.where()) == [0, 1, 2]
+
+    assert list(scan_frames(DUMP, 20, numpy=False).offset) == [20, 50]
+    assert scan_frames(DUMP[:99], numpy=False).end == 99
+
+    with pytest.raises(RemoteProtocolError, match="Invalid packet size: 0"):
+        scan_frames(bytes(16))
+
+
+def test_scan_frames_numpy():
+    np = pytest.importorskip("numpy")
+
+    frames = scan_frames(memoryview(DUMP))
+    assert isinstance(frames.offset, np.ndarray)
+    assert len(frames) == 3
+    assert frames.offset.tolist() == [0, 20, 50]
+    assert frames.size.tolist() == [20, 30, 49]
+    assert frames.protover.tolist() == [1, 0, 2]
+    assert frames.op.tolist() == [2, 5, 5]
+    assert frames.end == 99
+    assert frames.where(op=5).tolist() == [1, 2]
+    assert frames.where(protover=2, op=5).tolist() == [2]
+    assert frames.where(protover=1).tolist() == [0]
+
+
+def test_numpy_is_lazy():
+    # numpy is only imported by the first scan that asks for it
+    subprocess.run(
+        [
+            sys.executable,
+            "-c",
+            "import sys, broadcastlv\n"
+            "assert 'numpy' not in sys.modules\n"
+            "broadcastlv.scan_frames(b'', numpy=False)\n"
+            "assert 'numpy' not in sys.modules\n",
+        ],
+        check=True,
+    )
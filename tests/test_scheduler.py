@@ -0,0 +1,78 @@
+import pytest
+
+from broadcastlv.connection import Connection, ConnectionState, ServerConnection
+from broadcastlv.event import Command, HeartbeatResponse, LazyCommand
+from broadcastlv.exception import LocalProtocolError
+from broadcastlv.hub import BroadcastHub
+from broadcastlv.scheduler import Coalescer, CoalescerMetrics
+
+FRAME = (
+    b'\x00\x00\x00\x1e\x00\x10\x00\x00\x00\x00\x00\x05\x00\x00\x00\x00{"cmd":"TEST"}'
+)
+
+
+def test_coalescer():
+    coalescer = Coalescer(42, 0.05, 0)
+    a, b = ServerConnection(), ServerConnection()
+    a.state = b.state = ConnectionState.AUTHENTICATED
+    assert coalescer.deadline() is None
+
+    assert coalescer.add(a, Command("TEST"), 1.0) == []
+    assert coalescer.add(b, b'{"cmd":"TEST"}', 1.02) == []
+    assert coalescer.deadline() == 1.05
+    assert coalescer.poll(1.04) == []
+    assert coalescer.add(a, LazyCommand("TEST", b'{"cmd":"TEST"}'), 1.04) == []
+    assert coalescer.add(a, Command("TEST"), 1.045) == [(a, FRAME * 3)]
+    assert coalescer.deadline() == 1.07
+
+    assert coalescer.add(a, Command("TEST"), 1.06) == []
+    assert coalescer.poll(1.08) == [(b, FRAME)]
+    assert coalescer.flush(1.08) == [(a, FRAME)]
+    assert coalescer.queues == {}
+
+    metrics = coalescer.metrics
+    assert (metrics.batches, metrics.commands, metrics.size) == (3, 5, 70)
+    assert (metrics.size_flushes, metrics.deadline_flushes) == (1, 1)
+    assert metrics.max_delay == pytest.approx(0.06)
+    assert metrics.mean_delay == pytest.approx((0.045 + 0.005 + 0 + 0.06 + 0.02) / 5)
+    assert metrics.mean_batch == 5 / 3
+
+
+def test_coalescer_metrics():
+    assert CoalescerMetrics().mean_batch == CoalescerMetrics().mean_delay == 0.0
+
+
+def test_coalescer_connection():
+    coalescer = Coalescer()
+    conn = ServerConnection()
+    with pytest.raises(LocalProtocolError, match="Connection is not authenticated"):
+        coalescer.add(conn, Command("TEST"), 0)
+    conn.state = ConnectionState.AUTHENTICATED | ConnectionState.CLOSED
+    with pytest.raises(LocalProtocolError, match="Connection is closed"):
+        coalescer.add(conn, Command("TEST"), 0)
+    conn = ServerConnection()
+    conn.state = ConnectionState.AUTHENTICATED
+    with pytest.raises(LocalProtocolError, match="Unknown event: HeartbeatResponse"):
+        coalescer.add(conn, HeartbeatResponse(0, b""), 0)  # type: ignore
+
+    coalescer.add(conn, Command("TEST"), 0)
+    ((_, frame),) = coalescer.poll(1)
+    receiver = Connection()
+    receiver.receive_data(frame)
+    assert receiver.next_events() == [Command("TEST")]
+
+    coalescer.add(conn, Command("TEST"), 1)
+    conn.state |= ConnectionState.CLOSED
+    assert coalescer.flush(1) == []
+
+
+def test_coalescer_hub():
+    hub = BroadcastHub()
+    a, b = ServerConnection(), ServerConnection()
+    a.state = b.state = ConnectionState.AUTHENTICATED
+    hub.subscribe(1, a, 0)
+    hub.subscribe(1, b, 0)
+    coalescer = Coalescer(hub=hub)
+    coalescer.add(1, Command("TEST"), 0)
+    coalescer.add(1, Command("TEST"), 0)
+    assert coalescer.flush(0) == [(a, FRAME * 2), (b, FRAME * 2)]
@@ -0,0 +1,160 @@
+import asyncio
+
+import pytest
+
+from broadcastlv.client import Client
+from broadcastlv.connection import ClientConnection
+from broadcastlv.event import (
+    Auth,
+    AuthResponse,
+    Command,
+    ConnectionClosed,
+    Heartbeat,
+    HeartbeatResponse,
+)
+from broadcastlv.exception import RemoteProtocolError
+from broadcastlv.multiplexer import RoomMultiplexer
+from broadcastlv.protocol import ConnectionProtocol
+from broadcastlv.server import Server
+
+
+async def connect(server: asyncio.Server) -> ConnectionProtocol[ClientConnection]:
+    _, protocol = await asyncio.get_running_loop().create_connection(
+        lambda: ConnectionProtocol(ClientConnection()),
+        *server.sockets[0].getsockname(),
+    )
+    return protocol
+
+
+def test_server():
+    async def main():
+        server = Server(lambda auth: 0 if auth.roomid < 10 else 1)
+        address = (await server.start("127.0.0.1")).sockets[0].getsockname()
+
+        events = []
+        mux = RoomMultiplexer(
+            *address,
+            lambda roomid, event: events.append((roomid, event)),
+            heartbeat_interval=0.01,
+        )
+        mux.add(1, Auth(1, protover=3))
+        mux.add(2, Auth(2, protover=2))
+        mux.add(3, Auth(3))
+        while len(authenticated := [r for r, e in events if e == AuthResponse(0)]) < 3:
+            await asyncio.sleep(0.01)
+        assert sorted(authenticated) == [1, 2, 3]
+        assert len(server.clients) == 3
+
+        client = await connect(server.server)
+        client.send(Auth(1))
+        assert await anext(client) == AuthResponse(0)
+        client.send(Heartbeat(b""))
+        assert await anext(client) == HeartbeatResponse(2, b"")
+
+        assert server.broadcast(1, [Command("TEST")]) == 2
+        assert server.broadcast(2, [Command("TEST")]) == 1
+        assert server.broadcast(4, [Command("TEST")]) == 0
+        assert await anext(client) == Command("TEST")
+        while (1, Command("TEST")) not in events or (2, Command("TEST")) not in events:
+            await asyncio.sleep(0.01)
+
+        rejected = await connect(server.server)
+        rejected.send(Auth(10))
+        with pytest.raises(
+            RemoteProtocolError, match=r"Authentication failed \(code: 1\)"
+        ):
+            await anext(rejected)
+
+        client.send(ConnectionClosed())
+        mux.close()
+        while server.clients:
+            await asyncio.sleep(0.01)
+        assert server.hub.rooms == {}
+        await server.close()
+        await server.close()
+
+    asyncio.run(main())
+
+
+def test_server_popularity():
+    async def main():
+        server = Server(popularity=lambda roomid: roomid * 100)
+        address = (await server.start("127.0.0.1")).sockets[0].getsockname()
+        events = []
+        client = Client(*address, Auth(5), events.append, heartbeat_interval=0.01)
+        task = asyncio.create_task(client.run())
+        while client.popularity is None:
+            await asyncio.sleep(0.01)
+        assert client.popularity == 500
+        await server.close()
+        client.close()
+        await task
+
+    asyncio.run(main())
+
+
+def test_server_timeout():
+    async def main():
+        server = Server(timeout=0.02)
+        await server.start("127.0.0.1")
+        idle = await connect(server.server)
+        while not server.clients:
+            await asyncio.sleep(0)
+        server.timer.cancel()
+        server._sweep()  # a client seen within the timeout is kept
+        assert len(server.clients) == 1
+        unauthenticated = await connect(server.server)
+        unauthenticated.send(b"", 1, 2)  # a heartbeat before authenticating
+        async for _ in idle:
+            pass  # pragma: no cover
+        async for _ in unauthenticated:
+            pass  # pragma: no cover
+        assert server.clients == {}
+        await server.close()
+
+    asyncio.run(main())
+
+
+def test_server_pipelined():
+    async def main():
+        server = Server()
+        await server.start("127.0.0.1")
+        client = await connect(server.server)
+        # the heartbeat arrives in the same read as the auth it follows
+        client.transport.write(
+            client.connection.send(Auth(1)) + client.connection.send(b"", 1, 2)
+        )
+        assert await asyncio.wait_for(anext(client), 1) == AuthResponse(0)
+        assert await asyncio.wait_for(anext(client), 1) == HeartbeatResponse(1, b"")
+        await server.close()
+
+    asyncio.run(main())
+
+
+def test_server_protover():
+    async def main():
+        server = Server()
+        await server.start("127.0.0.1")
+        client = await connect(server.server)
+        client.send(Auth(1, protover=5))  # served uncompressed
+        assert await anext(client) == AuthResponse(0)
+        assert server.broadcast(1, [Command("TEST")]) == 1
+        assert await anext(client) == Command("TEST")
+        await server.close()
+
+    asyncio.run(main())
+
+
+def test_server_slow_reader():
+    async def main():
+        server = Server(max_write_buffer_size=-1)
+        await server.start("127.0.0.1")
+        client = await connect(server.server)
+        client.send(Auth(1))
+        assert await anext(client) == AuthResponse(0)
+        assert server.broadcast(1, [Command("TEST")]) == 0
+        async for _ in client:
+            pass  # pragma: no cover
+        await server.close()
+
+    asyncio.run(main())
@@ -1,6 +1,7 @@
 import pytest
 
 from broadcastlv.connection import (
+    Connection,
     ConnectionRole,
     ConnectionState,
     ServerConnection,
@@ -11,7 +12,9 @@ from broadcastlv.event import (
     AuthResponse,
     Command,
     ConnectionClosed,
+    Heartbeat,
     HeartbeatResponse,
+    LazyCommand,
 )
 from broadcastlv.exception import LocalProtocolError, RemoteProtocolError
 
@@ -46,6 +49,7 @@ def test_send():
 
     conn.send(HeartbeatResponse(0, b""))
     conn.send(Command("TEST"))
+    conn.send(LazyCommand("TEST", b'{"cmd":"TEST"}'))
     conn.send(b"", 0, 0)
     with pytest.raises(LocalProtocolError, match="Connection is already authenticated"):
         conn.send(AuthResponse(0))
@@ -70,12 +74,14 @@ def test_multi_send():
     conn.state = ConnectionState.AUTHENTICATED
     assert (
         conn.multi_send([Command("TEST"), b'{"cmd":"TEST"}'], 2)
-        == b"\x00\x00\x001\x00\x10\x00\x02\x00\x00\x00\x05\x00\x00\x00\x00x\x9cc``\x90c\x10`\x00\x01V\x10Q\xad\x94\x9c\x9b\xa2d\xa5\x14\xe2\x1a\x1c\xa2T\x0b\x00%0\x04b"
-    )
-    assert (
-        conn.multi_send([Command("TEST"), b'{"cmd":"TEST"}'], 3)
-        == b'\x00\x00\x002\x00\x10\x00\x03\x00\x00\x00\x05\x00\x00\x00\x00\x8b\x0e\x80\x00\x00\x00\x1e\x00\x10\x00\x00\x00\x00\x00\x05\x00\x00\x00\x00{"cmd":"TEST"}\x03'
+        == b"\x00\x00\x004\x00\x10\x00\x02\x00\x00\x00\x05\x00\x00\x00\x00x\x9cc``\x90c\x10`\x00\x01V\x10Q\xad\x94\x9c\x9b\xa2d\xa5\x14\xe2\x1a\x1c\xa2T\xcb\x80W\x16\x00\xcd\xbe\x08\xc3"
     )
+    for protover in (2, 3):
+        receiver = Connection()
+        receiver.receive_data(
+            bytes(conn.multi_send(iter([Command("TEST"), b'{"cmd":"TEST"}']), protover))
+        )
+        assert receiver.next_events() == [Command("TEST"), Command("TEST")]
 
     with pytest.raises(LocalProtocolError, match="Unknown event: HeartbeatResponse"):
         conn.multi_send([HeartbeatResponse(0, b"")])  # type: ignore
@@ -84,12 +90,77 @@ def test_multi_send():
         conn.multi_send([Command("TEST")], 4)  # type: ignore
 
 
+def test_send_cached(monkeypatch: pytest.MonkeyPatch):
+    conn = ServerConnection()
+    conn.receive_data(
+        b'\x00\x00\x00S\x00\x10\x00\x01\x00\x00\x00\x07\x00\x00\x00\x00{"roomid":1,"uid":2,"protover":3,"platform":"4","type":5,"key":"6"}'
+    )
+    conn.next_event()
+    frame = conn.send(AuthResponse(0))
+    assert (
+        frame
+        == b'\x00\x00\x00\x1a\x00\x10\x00\x01\x00\x00\x00\x08\x00\x00\x00\x00{"code":0}'
+    )
+    assert ServerConnection()._send_cached(0, AuthResponse(0)) is frame
+
+    assert (
+        conn.send(HeartbeatResponse(114514, b"test"))
+        == b"\x00\x00\x00\x18\x00\x10\x00\x01\x00\x00\x00\x03\x00\x00\x00\x00\x00\x01\xbfRtest"
+    )
+    assert (
+        conn.send(HeartbeatResponse(1, b"test"))
+        == b"\x00\x00\x00\x18\x00\x10\x00\x01\x00\x00\x00\x03\x00\x00\x00\x00\x00\x00\x00\x01test"
+    )
+    buffer = bytearray()
+    assert conn.send(HeartbeatResponse(1, b"test"), buffer=buffer) is buffer
+
+    monkeypatch.setattr("broadcastlv.connection._frames", {})
+    monkeypatch.setattr("broadcastlv.connection._frames_maxsize", 0)
+    assert conn.send(HeartbeatResponse(1, b"test")) == buffer
+    assert conn._send_cached(0, AuthResponse(0)) is not frame
+
+
+def test_send_buffer_auth_response():
+    # a given buffer bypasses the shared frames but closes on failure all the same
+    conn = ServerConnection()
+    conn.receive_data(
+        b'\x00\x00\x00S\x00\x10\x00\x01\x00\x00\x00\x07\x00\x00\x00\x00{"roomid":1,"uid":2,"protover":3,"platform":"4","type":5,"key":"6"}'
+    )
+    conn.next_event()
+    buffer = bytearray()
+    assert conn.send(AuthResponse(1), buffer=buffer) is buffer
+    assert (
+        buffer
+        == b'\x00\x00\x00\x1a\x00\x10\x00\x01\x00\x00\x00\x08\x00\x00\x00\x00{"code":1}'
+    )
+    assert conn.state & ConnectionState.CLOSED
+
+
+def test_send_vectored():
+    conn = ServerConnection()
+
+    with pytest.raises(LocalProtocolError, match="Connection is not authenticated"):
+        conn.send_vectored(Command("TEST"))
+
+    payload = memoryview(b'{"cmd":"TEST"}')
+    header, body = conn.send_vectored(payload, 0, 5)
+    assert header == b"\x00\x00\x00\x1e\x00\x10\x00\x00\x00\x00\x00\x05\x00\x00\x00\x00"
+    assert body is payload
+
+
 def test_receive_data():
     conn = ServerConnection()
     conn.receive_data(b"")
     conn.receive_data(b"")
     with pytest.raises(RemoteProtocolError, match="Connection is closed"):
         conn.receive_data(b"test")
+    with pytest.raises(RemoteProtocolError, match="Connection is closed"):
+        conn.buffer_updated(4)
+
+    conn = ServerConnection()
+    conn.get_buffer(4)[:] = b"test"
+    conn.buffer_updated(4)
+    assert conn.end1 == 4
 
 
 def test_next_event():
@@ -147,3 +218,40 @@ def test_next_event():
     conn = ServerConnection()
     conn.send(ConnectionClosed())
     assert conn.next_event() == ConnectionClosed()
+
+
+def test_next_events():
+    conn = ServerConnection()
+    conn.receive_data(
+        b'\x00\x00\x00S\x00\x10\x00\x01\x00\x00\x00\x07\x00\x00\x00\x00{"roomid":1,"uid":2,"protover":3,"platform":"4","type":5,"key":"6"}'
+    )
+    assert conn.next_events() == [Auth(1, 2, 3, "4", 5, "6")]
+    assert conn.state & ConnectionState.AUTHENTICATING
+    conn.send(AuthResponse(0))
+
+    conn.receive_data(
+        b"\x00\x00\x00\x14\x00\x10\x00\x01\x00\x00\x00\x02\x00\x00\x00\x00test"
+        b"\x00\x00\x00\x14\x00\x10\x00\x01\x00\x00\x00\x02\x00\x00\x00\x00test"
+    )
+    assert conn.next_events() == [Heartbeat(b"test"), Heartbeat(b"test")]
+
+    conn.receive_data(
+        b"\x00\x00\x00\x18\x00\x10\x00\x01\x00\x00\x00\x03\x00\x00\x00\x00\x00\x01\xbfRtest"
+    )
+    with pytest.raises(RemoteProtocolError, match="Unknown event: HeartbeatResponse"):
+        conn.next_events()
+    assert conn.state & ConnectionState.CLOSED
+
+    conn = ServerConnection()
+    conn.send(ConnectionClosed())
+    assert conn.next_events() == [ConnectionClosed()]
+
+    # a heartbeat pipelined after the auth waits for the AuthResponse
+    conn = ServerConnection()
+    conn.receive_data(
+        b'\x00\x00\x00S\x00\x10\x00\x01\x00\x00\x00\x07\x00\x00\x00\x00{"roomid":1,"uid":2,"protover":3,"platform":"4","type":5,"key":"6"}'
+        b"\x00\x00\x00\x14\x00\x10\x00\x01\x00\x00\x00\x02\x00\x00\x00\x00test"
+    )
+    assert conn.next_events() == [Auth(1, 2, 3, "4", 5, "6")]
+    conn.send(AuthResponse(0))
+    assert conn.next_events() == [Heartbeat(b"test")]
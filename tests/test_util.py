@@ -1,4 +1,4 @@
-from broadcastlv.util import pascal_to_snake, pascal_to_upper_snake
+from broadcastlv.util import pascal_to_snake, pascal_to_upper_snake, scan_cmd
 
 
 def test_pascal_to_upper_snake():
@@ -61,3 +61,13 @@ def test_pascal_to_snake():
 
     for pascal, snake in mapping:
         assert pascal_to_snake(pascal) == snake
+
+
+def test_scan_cmd():
+    assert scan_cmd(b'{"cmd":"DANMU_MSG","info":[]}') == "DANMU_MSG"
+    assert scan_cmd(b'{"cmd":"DANMU_MSG:4:0:2:2:2:0"}') == "DANMU_MSG:4:0:2:2:2:0"
+    assert scan_cmd(b'{ "cmd" : "TEST" }') is None
+    assert scan_cmd(memoryview(b'{"cmd":"TEST"}')) == "TEST"
+    assert scan_cmd(b'{"data":{},"cmd":"TEST"}') is None
+    assert scan_cmd(b'{"cmd":"TE\\u0053T"}') is None
+    assert scan_cmd(b"NOT A JSON") is None
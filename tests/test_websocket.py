@@ -0,0 +1,129 @@
+import pytest
+
+from broadcastlv.connection import (
+    ClientConnection,
+    Connection,
+    ConnectionState,
+    ServerConnection,
+)
+from broadcastlv.event import (
+    Auth,
+    AuthResponse,
+    ConnectionClosed,
+    Heartbeat,
+    HeartbeatResponse,
+)
+from broadcastlv.exception import LocalProtocolError, RemoteProtocolError
+from broadcastlv.websocket import WebSocket
+
+
+def client() -> WebSocket[ClientConnection]:
+    return WebSocket(ClientConnection(), masking_key=lambda: b"\x01\x02\x03\x04")
+
+
+def test_send():
+    ws = client()
+    assert ws.send(Auth(1)) == (
+        b"\x82\x9c\x01\x02\x03\x04\x01\x02\x03\x18\x01\x12\x03\x05"
+        b"\x01\x02\x03\x03\x01\x02\x03\x04z qknoj`#82y"
+    )
+    assert ws.ping(b"ping") == b"\x89\x84\x01\x02\x03\x04qkmc"
+    assert ws.send(ConnectionClosed()) == b"\x88\x82\x01\x02\x03\x04\x02\xea"
+    assert ws.close_sent
+    with pytest.raises(LocalProtocolError, match="WebSocket is closed"):
+        ws.ping()
+
+    ws = WebSocket(ServerConnection())
+    ws.connection.state = ConnectionState.AUTHENTICATING
+    assert ws.send(AuthResponse(0)) == (
+        b'\x82\x1a\x00\x00\x00\x1a\x00\x10\x00\x01\x00\x00\x00\x08\x00\x00\x00\x00{"code":0}'
+    )
+    assert ws.frame(bytes(126))[:4] == b"\x82\x7e\x00\x7e"
+    assert ws.frame(bytes(1 << 16))[:10] == b"\x82\x7f\x00\x00\x00\x00\x00\x01\x00\x00"
+    assert ws.close(1001, "bye") == b"\x88\x05\x03\xe9bye"
+
+
+def test_send_vectored():
+    ws = WebSocket(ServerConnection())
+    header, ws_header, body = ws.send_vectored(b"test", 0, 5)
+    assert header == b"\x82\x14"
+    assert (
+        ws_header == b"\x00\x00\x00\x14\x00\x10\x00\x00\x00\x00\x00\x05\x00\x00\x00\x00"
+    )
+    assert body == b"test"
+    assert ws.send_vectored(bytes(126), 0, 5)[0] == b"\x82\x7e\x00\x8e"
+    assert (
+        ws.send_vectored(bytes(1 << 16), 0, 5)[0]
+        == b"\x82\x7f\x00\x00\x00\x00\x00\x01\x00\x10"
+    )
+    assert ws.send_vectored(ConnectionClosed()) == [b"\x88\x02\x03\xe8"]
+    assert ConnectionState.CLOSED in ws.connection.state
+
+    assert client().send_vectored(Auth(1)) == [client().send(Auth(1))]
+
+
+def test_receive_data():
+    ws = client()
+    server = WebSocket(ServerConnection())
+    data = ws.send(Auth(1))
+    for i in range(0, len(data), 7):
+        server.receive_data(data[i : i + 7])
+    assert server.connection.next_events() == [Auth(1)]
+
+    data = server.send(AuthResponse(0)) + server.ping(b"ping")
+    for i in range(len(data)):
+        ws.receive_data(data[i : i + 1])
+    assert ws.connection.next_events() == [AuthResponse(0)]
+    assert ws.data_to_send() == b"\x8a\x84\x01\x02\x03\x04qkmc"
+    assert ws.data_to_send() == b""
+
+    data = ws.send(Heartbeat(b"x" * 70000))
+    for i in range(0, 994, 7):
+        server.receive_data(data[i : i + 7])
+    server.receive_data(data[994:])
+    assert server.connection.next_events() == [Heartbeat(b"x" * 70000)]
+
+    # fragmented message, control frames in between
+    packet = Connection().send(HeartbeatResponse(1, b"hello"))
+    ws.receive_data(b"\x02\x05" + packet[:5] + b"\x8a\x00" + b"\x80\x14" + packet[5:])
+    assert ws.connection.next_events() == [HeartbeatResponse(1, b"hello")]
+
+    ws.receive_data(b"\x88\x05\x03\xe9bye")
+    assert ws.closed
+    assert (ws.close_code, ws.close_reason) == (1001, "bye")
+    assert ws.data_to_send() == b"\x88\x82\x01\x02\x03\x04\x02\xeb"
+    assert ConnectionState.CLOSED in ws.connection.state
+    with pytest.raises(RemoteProtocolError, match="Data after close frame"):
+        ws.receive_data(b"\x82\x00")
+
+    ws = client()
+    ws.close()
+    ws.receive_data(b"\x89\x00\x88\x00")
+    assert (ws.closed, ws.close_code) == (True, None)
+    assert ws.data_to_send() == b""
+
+    ws = client()
+    ws.receive_data(b"")
+    assert ConnectionState.CLOSED in ws.connection.state
+
+
+def test_receive_error():
+    for data, message in (
+        (b"\xc2\x00", "Reserved bits are set"),
+        (b"\x82\x80", "Unexpected masked frame"),
+        (b"\x81\x00", "Unexpected opcode: 1"),
+        (b"\x89\x7e\x00\x7e", "Invalid control frame"),
+        (b"\x09\x00", "Invalid control frame"),
+    ):
+        with pytest.raises(RemoteProtocolError, match=message):
+            client().receive_data(data)
+    with pytest.raises(RemoteProtocolError, match="Unmasked frame"):
+        WebSocket(ServerConnection()).receive_data(b"\x82\x00")
+
+
+def test_get_buffer():
+    ws = client()
+    buffer = ws.get_buffer(-1)
+    buffer[:2] = b"\x89\x00"
+    ws.buffer_updated(2)
+    assert ws.data_to_send() == b"\x8a\x80\x01\x02\x03\x04"